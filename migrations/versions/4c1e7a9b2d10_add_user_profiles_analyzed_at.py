@@ -0,0 +1,29 @@
+"""add analyzed_at to user_profiles
+
+Revision ID: 4c1e7a9b2d10
+Revises: 990b6d635503
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7a9b2d10'
+down_revision: Union[str, Sequence[str], None] = '990b6d635503'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_profiles', sa.Column('analyzed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.drop_column('analyzed_at')
@@ -0,0 +1,44 @@
+"""transaction ledger indexes and balance snapshots
+
+Revision ID: 5f2c8a1d7e34
+Revises: e3a9c4d6f2b8
+Create Date: 2026-10-18 15:20:11.318402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8a1d7e34'
+down_revision: Union[str, Sequence[str], None] = 'e3a9c4d6f2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_user_id_id', 'transactions', ['user_id', 'id'], unique=False)
+    op.create_index('ix_transactions_created_at', 'transactions', ['created_at'], unique=False)
+    op.create_table('balance_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_balance_snapshots_user_id_transaction_id', 'balance_snapshots', ['user_id', 'transaction_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_balance_snapshots_user_id_transaction_id', table_name='balance_snapshots')
+    op.drop_table('balance_snapshots')
+    op.drop_index('ix_transactions_created_at', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_id', table_name='transactions')
@@ -0,0 +1,115 @@
+"""partition transactions by month
+
+Revision ID: 8b41d6e2c9f7
+Revises: 5f2c8a1d7e34
+Create Date: 2026-10-18 17:02:45.671220
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41d6e2c9f7'
+down_revision: Union[str, Sequence[str], None] = '5f2c8a1d7e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors src.infrastructure.partitioning at the time of this migration
+MONTHS_AHEAD = 2
+
+INDEXES = (
+    ('ix_transactions_user_id_id', ['user_id', 'id']),
+    ('ix_transactions_user_id_created_at', ['user_id', 'created_at']),
+    ('ix_transactions_created_at', ['created_at']),
+)
+
+
+def _months(first: datetime, last: datetime):
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        yield month, following
+        month = following
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only PostgreSQL has declarative partitioning
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='transactions')
+    op.execute('ALTER TABLE transactions RENAME TO transactions_unpartitioned')
+    op.execute(
+        'ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey'
+    )
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            amount INTEGER NOT NULL,
+            description VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('CREATE TABLE transactions_default PARTITION OF transactions DEFAULT')
+
+    now = datetime.utcnow()
+    oldest, newest = op.get_bind().execute(
+        sa.text('SELECT min(created_at), max(created_at) FROM transactions_unpartitioned')
+    ).one()
+    last = datetime(now.year + (now.month + MONTHS_AHEAD - 1) // 12, (now.month + MONTHS_AHEAD - 1) % 12 + 1, 1)
+    for start, end in _months(oldest or now, max(last, newest or last)):
+        op.execute(
+            f"CREATE TABLE transactions_p{start:%Y_%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+    op.execute(
+        'INSERT INTO transactions (id, user_id, amount, description, created_at) '
+        'SELECT id, user_id, amount, description, created_at FROM transactions_unpartitioned'
+    )
+    # Keep the id sequence when the old table goes
+    op.execute('ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id')
+    op.execute('DROP TABLE transactions_unpartitioned')
+    for name, columns in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='transactions')
+    op.execute('ALTER TABLE transactions RENAME TO transactions_partitioned')
+    op.execute(
+        'ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey'
+    )
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq') PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            amount INTEGER NOT NULL,
+            description VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute(
+        'INSERT INTO transactions (id, user_id, amount, description, created_at) '
+        'SELECT id, user_id, amount, description, created_at FROM transactions_partitioned'
+    )
+    op.execute('ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id')
+    # Drops the partitions with it
+    op.execute('DROP TABLE transactions_partitioned')
+    for name, columns in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=False)
@@ -0,0 +1,45 @@
+"""add archetype classification state
+
+Revision ID: b7d2e5f81c3a
+Revises: 4c1e7a9b2d10
+Create Date: 2026-10-18 11:40:02.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e5f81c3a'
+down_revision: Union[str, Sequence[str], None] = '4c1e7a9b2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_command_stats',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('command', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'command')
+    )
+    op.add_column('user_profiles', sa.Column('classified_at', sa.DateTime(), nullable=True))
+    # Per-user "changed since classified_at" lookups of the classification job
+    op.create_index('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at'], unique=False)
+    op.create_index(
+        'ix_user_achievements_user_id_unlocked_at', 'user_achievements', ['user_id', 'unlocked_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_achievements_user_id_unlocked_at', table_name='user_achievements')
+    op.drop_index('ix_transactions_user_id_created_at', table_name='transactions')
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.drop_column('classified_at')
+    op.drop_table('user_command_stats')
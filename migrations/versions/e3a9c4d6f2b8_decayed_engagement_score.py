@@ -0,0 +1,69 @@
+"""time-decayed engagement score
+
+Revision ID: e3a9c4d6f2b8
+Revises: b7d2e5f81c3a
+Create Date: 2026-10-18 13:05:37.204481
+
+"""
+import math
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c4d6f2b8'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e5f81c3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors src.services.engagement at the time of this migration: the
+# default half-life and rank_key = ln(score) + rate * (updated_at - RANK_EPOCH)
+HALF_LIFE_HOURS = 7 * 24.0
+RANK_EPOCH = datetime(2025, 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.alter_column('engagement_score', existing_type=sa.Integer(), type_=sa.Float(), existing_nullable=False)
+        batch_op.add_column(sa.Column('engagement_updated_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('engagement_rank', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('engagement_rank_rate', sa.Float(), nullable=True))
+        batch_op.create_index('ix_user_profiles_engagement_rank', ['engagement_rank'], unique=False)
+
+    # Existing scores start decaying from now, keyed with the default
+    # half-life; the context pipeline re-keys them if it is configured
+    # otherwise. Scores were integers until now, so positive ones are at
+    # least 1 and need no clamping before ln().
+    profiles = sa.table(
+        'user_profiles',
+        sa.column('engagement_score', sa.Float()),
+        sa.column('engagement_updated_at', sa.DateTime()),
+        sa.column('engagement_rank', sa.Float()),
+        sa.column('engagement_rank_rate', sa.Float()),
+    )
+    now = datetime.utcnow()
+    rate = math.log(2) / (HALF_LIFE_HOURS * 3600)
+    elapsed = rate * (now - RANK_EPOCH).total_seconds()
+    op.execute(
+        profiles.update()
+        .where(profiles.c.engagement_score > 0)
+        .values(
+            engagement_updated_at=now,
+            engagement_rank=sa.func.ln(profiles.c.engagement_score) + elapsed,
+            engagement_rank_rate=rate,
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.drop_index('ix_user_profiles_engagement_rank')
+        batch_op.drop_column('engagement_rank_rate')
+        batch_op.drop_column('engagement_rank')
+        batch_op.drop_column('engagement_updated_at')
+        batch_op.alter_column('engagement_score', existing_type=sa.Float(), type_=sa.Integer(), existing_nullable=False)
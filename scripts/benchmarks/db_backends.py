@@ -0,0 +1,206 @@
+"""
+Compares the /start workload on SQLite, tuned SQLite (WAL pragmas), tuned
+SQLite with group commit, and PostgreSQL.
+
+Each backend gets a fresh schema and the same sequence of /start updates
+(new users first, then the same users returning) fed through the real
+middleware stack at the given concurrency. Each reply takes
+--reply-latency-ms, standing in for the Telegram round trip; with group
+commit the units of work commit before it, as in production.
+
+Usage:
+    python -m scripts.benchmarks.db_backends \
+        [--sqlite-url URL] [--postgres-url URL] [--reset-database] \
+        [--requests N] [--concurrency N] [--reply-latency-ms 0]
+
+The PostgreSQL run is skipped unless --postgres-url (or DATABASE_URL pointing
+at PostgreSQL) is given, e.g. against `docker-compose up postgres`. Every
+backend's tables are dropped first, so databases other than temporary SQLite
+files need --reset-database.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from aiogram import Dispatcher
+from aiogram.filters import CommandStart
+from aiogram.types import Chat, Message, Update, User as TelegramUser
+from dependency_injector import providers
+from sqlalchemy.engine import make_url
+
+from scripts.benchmarks.scenarios import is_scratch_database
+from src.bot.handlers.commands import start_handler
+from src.bot.middleware.auth import AuthMiddleware
+from src.bot.middleware.uow import CommitBeforeRequestMiddleware, UoWMiddleware
+from src.config import settings
+from src.containers import ApplicationContainer
+from src.domain.models import Achievement, Base
+from src.infrastructure.database import create_db_engine, create_group_commit_writer
+
+
+def build_dispatcher(container: ApplicationContainer) -> Dispatcher:
+    dp = Dispatcher()
+    dp.update.outer_middleware.register(UoWMiddleware(container.infrastructure.uow))
+    dp.update.outer_middleware.register(
+        AuthMiddleware(container.services.user_service(), container.services.gamification_service())
+    )
+    dp["gamification_service"] = container.services.gamification_service()
+    dp["context_service"] = container.services.context_service()
+    dp["personalization_service"] = container.services.personalization_service()
+    dp.message.register(start_handler, CommandStart())
+    return dp
+
+
+def start_update(update_id: int, user_id: int) -> Update:
+    user = TelegramUser(id=user_id, is_bot=False, first_name=f"Bench{user_id}")
+    message = Message(
+        message_id=update_id,
+        chat=Chat(id=user_id, type="private"),
+        from_user=user,
+        text="/start",
+        date=datetime.now(),
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def stub_bot(reply_latency: float, commit_before_request: bool) -> AsyncMock:
+    """
+    Returns a Bot stand-in whose API requests take `reply_latency` seconds,
+    going through the commit-before-request middleware if asked.
+    """
+    middleware = CommitBeforeRequestMiddleware() if commit_before_request else None
+
+    async def make_request(bot, method):
+        await asyncio.sleep(reply_latency)
+
+    async def request(method, request_timeout=None):
+        if middleware is not None:
+            return await middleware(make_request, bot, method)
+        return await make_request(bot, method)
+
+    bot = AsyncMock(side_effect=request)
+    return bot
+
+
+async def run_phase(dp: Dispatcher, bot: AsyncMock, user_ids: list, concurrency: int, offset: int) -> tuple:
+    """
+    Returns the latencies of the updates and the failures by exception type.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = Counter()
+
+    async def worker(i: int, user_id: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await dp.feed_update(bot, start_update(offset + i, user_id))
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker(i, user_id) for i, user_id in enumerate(user_ids)))
+    return latencies, errors
+
+
+async def bench_backend(
+    label: str,
+    url: str,
+    requests: int,
+    concurrency: int,
+    sqlite_tuning: bool = False,
+    group_commit: bool = False,
+    reply_latency: float = 0,
+) -> None:
+    engine = create_db_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        sqlite_tuning=sqlite_tuning,
+    )
+    writer = create_group_commit_writer(engine, group_commit, window=settings.GROUP_COMMIT_WINDOW_MS / 1000)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    container = ApplicationContainer()
+    container.infrastructure.db_engine.override(providers.Object(engine))
+    container.infrastructure.group_commit_writer.override(providers.Object(writer))
+    async with container.infrastructure.uow() as uow:
+        await uow.achievements.add(Achievement(name="First Steps", description=".", reward_points=10))
+
+    dp = build_dispatcher(container)
+    bot = stub_bot(reply_latency, commit_before_request=writer is not None)
+    user_ids = list(range(1, requests + 1))
+    for phase, offset in (("new users", 0), ("returning", requests)):
+        start = time.perf_counter()
+        latencies, errors = await run_phase(dp, bot, user_ids, concurrency, offset)
+        duration = time.perf_counter() - start
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        failed = ", ".join(f"{count} {name}" for name, count in errors.most_common())
+        print(
+            f"{label:<10} {phase:<10} {requests / duration:>8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:>7.2f} ms  p95 {p95 * 1000:>7.2f} ms"
+            + (f"  failed: {failed}" if failed else "")
+        )
+    if writer is not None:
+        await writer.close()
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    print(
+        f"--- /start on each backend ({args.requests} users, concurrency {args.concurrency}, "
+        f"{args.reply_latency_ms:g} ms replies) ---"
+    )
+    latency = args.reply_latency_ms / 1000
+    await bench_backend("sqlite", args.sqlite_url, args.requests, args.concurrency, reply_latency=latency)
+    await bench_backend(
+        "sqlite-wal", args.sqlite_url, args.requests, args.concurrency, sqlite_tuning=True, reply_latency=latency
+    )
+    await bench_backend(
+        "sqlite-gc", args.sqlite_url, args.requests, args.concurrency,
+        sqlite_tuning=True, group_commit=True, reply_latency=latency,
+    )
+    if args.postgres_url:
+        # Group commit is SQLite-only
+        await bench_backend("postgresql", args.postgres_url, args.requests, args.concurrency, reply_latency=latency)
+    else:
+        print("postgresql skipped (no --postgres-url)")
+
+
+if __name__ == "__main__":
+    default_postgres = settings.DATABASE_URL if settings.DATABASE_URL.startswith("postgresql") else None
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sqlite-url",
+        default=f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'diana_bench.db')}",
+    )
+    parser.add_argument("--postgres-url", default=default_postgres)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--reply-latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--reset-database",
+        action="store_true",
+        help="allow dropping the tables of databases that are not temporary SQLite files",
+    )
+    args = parser.parse_args()
+    for url in (args.sqlite_url, args.postgres_url):
+        if url and not args.reset_database and not is_scratch_database(url):
+            parser.error(
+                f"{make_url(url)} is not a temporary SQLite database; pass --reset-database to drop its tables"
+            )
+
+    with patch("src.infrastructure.event_bus.EventPublisher.publish", new_callable=AsyncMock):
+        asyncio.run(main(args))
@@ -0,0 +1,67 @@
+"""
+Throughput benchmark for the lexicon-based mood detector.
+
+Runs on a single core (BLAS threads are pinned to 1) and reports messages
+per second for batch scoring and for rolling per-user aggregation.
+
+Usage:
+    python -m scripts.benchmarks.mood_detection [--messages N] [--batch-size N] [--users N]
+"""
+
+import argparse
+import os
+import random
+import time
+
+# BLAS reads these when numpy is first imported, so they are set before the detector import
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+from src.services.mood_detection import MOOD_LEXICON, MoodDetector  # noqa: E402
+
+FILLER = "hola hoy estoy aquí con el bot y quiero ver lo que pasa en la historia".split()
+
+
+def build_messages(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    lexicon_words = [word for words in MOOD_LEXICON.values() for word in words]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.randint(3, 15))
+        words += rng.choices(lexicon_words, k=rng.randint(0, 3))
+        rng.shuffle(words)
+        messages.append(" ".join(words))
+    return messages
+
+
+def bench(label: str, fn, messages: list, batch_size: int) -> None:
+    start = time.perf_counter()
+    for i in range(0, len(messages), batch_size):
+        fn(i, messages[i:i + batch_size])
+    duration = time.perf_counter() - start
+    print(f"{label:<10} {len(messages) / duration:>12,.0f} msg/s  ({duration:.2f}s)")
+
+
+def main(count: int, batch_size: int, users: int) -> None:
+    messages = build_messages(count)
+    user_ids = [random.randint(1, users) for _ in range(count)]
+    detector = MoodDetector(max_users=users)
+
+    print(f"--- Mood detection ({count} messages, batch size {batch_size}, single core) ---")
+    bench("score", lambda i, batch: detector.score_batch(batch), messages, batch_size)
+    bench("classify", lambda i, batch: detector.classify_batch(batch), messages, batch_size)
+    bench(
+        "observe",
+        lambda i, batch: detector.observe(user_ids[i:i + len(batch)], batch),
+        messages,
+        batch_size,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.messages, args.batch_size, args.users)
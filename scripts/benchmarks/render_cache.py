@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for the /start render path.
+
+Compares building the main menu keyboard and greeting on every call with
+looking them up in the precomputed RenderCache.
+
+Usage:
+    python -m scripts.benchmarks.render_cache [--iterations N]
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from src.bot.ui.keyboards import DynamicKeyboardFactory
+from src.bot.ui.render_cache import RenderCache
+from src.domain.models import UserProfile, UserMood, UserArchetype
+from src.services.personalization_service import PersonalizationService
+
+
+def build_profiles() -> list:
+    return [
+        UserProfile(user_id=i, archetype=archetype, mood=mood)
+        for i, (archetype, mood) in enumerate(itertools.product(UserArchetype, UserMood))
+    ]
+
+
+async def bench_uncached(profiles: list, iterations: int) -> float:
+    keyboard_factory = DynamicKeyboardFactory()
+    personalization_service = PersonalizationService()
+    start = time.perf_counter()
+    for i in range(iterations):
+        profile = profiles[i % len(profiles)]
+        keyboard_factory.create_main_menu(profile)
+        await personalization_service.generate_adaptive_message(profile)
+    return time.perf_counter() - start
+
+
+async def bench_cached(profiles: list, iterations: int) -> float:
+    render_cache = RenderCache(DynamicKeyboardFactory(), PersonalizationService())
+    render_cache.warm()
+    start = time.perf_counter()
+    for i in range(iterations):
+        render_cache.get_for_profile(profiles[i % len(profiles)])
+    return time.perf_counter() - start
+
+
+async def main(iterations: int) -> None:
+    profiles = build_profiles()
+    uncached = await bench_uncached(profiles, iterations)
+    cached = await bench_cached(profiles, iterations)
+
+    print(f"--- Render benchmark ({iterations} calls, {len(profiles)} states) ---")
+    print(f"Uncached: {uncached / iterations * 1e6:8.2f} µs/call")
+    print(f"Cached:   {cached / iterations * 1e6:8.2f} µs/call")
+    print(f"Saved:    {(uncached - cached) / iterations * 1e6:8.2f} µs/call ({uncached / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,143 @@
+"""
+Replays a recording of production updates (see UPDATE_RECORDER_ENABLED)
+through the dispatcher as src.main sets it up: the same middlewares,
+handlers and background workers (the context pipeline and load shedder).
+
+Updates are fed with Dispatcher.feed_update against a fresh schema, with
+Redis replaced by an in-process stand-in (fakeredis) unless --redis-url is
+given, and the Bot API replaced by a session that answers every call at
+once (so latencies exclude the Telegram round trip). By default they are
+fed at the recorded pace; --speed 10 replays ten times faster and --speed 0
+as fast as possible. Either way at most --concurrency are handled at a
+time, and the recording is read as it is replayed, so its size is not
+limited by memory.
+
+The report covers throughput and p50/p95/p99 latency overall and per
+command (from a bounded sample of the latencies), the slowest updates, the
+SQL statements per update, failed updates by exception type, and how late
+updates started against the schedule (a replay that falls behind shows the
+bot could not keep up with that traffic at that speed and concurrency).
+
+Usage:
+    python -m scripts.benchmarks.replay recordings/updates.jsonl \
+        [--speed 1] [--concurrency 50] [--limit N] \
+        [--database-url URL [--reset-database]] [--redis-url URL] [--output results.json]
+
+The tables of the database are dropped and recreated first; as with the
+scenarios, anything but a temporary SQLite database needs --reset-database.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime
+from typing import Iterator
+
+import redis.asyncio as redis
+from aiogram.types import Update
+
+from scripts.benchmarks.scenarios import (
+    Bench, Scheduled, add_database_arguments, check_database_arguments, drive, print_run,
+)
+from src.config import settings
+from src.infrastructure.database import create_db_engine
+from src.infrastructure.sql_profiler import SQLProfiler
+from src.infrastructure.update_recorder import read_recording
+
+
+def label(update: Update) -> str:
+    """
+    Groups updates by command, e.g. "/start", or by kind for other updates.
+    """
+    message = update.message or update.edited_message
+    if message is not None and message.text and message.text.startswith("/"):
+        return message.text.split()[0].split("@")[0]
+    return update.event_type or "unknown"
+
+
+def schedule(path: str, speed: float, limit: int = 0) -> Iterator[Scheduled]:
+    """
+    Yields the recording's updates, each due at its offset from the first
+    update divided by `speed`, or at once when `speed` is 0. The file is
+    read as the updates are fed.
+    """
+    first = None
+    for count, (received, data) in enumerate(read_recording(path), 1):
+        if first is None:
+            first = received
+        update = Update.model_validate(data)
+        yield Scheduled((received - first) / speed if speed else 0.0, label(update), update)
+        if count == limit:
+            break
+
+
+async def main(args) -> int:
+    engine = create_db_engine(
+        args.database_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        sqlite_tuning=settings.SQLITE_TUNING,
+    )
+    if args.redis_url:
+        redis_client = redis.from_url(args.redis_url)
+    else:
+        from fakeredis import FakeAsyncRedis
+        redis_client = FakeAsyncRedis()
+
+    bench = Bench(engine, redis_client, SQLProfiler())
+    await bench.setup(args.reset_database)
+    pace = f"{args.speed:g}x the recorded pace" if args.speed else "as fast as possible"
+    print(f"--- Replaying {args.recording}, {pace} at concurrency {args.concurrency} ({engine.dialect.name}) ---")
+    try:
+        runs = await drive(
+            bench, schedule(args.recording, args.speed, args.limit), args.concurrency, bool(args.speed), "replay"
+        )
+    finally:
+        await bench.close()
+        await engine.dispose()
+        await redis_client.aclose()
+
+    if not runs:
+        print(f"No updates in {args.recording}")
+        return 1
+    for run in runs:
+        print_run(run)
+    if "late_p95_ms" in runs[0]:
+        print(
+            f"Started late against the schedule: p95 {runs[0]['late_p95_ms']:.2f} ms, "
+            f"max {runs[0]['late_max_ms']:.2f} ms"
+        )
+
+    if args.output:
+        report = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "recording": args.recording,
+                "speed": args.speed,
+                "database": engine.dialect.name,
+                "redis": "real" if args.redis_url else "fakeredis",
+                "python": platform.python_version(),
+            },
+            "results": runs,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=0)
+    add_database_arguments(parser, "diana_replay.db")
+    parser.add_argument("--redis-url")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    check_database_arguments(parser, args)
+    sys.exit(asyncio.run(main(args)))
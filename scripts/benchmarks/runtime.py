@@ -0,0 +1,167 @@
+"""
+Compares event loop runtime settings (see RUNTIME_* in .env.example) on
+the /start path and on event fan-out.
+
+Each configuration runs the start-new and event-fanout scenarios in its
+own process, since the loop implementation and GC thresholds are process
+wide, --repeat times; the median of each metric is reported next to the
+default runtime's. Configurations are "+"-joined options:
+
+    default             the stock asyncio loop and settings
+    uvloop              uvloop's event loop (if installed)
+    eager               eager task factory (Python 3.12+)
+    executor=N          N default executor threads
+    gc=A,B,C            GC generation thresholds
+
+Configurations whose options are unavailable on this host are skipped.
+
+Usage:
+    python -m scripts.benchmarks.runtime \
+        [--configs "default;uvloop;gc=50000,20,100;uvloop+eager+gc=50000,20,100"] \
+        [--concurrency 1,50] [--requests N] [--repeat 3] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+METRICS = ("throughput", "p50_ms", "p95_ms", "p99_ms")
+
+
+def environment(config: str) -> dict:
+    """
+    Returns the RUNTIME_* variables for a configuration. Raises ValueError
+    for unknown or unavailable options.
+    """
+    env = {
+        "RUNTIME_UVLOOP": "false",
+        "RUNTIME_EAGER_TASKS": "false",
+        "RUNTIME_EXECUTOR_WORKERS": "0",
+        "RUNTIME_GC_THRESHOLDS": "",
+    }
+    for option in config.split("+"):
+        name, _, value = option.partition("=")
+        if name == "default":
+            continue
+        elif name == "uvloop":
+            if importlib.util.find_spec("uvloop") is None:
+                raise ValueError("uvloop is not installed")
+            env["RUNTIME_UVLOOP"] = "true"
+        elif name == "eager":
+            if not hasattr(asyncio, "eager_task_factory"):
+                raise ValueError("eager tasks need Python 3.12 or later")
+            env["RUNTIME_EAGER_TASKS"] = "true"
+        elif name == "executor":
+            env["RUNTIME_EXECUTOR_WORKERS"] = str(int(value))
+        elif name == "gc":
+            env["RUNTIME_GC_THRESHOLDS"] = value
+        else:
+            raise ValueError(f"unknown option {option!r}")
+    return env
+
+
+def run_scenarios(config: str, args) -> list:
+    """
+    Runs the scenarios once under a configuration and returns their results.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "results.json")
+        command = [
+            sys.executable, "-m", "scripts.benchmarks.scenarios",
+            "--scenarios", "start-new,event-fanout",
+            "--concurrency", ",".join(map(str, args.concurrency)),
+            "--requests", str(args.requests),
+            "--listeners", str(args.listeners),
+            "--database-url", f"sqlite+aiosqlite:///{os.path.join(directory, 'runtime.db')}",
+            "--output", output,
+        ]
+        completed = subprocess.run(
+            command, env={**os.environ, **environment(config)}, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{config} failed:\n{completed.stderr[-2000:]}")
+        with open(output) as file:
+            return json.load(file)["results"]
+
+
+def median_runs(repeats: list) -> dict:
+    """
+    Returns the median of each metric per (scenario, concurrency) over repeated runs.
+    """
+    grouped = {}
+    for results in repeats:
+        for run in results:
+            grouped.setdefault((run["scenario"], run["concurrency"]), []).append(run)
+    return {
+        key: {metric: statistics.median(run[metric] for run in runs) for metric in METRICS}
+        for key, runs in grouped.items()
+    }
+
+
+def main(args) -> int:
+    results = {}
+    for config in args.configs:
+        try:
+            environment(config)
+        except ValueError as e:
+            print(f"Skipping {config}: {e}")
+            continue
+        print(f"Running {config} ({args.repeat}x)...", flush=True)
+        results[config] = median_runs([run_scenarios(config, args) for _ in range(args.repeat)])
+
+    if not results:
+        return 1
+    baseline = results.get("default")
+    keys = sorted({key for runs in results.values() for key in runs})
+    for scenario, concurrency in keys:
+        print(f"--- {scenario} @ concurrency {concurrency} ---")
+        for config, runs in results.items():
+            run = runs.get((scenario, concurrency))
+            if run is None:
+                continue
+            line = (
+                f"{config:<36} {run['throughput']:>8.1f} req/s  p50 {run['p50_ms']:>8.2f} ms  "
+                f"p95 {run['p95_ms']:>8.2f} ms  p99 {run['p99_ms']:>8.2f} ms"
+            )
+            before = baseline.get((scenario, concurrency)) if baseline else None
+            if before and config != "default":
+                line += (
+                    f"  throughput {run['throughput'] / before['throughput'] - 1:+.0%}"
+                    f", p95 {run['p95_ms'] / before['p95_ms'] - 1:+.0%}"
+                )
+            print(line)
+
+    if args.output:
+        report = {
+            config: [{"scenario": scenario, "concurrency": concurrency, **run} for (scenario, concurrency), run in runs.items()]
+            for config, runs in results.items()
+        }
+        with open(args.output, "w") as file:
+            json.dump({"requests": args.requests, "repeat": args.repeat, "results": report}, file, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def _csv(cast, separator=","):
+    return lambda value: [cast(item) for item in value.split(separator) if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--configs",
+        type=_csv(str, ";"),
+        default=["default", "uvloop", "eager", "gc=50000,20,100", "uvloop+eager+gc=50000,20,100"],
+    )
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 50])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--listeners", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    sys.exit(main(parser.parse_args()))
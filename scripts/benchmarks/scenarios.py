@@ -0,0 +1,629 @@
+"""
+Scenario benchmarks for the bot's hot paths.
+
+Each scenario is run at every concurrency level of the sweep, with updates
+fed through the real middleware stack and handlers against a fresh schema.
+Redis is replaced by an in-process stand-in (fakeredis) unless --redis-url
+is given. Scenarios:
+
+    start-new        /start from users the bot has never seen
+    start-returning  /start from registered users
+    balance          /balance from registered users
+    event-fanout     events published on the bus until every listener
+                     (--listeners) has handled them
+
+For each run the suite reports throughput, p50/p95/p99 latency, and from
+the SQL profiler the statements and database time per request, the largest
+update and the statements repeated within an update (N+1 patterns). Results can be written as JSON with --output and
+compared with an earlier result file with --baseline: the exit code is 1
+when a run's p95 latency or statement count grew by more than --tolerance.
+
+Usage:
+    python -m scripts.benchmarks.scenarios \
+        [--scenarios start-new,balance] [--concurrency 1,10,50] [--requests N] \
+        [--database-url URL [--reset-database]] [--redis-url URL] [--output results.json] \
+        [--baseline baseline.json] [--tolerance 0.2] [--statement-budget N]
+
+The bench drops and recreates every table of the database, so it refuses
+any database but an in-memory or temporary-directory SQLite file unless
+--reset-database is given.
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from unittest.mock import AsyncMock
+
+import redis.asyncio as redis
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, ErrorEvent, Message, Update, User as TelegramUser
+from dependency_injector import providers
+from sqlalchemy.engine import make_url
+
+from src.bot.events import event_listener
+from src.config import settings
+from src.containers import ApplicationContainer
+from src.domain.events import AchievementUnlocked
+from src.domain.models import Achievement, Base
+from src.infrastructure.database import create_db_engine
+from src.infrastructure.runtime import run as run_loop, runtime_options_from_settings
+from src.infrastructure.sql_profiler import SQLProfile, SQLProfiler, shorten_statement
+from src.main import setup_dispatcher
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ("start-new", "start-returning", "balance", "event-fanout")
+
+
+def is_scratch_database(url: str) -> bool:
+    """
+    Returns True for in-memory SQLite and SQLite files in the temporary directory.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return False
+    if url.database in (None, "", ":memory:"):
+        return True
+    temporary = os.path.realpath(tempfile.gettempdir())
+    return os.path.realpath(url.database).startswith(temporary + os.sep)
+
+
+def add_database_arguments(parser: argparse.ArgumentParser, default_name: str) -> None:
+    """
+    Adds --database-url, defaulting to `default_name` in the temporary directory, and --reset-database.
+    """
+    parser.add_argument(
+        "--database-url",
+        default=f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), default_name)}",
+    )
+    parser.add_argument(
+        "--reset-database",
+        action="store_true",
+        help="allow dropping the tables of a database that is not a temporary SQLite file",
+    )
+
+
+def check_database_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """
+    Exits with a usage error when the bench would drop the tables of a real database.
+    """
+    if not args.reset_database and not is_scratch_database(args.database_url):
+        parser.error(
+            f"{make_url(args.database_url)} is not a temporary SQLite database and "
+            "the bench drops all of its tables; pass --reset-database to run against it anyway"
+        )
+
+
+class StubSession(BaseSession):
+    """
+    Bot API session that answers every request after `latency` seconds
+    without sending it, counting the requests by method.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests: Counter = Counter()
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.requests[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return None
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+async def _reraise_errors(handler, event: ErrorEvent, data: Dict[str, Any]) -> Any:
+    """
+    Runs the error handlers, then raises the error again so the bench counts the failed update.
+    """
+    await handler(event, data)
+    raise event.exception
+
+
+class Bench:
+    """
+    The bot wired as in production, on the given database and Redis.
+
+    The dispatcher is set up by `setup_dispatcher`, the same middleware,
+    services and handlers as src/main.py, and the context analysis pipeline
+    and load shedder run in the background between `setup` and `close`.
+    Bot API requests go to a `StubSession` that answers after
+    `reply_latency` seconds.
+    """
+
+    def __init__(self, engine, redis_client, profiler: SQLProfiler, reply_latency: float = 0.0):
+        self.engine = engine
+        self.redis_client = redis_client
+        self.profiler = profiler
+        profiler.attach(engine)
+        self.container = ApplicationContainer()
+        self.container.infrastructure.db_engine.override(providers.Object(engine))
+        self.container.infrastructure.redis_client.override(providers.Object(redis_client))
+        self.session = StubSession(reply_latency)
+        self.bot = Bot(
+            "123456:bench", session=self.session, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        self.dispatcher = Dispatcher()
+        setup_dispatcher(self.container, self.dispatcher, self.bot)
+        self.dispatcher.errors.middleware(_reraise_errors)
+        self._tasks = []
+        self._user_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self.registered = []
+
+    async def setup(self, reset_database: bool = False) -> None:
+        """
+        Recreates the schema. Only drops the tables of a temporary SQLite
+        database, or of any database with `reset_database`.
+        """
+        if not reset_database and not is_scratch_database(str(self.engine.url)):
+            raise RuntimeError(f"Refusing to drop the tables of {self.engine.url}")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+        async with self.container.infrastructure.uow() as uow:
+            await uow.achievements.add(Achievement(name="First Steps", description=".", reward_points=10))
+        # Background work the handlers hand updates to
+        self._tasks.append(asyncio.create_task(self.container.services.context_pipeline().run()))
+        load_shedder = self.container.infrastructure.load_shedder()
+        if load_shedder is not None:
+            self._tasks.append(asyncio.create_task(load_shedder.run()))
+
+    async def close(self) -> None:
+        """
+        Stops the background work, then closes the group commit writer if any.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        writer = self.container.infrastructure.group_commit_writer()
+        if writer is not None:
+            await writer.close()
+
+    def update(self, user_id: int, text: str) -> Update:
+        user = TelegramUser(id=user_id, is_bot=False, first_name=f"Bench{user_id}")
+        update_id = next(self._update_ids)
+        message = Message(
+            message_id=update_id,
+            chat=Chat(id=user_id, type="private"),
+            from_user=user,
+            text=text,
+            date=datetime.now(),
+        )
+        return Update(update_id=update_id, message=message)
+
+    def new_users(self, count: int) -> list:
+        return [next(self._user_ids) for _ in range(count)]
+
+    async def register(self, count: int, concurrency: int) -> None:
+        """
+        Makes sure at least `count` users went through /start, untimed.
+        """
+        missing = self.new_users(max(count - len(self.registered), 0))
+        await self.feed([(user_id, "/start") for user_id in missing], concurrency)
+        self.registered += missing
+
+    async def feed(self, requests: list, concurrency: int) -> "RunStats":
+        """
+        Feeds (user_id, text) updates and returns their stats.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        stats = RunStats(self.profiler)
+
+        async def worker(user_id: int, text: str):
+            async with semaphore:
+                with self.profiler.profile(text) as profile:
+                    start = time.perf_counter()
+                    failed = False
+                    try:
+                        await self.dispatcher.feed_update(self.bot, self.update(user_id, text))
+                    except Exception:
+                        failed = True
+                    elapsed = time.perf_counter() - start
+                stats.add(elapsed, text, failed, profile)
+
+        await asyncio.gather(*(worker(user_id, text) for user_id, text in requests))
+        return stats
+
+    async def fanout(self, count: int, concurrency: int, listeners: int):
+        """
+        Publishes `count` events and waits for every listener to handle each.
+        """
+        publisher = self.container.infrastructure.event_publisher()
+        pending = {}
+
+        async def delivered(user_id, achievement_name, reward_points):
+            waiter = pending.get(user_id)
+            if waiter is not None:
+                waiter[1] -= 1
+                if waiter[1] == 0:
+                    waiter[0].set_result(time.perf_counter())
+
+        service_provider = SimpleNamespace(
+            onboarding_service=AsyncMock(),
+            notification_service=SimpleNamespace(send_achievement_unlocked_notification=delivered),
+        )
+        tasks = [asyncio.create_task(event_listener(self.redis_client, service_provider)) for _ in range(listeners)]
+        # Let every listener subscribe before publishing
+        await asyncio.sleep(0.2)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        stats = RunStats(self.profiler)
+
+        async def worker(user_id: int):
+            async with semaphore:
+                done = asyncio.get_running_loop().create_future()
+                pending[user_id] = [done, listeners]
+                start = time.perf_counter()
+                try:
+                    await publisher.publish("user_events", AchievementUnlocked(
+                        payload={"user_id": user_id, "achievement_name": "Bench", "reward_points": 1}
+                    ))
+                    stats.add(await asyncio.wait_for(done, timeout=10) - start, "event")
+                except Exception:
+                    stats.add_failure()
+                pending.pop(user_id, None)
+
+        try:
+            await asyncio.gather(*(worker(user_id) for user_id in self.new_users(count)))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return stats
+
+    async def run(self, scenario: str, requests: int, concurrency: int, listeners: int) -> dict:
+        if scenario == "start-new":
+            batch = [(user_id, "/start") for user_id in self.new_users(requests)]
+        elif scenario in ("start-returning", "balance"):
+            await self.register(requests, concurrency)
+            text = "/start" if scenario == "start-returning" else "/balance"
+            batch = [(user_id, text) for user_id in self.registered[:requests]]
+
+        start = time.perf_counter()
+        if scenario == "event-fanout":
+            stats = await self.fanout(requests, concurrency, listeners)
+        else:
+            stats = await self.feed(batch, concurrency)
+        duration = time.perf_counter() - start
+        return summarize(scenario, concurrency, stats, duration)
+
+
+class Reservoir:
+    """
+    A uniform sample of at most `size` values of a stream (algorithm R),
+    for quantiles in bounded memory. Exact up to `size` values.
+    """
+
+    def __init__(self, size: int = 10_000, seed: int = 1):
+        self._size = size
+        self._values: List[float] = []
+        self._rng = random.Random(seed)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.max = max(self.max, value)
+        if len(self._values) < self._size:
+            self._values.append(value)
+            return
+        index = self._rng.randrange(self.count)
+        if index < self._size:
+            self._values[index] = value
+
+    def quantiles(self, *percents: int) -> List[float]:
+        if len(self._values) < 2:
+            return [self._values[0] if self._values else 0.0] * len(percents)
+        cuts = statistics.quantiles(self._values, n=100, method="inclusive")
+        return [cuts[percent - 1] for percent in percents]
+
+
+class RunStats:
+    """
+    Running totals of the updates of a run: counts and sums, the statements
+    repeated within an update, the `slowest` updates and a reservoir of
+    latencies. No update's profile is kept.
+    """
+
+    def __init__(self, profiler: SQLProfiler, slowest: int = 5):
+        self._profiler = profiler
+        self._slowest_size = slowest
+        self._slowest: List[Tuple[float, int, str]] = []
+        self.latencies = Reservoir()
+        self.requests = 0
+        self.errors = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.max_statements = 0
+        self.over_budget = 0
+        # Statement -> the most times one update sent it
+        self.repeated: Dict[str, int] = {}
+
+    def add(self, latency: float, label: str, failed: bool = False, profile: Optional[SQLProfile] = None) -> None:
+        self.requests += 1
+        self.errors += failed
+        self.latencies.add(latency)
+        entry = (latency, self.requests, label)
+        if len(self._slowest) < self._slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+        if profile is None:
+            return
+        self.statements += profile.statements
+        self.db_seconds += profile.seconds
+        self.max_statements = max(self.max_statements, profile.statements)
+        self.over_budget += profile.statements > self._profiler.statement_budget
+        for statement, count in profile.repeated(self._profiler.repeat_threshold):
+            statement = shorten_statement(statement)
+            self.repeated[statement] = max(self.repeated.get(statement, 0), count)
+
+    def add_failure(self) -> None:
+        """
+        Counts an update that failed before its latency could be measured.
+        """
+        self.requests += 1
+        self.errors += 1
+
+    def slowest(self) -> List[Tuple[float, int, str]]:
+        return sorted(self._slowest, reverse=True)
+
+
+class Scheduled(NamedTuple):
+    """
+    An update to feed `due` seconds after the start of a run.
+    """
+    due: float
+    label: str
+    update: Update
+    # Anything the caller's `on_start` hook needs, such as a simulated time
+    context: Any = None
+
+
+async def drive(
+    bench: Bench,
+    schedule: Iterable[Scheduled],
+    concurrency: int,
+    paced: bool,
+    name: str,
+    on_start: Optional[Callable[[Scheduled], None]] = None,
+) -> list:
+    """
+    Feeds the scheduled updates through `concurrency` workers. Returns the
+    runs, the overall one (`name`) first and then one per label.
+
+    The schedule is read lazily and handed to the workers through a queue
+    of `concurrency` slots, and each run's stats are aggregated as updates
+    finish, so memory does not grow with the length of the schedule. With
+    `paced`, each update is queued when it is due and the overall run
+    reports how late updates started against the schedule; otherwise they
+    are fed back to back. Failed updates are counted by exception type, and
+    the first traceback of each type is logged.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    results: Dict[str, RunStats] = {}
+    lateness = Reservoir()
+    errors: Counter = Counter()
+    started = time.perf_counter()
+
+    async def produce():
+        for item in schedule:
+            if paced:
+                delay = started + item.due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if paced:
+                lateness.add(time.perf_counter() - started - item.due)
+            if on_start is not None:
+                on_start(item)
+            with bench.profiler.profile(item.label) as profile:
+                start = time.perf_counter()
+                failed = False
+                try:
+                    await bench.dispatcher.feed_update(bench.bot, item.update)
+                except Exception as e:
+                    error = type(e).__name__
+                    if error not in errors:
+                        logger.warning("%s update failed with %s", item.label, error, exc_info=True)
+                    errors[error] += 1
+                    failed = True
+                elapsed = time.perf_counter() - start
+            for key in (name, item.label):
+                if key not in results:
+                    results[key] = RunStats(bench.profiler)
+                results[key].add(elapsed, item.label, failed, profile)
+
+    workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        await produce()
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+    duration = time.perf_counter() - started
+
+    runs = [summarize(key, concurrency, stats, duration) for key, stats in results.items()]
+    if runs and errors:
+        runs[0]["errors_by_type"] = dict(errors.most_common())
+    if runs and lateness.count:
+        (p95,) = lateness.quantiles(95)
+        runs[0]["late_p95_ms"] = p95 * 1000
+        runs[0]["late_max_ms"] = lateness.max * 1000
+    return runs
+
+
+def summarize(scenario: str, concurrency: int, stats: RunStats, duration: float) -> dict:
+    p50, p95, p99 = stats.latencies.quantiles(50, 95, 99)
+    requests = stats.requests
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": stats.errors,
+        "throughput": requests / duration if duration else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "statements_per_request": stats.statements / requests if requests else 0.0,
+        "db_ms_per_request": stats.db_seconds * 1000 / requests if requests else 0.0,
+        "max_statements": stats.max_statements,
+        "over_statement_budget": stats.over_budget,
+        "repeated_statements": stats.repeated,
+        "slowest": [{"label": label, "ms": latency * 1000} for latency, _, label in stats.slowest()],
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a description of every run that regressed against the baseline.
+    """
+    previous = {(run["scenario"], run["concurrency"]): run for run in baseline.get("results", [])}
+    regressions = []
+    for run in results:
+        before = previous.get((run["scenario"], run["concurrency"]))
+        if before is None:
+            continue
+        for metric in ("p95_ms", "statements_per_request"):
+            if run[metric] > before[metric] * (1 + tolerance) and run[metric] - before[metric] > 1e-9:
+                regressions.append(
+                    f"{run['scenario']} @ {run['concurrency']}: {metric} "
+                    f"{before[metric]:.2f} -> {run[metric]:.2f}"
+                )
+    return regressions
+
+
+def print_run(run: dict) -> None:
+    print(
+        f"{run['scenario']:<16} c={run['concurrency']:<4} {run['throughput']:>8.1f} req/s  "
+        f"p50 {run['p50_ms']:>8.2f} ms  p95 {run['p95_ms']:>8.2f} ms  p99 {run['p99_ms']:>8.2f} ms  "
+        f"{run['statements_per_request']:>5.1f} stmt/req "
+        f"({run['db_ms_per_request']:.2f} ms, max {run['max_statements']})"
+        + (f"  {run['errors']} errors" if run["errors"] else "")
+        + (f"  {run['over_statement_budget']} over budget" if run["over_statement_budget"] else "")
+    )
+    for error, count in run.get("errors_by_type", {}).items():
+        print(f"    {count} failed with {error}")
+    for statement, count in run["repeated_statements"].items():
+        print(f"    repeated {count}x: {statement}")
+    if run["slowest"]:
+        print("    slowest: " + ", ".join(f"{slow['label']} {slow['ms']:.1f} ms" for slow in run["slowest"]))
+
+
+async def main(args) -> int:
+    engine = create_db_engine(
+        args.database_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        sqlite_tuning=settings.SQLITE_TUNING,
+    )
+    if args.redis_url:
+        redis_client = redis.from_url(args.redis_url)
+    else:
+        from fakeredis import FakeAsyncRedis
+        redis_client = FakeAsyncRedis()
+
+    profiler = SQLProfiler(statement_budget=args.statement_budget, repeat_threshold=args.repeat_threshold)
+    bench = Bench(engine, redis_client, profiler)
+    await bench.setup(args.reset_database)
+    print(f"--- Scenarios ({args.requests} requests per run, {engine.dialect.name}) ---")
+    results = []
+    try:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                run = await bench.run(scenario, args.requests, concurrency, args.listeners)
+                print_run(run)
+                results.append(run)
+    finally:
+        await bench.close()
+        await engine.dispose()
+        await redis_client.aclose()
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "database": engine.dialect.name,
+            "redis": "real" if args.redis_url else "fakeredis",
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "runtime": runtime_options_from_settings(settings).describe(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print(f"--- Regressions against {args.baseline} (tolerance {args.tolerance:.0%}) ---")
+            for regression in regressions:
+                print(regression)
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+def _csv(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=_csv(str), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--listeners", type=int, default=3)
+    add_database_arguments(parser, "diana_scenarios.db")
+    parser.add_argument("--redis-url")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--statement-budget", type=int, default=settings.SQL_PROFILER_STATEMENT_BUDGET)
+    parser.add_argument("--repeat-threshold", type=int, default=settings.SQL_PROFILER_REPEAT_THRESHOLD)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    check_database_arguments(parser, args)
+    # Runs on the loop configured by the RUNTIME_* settings
+    sys.exit(run_loop(main(args), runtime_options_from_settings(settings)))
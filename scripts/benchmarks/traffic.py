@@ -0,0 +1,360 @@
+"""
+Synthetic traffic shaped like real usage, for capacity testing.
+
+Updates come from a population of --users whose activity follows a Zipf
+distribution (exponent --zipf: a few users send most updates, the rest
+form a long tail), with a command mix (--mix), a daily cycle peaking at
+--peak-hour, and a burst of returning users right after each UTC midnight
+(--rollover-share of the previous day's users within --rollover-minutes),
+when every user's first update of the day extends or resets their streak.
+A user's first update is always /start.
+
+The traffic covers --days of simulated time starting at midnight, fed
+through the real middleware stack and handlers on the scenario bench,
+--compression times faster than real time (0: as fast as possible), at
+most --concurrency at a time. Updates are generated as they are fed, so
+long runs do not hold the traffic in memory. The clock seen by
+update_daily_streak follows the simulated time, so day rollovers happen
+within the run. Caches are off unless enabled with --cache,
+--balance-cache and --leaderboard.
+
+The report covers latency, throughput and SQL statements per command,
+failed updates by exception type, how late updates started against the
+schedule, cache hit rates, and the streaks the run built.
+--write-recording saves the traffic as it is generated, in the update
+recorder's format, for scripts/benchmarks/replay.py.
+
+Usage:
+    python -m scripts.benchmarks.traffic \
+        [--users 10000] [--zipf 1.2] [--rate 20] [--days 2] [--compression 1440] \
+        [--mix start=0.15,balance=0.45,top=0.1,callback=0.3] \
+        [--cache] [--balance-cache] [--leaderboard] [--output results.json] \
+        [--database-url URL [--reset-database]]
+
+The tables of the database are dropped and recreated first; as with the
+scenarios, anything but a temporary SQLite database needs --reset-database.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+from unittest.mock import patch
+
+import numpy as np
+import redis.asyncio as redis
+from aiogram.types import Update
+from sqlalchemy import func, select
+
+from scripts.benchmarks.scenarios import (
+    Bench, Scheduled, add_database_arguments, check_database_arguments, drive, print_run,
+)
+from src.config import settings
+from src.domain.models import User
+from src.infrastructure.database import create_db_engine
+from src.infrastructure.sql_profiler import SQLProfiler
+
+COMMANDS = ("start", "balance", "top", "callback")
+CALLBACK_DATA = ("explore", "challenges", "social", "actions", "journal", "help")
+
+
+class TrafficModel:
+    """
+    Generates a stream of (simulated time, user id, command) tuples.
+
+    Arrivals are a Poisson process whose rate follows the daily cycle,
+    drawn a minute at a time; each arrival's user is drawn from the Zipf
+    weights and its command from the mix.
+    """
+
+    def __init__(
+        self,
+        users: int,
+        zipf: float = 1.2,
+        rate: float = 20.0,
+        mix: Optional[Dict[str, float]] = None,
+        diurnal_amplitude: float = 0.6,
+        peak_hour: float = 20.0,
+        rollover_share: float = 0.3,
+        rollover_minutes: int = 5,
+        seed: int = 1,
+    ):
+        self._rng = np.random.default_rng(seed)
+        mix = mix or {"start": 0.15, "balance": 0.45, "top": 0.1, "callback": 0.3}
+        self._commands = list(mix)
+        self._command_weights = np.array([mix[command] for command in self._commands], dtype=float)
+        self._command_weights /= self._command_weights.sum()
+        # Rank 1 is the most active user; ids are shuffled so activity does not follow signup order
+        weights = np.arange(1, users + 1, dtype=float) ** -zipf
+        self._user_cdf = np.cumsum(weights / weights.sum())
+        self._user_ids = self._rng.permutation(users) + 1
+        self._rate = rate
+        self._amplitude = diurnal_amplitude
+        self._peak_hour = peak_hour
+        self._rollover_share = rollover_share
+        self._rollover_minutes = rollover_minutes
+
+    def rate_at(self, moment: datetime) -> float:
+        """
+        Returns the mean updates per second at a moment of the day.
+        """
+        hour = moment.hour + moment.minute / 60
+        return self._rate * (1 + self._amplitude * math.cos(2 * math.pi * (hour - self._peak_hour) / 24))
+
+    def stream(self, start: datetime, days: float) -> Iterator[Tuple[datetime, int, str]]:
+        seen = set()
+        active_today = set()
+        burst = {}
+        for minute in range(int(days * 24 * 60)):
+            moment = start + timedelta(minutes=minute)
+            if moment.hour == 0 and moment.minute == 0:
+                burst = self._rollover(active_today)
+                active_today = set()
+
+            count = self._rng.poisson(self.rate_at(moment) * 60)
+            ranks = np.minimum(np.searchsorted(self._user_cdf, self._rng.random(count)), len(self._user_ids) - 1)
+            users = list(self._user_ids[ranks]) + burst.pop(minute % 1440, [])
+            offsets = self._rng.uniform(0, 60, size=len(users))
+            commands = self._rng.choice(self._commands, size=len(users), p=self._command_weights)
+            for offset, user_id, command in sorted(zip(offsets, users, commands)):
+                user_id = int(user_id)
+                if user_id not in seen:
+                    seen.add(user_id)
+                    command = "start"
+                active_today.add(user_id)
+                yield moment + timedelta(seconds=float(offset)), user_id, str(command)
+
+    def _rollover(self, active: set) -> Dict[int, list]:
+        """
+        Picks the previous day's users that come back right after midnight,
+        spread over the first `rollover_minutes` minutes.
+        """
+        if not active:
+            return {}
+        returning = self._rng.choice(sorted(active), size=int(len(active) * self._rollover_share), replace=False)
+        minutes = self._rng.integers(0, self._rollover_minutes, size=len(returning))
+        burst: Dict[int, list] = {}
+        for user_id, minute in zip(returning, minutes):
+            burst.setdefault(int(minute), []).append(int(user_id))
+        return burst
+
+
+def build_update(update_id: int, moment: datetime, user_id: int, command: str, rng: np.random.Generator) -> dict:
+    sender = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "language_code": "es"}
+    chat = {"id": user_id, "type": "private"}
+    date = int(moment.timestamp())
+    if command == "callback":
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": sender,
+                "chat_instance": str(user_id),
+                "data": str(rng.choice(CALLBACK_DATA)),
+                "message": {"message_id": update_id, "date": date, "chat": chat},
+            },
+        }
+    text = f"/{command}"
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": date,
+            "chat": chat,
+            "from": sender,
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        },
+    }
+
+
+# The simulated time of the update being handled, for update_daily_streak
+_simulated_now: ContextVar[Optional[datetime]] = ContextVar("simulated_now", default=None)
+
+
+class SimulatedDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return _simulated_now.get() or datetime.utcnow()
+
+
+def schedule(
+    model: TrafficModel,
+    start: datetime,
+    days: float,
+    compression: float,
+    seed: int,
+    recording: Optional[TextIO] = None,
+    users: Optional[set] = None,
+) -> Iterator[Scheduled]:
+    """
+    Yields the model's traffic as updates, each due at its simulated time
+    divided by `compression`, or at once when it is 0, with the simulated
+    time as context. Each update is written to `recording` and its user
+    added to `users` as it is generated.
+    """
+    rng = np.random.default_rng(seed)
+    for update_id, (moment, user_id, command) in enumerate(model.stream(start, days), 1):
+        data = build_update(update_id, moment, user_id, command, rng)
+        if recording is not None:
+            recording.write(json.dumps({"t": moment.timestamp(), "u": data}, separators=(",", ":")) + "\n")
+        if users is not None:
+            users.add(user_id)
+        due = (moment - start).total_seconds() / compression if compression else 0.0
+        label = f"/{command}" if command != "callback" else "callback_query"
+        yield Scheduled(due, label, Update.model_validate(data), moment)
+
+
+def _set_simulated_now(item: Scheduled) -> None:
+    _simulated_now.set(item.context)
+
+
+def cache_report(bench: Bench) -> dict:
+    report = {}
+    cache = bench.container.infrastructure.cache()
+    if cache is not None:
+        stats = dict(cache.stats)
+        lookups = stats.get("local_hits", 0) + stats.get("redis_hits", 0) + stats.get("loads", 0)
+        stats["hit_rate"] = (lookups - stats.get("loads", 0)) / lookups if lookups else 0.0
+        report["row_cache"] = stats
+    balance_cache = bench.container.infrastructure.balance_cache()
+    if balance_cache is not None:
+        stats = dict(balance_cache.stats)
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = stats.get("hits", 0) / lookups if lookups else 0.0
+        report["balance_cache"] = stats
+    return report
+
+
+async def streak_report(bench: Bench) -> dict:
+    async with bench.engine.connect() as connection:
+        users, streaks, longest = (await connection.execute(
+            select(func.count(), func.count().filter(User.current_streak > 1), func.max(User.max_streak))
+        )).one()
+    return {"users": users, "users_on_a_streak": int(streaks or 0), "longest_streak": longest or 0}
+
+
+async def main(args) -> int:
+    # Set before the container builds anything, which reads settings lazily
+    settings.CACHE_ENABLED = args.cache
+    settings.WALLET_BALANCE_CACHE = args.balance_cache
+    settings.LEADERBOARD_ENABLED = args.leaderboard
+
+    model = TrafficModel(
+        args.users, args.zipf, args.rate, args.mix, args.diurnal_amplitude, args.peak_hour,
+        args.rollover_share, args.rollover_minutes, args.seed,
+    )
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    engine = create_db_engine(
+        args.database_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        sqlite_tuning=settings.SQLITE_TUNING,
+    )
+    if args.redis_url:
+        redis_client = redis.from_url(args.redis_url)
+    else:
+        from fakeredis import FakeAsyncRedis
+        redis_client = FakeAsyncRedis()
+
+    bench = Bench(engine, redis_client, SQLProfiler())
+    await bench.setup(args.reset_database)
+    pace = f"{args.compression:g}x real time" if args.compression else "as fast as possible"
+    print(
+        f"--- {args.days:g} simulated days of traffic from {args.users} users, {pace} "
+        f"at concurrency {args.concurrency} ({engine.dialect.name}) ---"
+    )
+    distinct = set()
+    recording = open(args.write_recording, "w") if args.write_recording else None
+    try:
+        traffic = schedule(model, start, args.days, args.compression, args.seed, recording, distinct)
+        with patch("src.services.gamification_service.datetime", SimulatedDatetime):
+            runs = await drive(
+                bench, traffic, args.concurrency, bool(args.compression), "traffic", on_start=_set_simulated_now
+            )
+        caches = cache_report(bench)
+        streaks = await streak_report(bench)
+    finally:
+        if recording is not None:
+            recording.close()
+        await bench.close()
+        await engine.dispose()
+        await redis_client.aclose()
+
+    if recording is not None:
+        print(f"Traffic written to {args.write_recording}")
+    print(f"{runs[0]['requests'] if runs else 0} updates from {len(distinct)} users")
+    for run in runs:
+        print_run(run)
+    if "late_p95_ms" in runs[0]:
+        print(
+            f"Started late against the schedule: p95 {runs[0]['late_p95_ms']:.2f} ms, "
+            f"max {runs[0]['late_max_ms']:.2f} ms"
+        )
+    for name, stats in caches.items():
+        print(f"{name}: hit rate {stats['hit_rate']:.1%} {({k: v for k, v in stats.items() if k != 'hit_rate'})}")
+    print(
+        f"streaks: {streaks['users_on_a_streak']} of {streaks['users']} users on a streak, "
+        f"longest {streaks['longest_streak']} days"
+    )
+
+    if args.output:
+        report = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "model": {key: value for key, value in vars(args).items() if key not in ("output", "write_recording")},
+                "database": engine.dialect.name,
+                "redis": "real" if args.redis_url else "fakeredis",
+                "python": platform.python_version(),
+            },
+            "results": runs,
+            "caches": caches,
+            "streaks": streaks,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def _mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        command, _, weight = item.partition("=")
+        if command not in COMMANDS:
+            raise argparse.ArgumentTypeError(f"unknown command {command!r}, expected one of {', '.join(COMMANDS)}")
+        mix[command] = float(weight)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--rate", type=float, default=20.0, help="mean updates per second over a day")
+    parser.add_argument("--mix", type=_mix, default=None)
+    parser.add_argument("--diurnal-amplitude", type=float, default=0.6)
+    parser.add_argument("--peak-hour", type=float, default=20.0)
+    parser.add_argument("--rollover-share", type=float, default=0.3)
+    parser.add_argument("--rollover-minutes", type=int, default=5)
+    parser.add_argument("--days", type=float, default=2.0)
+    parser.add_argument("--compression", type=float, default=1440.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--balance-cache", action="store_true")
+    parser.add_argument("--leaderboard", action="store_true")
+    add_database_arguments(parser, "diana_traffic.db")
+    parser.add_argument("--redis-url")
+    parser.add_argument("--write-recording")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    check_database_arguments(parser, args)
+    sys.exit(asyncio.run(main(args)))
@@ -1,7 +1,10 @@
 import asyncio
 import json
 import logging
+from typing import Optional
 import redis.asyncio as redis
+from src.infrastructure.event_tracing import EventTrace, EventTracer
+from src.infrastructure.load_shedding import LoadShedder
 from src.services.onboarding_service import OnboardingService
 from src.services.notification_service import NotificationService
 from src.domain.events import UserRegistered, AchievementUnlocked
@@ -11,9 +14,28 @@ logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
+# Events whose notifications wait while the event loop is behind
+NON_URGENT_EVENTS = {"achievement_unlocked"}
 
-async def _handle_event(event_name: str, payload: dict, container):
+async def _handle_event(
+    event_name: str,
+    payload: dict,
+    container,
+    trace: Optional[EventTrace] = None,
+    load_shedder: Optional[LoadShedder] = None,
+):
     """Helper function to dispatch events to services with retry logic."""
+    if load_shedder is not None and event_name in NON_URGENT_EVENTS:
+        await load_shedder.calm(event_name)
+    if trace is not None:
+        trace.started()
+    outcome = await _dispatch_event(event_name, payload, container, trace)
+    if trace is not None:
+        trace.finished(outcome)
+
+
+async def _dispatch_event(event_name: str, payload: dict, container, trace: Optional[EventTrace]) -> str:
+    """Runs the event's handler, retrying on errors. Returns the outcome."""
     onboarding_service = container.onboarding_service
     notification_service = container.notification_service
 
@@ -22,39 +44,48 @@ async def _handle_event(event_name: str, payload: dict, container):
             if event_name == "user_registered":
                 user_id = payload.get("user_id")
                 if user_id:
-                    logger.info(f"Processing UserRegistered event for user_id: {user_id}")
+                    logger.info("Processing UserRegistered event for user_id: %s", user_id)
                     await onboarding_service.send_welcome_message(user_id)
-                    return  # Success
+                    return "ok"
 
             elif event_name == "achievement_unlocked":
                 user_id = payload.get("user_id")
                 achievement_name = payload.get("achievement_name")
                 reward_points = payload.get("reward_points")
                 if user_id and achievement_name:
-                    logger.info(f"Processing AchievementUnlocked event for user {user_id}")
+                    logger.info("Processing AchievementUnlocked event for user %s", user_id)
                     await notification_service.send_achievement_unlocked_notification(
                         user_id=user_id,
                         achievement_name=achievement_name,
                         reward_points=reward_points,
                     )
-                    return  # Success
+                    return "ok"
             else:
-                return # Unknown event, do not retry
+                return "ignored"  # Unknown event, do not retry
 
         except Exception as e:
             logger.error(
-                f"Attempt {attempt + 1}/{MAX_RETRIES} failed for event {event_name}: {e}",
-                exc_info=True
+                "Attempt %d/%d failed for event %s: %s", attempt + 1, MAX_RETRIES, event_name, e, exc_info=True
             )
             if attempt < MAX_RETRIES - 1:
+                if trace is not None:
+                    trace.retried()
                 await asyncio.sleep(RETRY_DELAY)
             else:
-                logger.error(f"Event {event_name} failed after {MAX_RETRIES} attempts.")
+                logger.error("Event %s failed after %d attempts.", event_name, MAX_RETRIES)
+    return "failed"
 
 
-async def event_listener(redis_client: redis.Redis, service_provider):
+async def event_listener(
+    redis_client: redis.Redis,
+    service_provider,
+    tracer: Optional[EventTracer] = None,
+    load_shedder: Optional[LoadShedder] = None,
+):
     """
     Listens for events on Redis pub/sub and triggers corresponding services.
+    With a tracer, each event is traced from publish until handled. With a
+    load shedder, non-urgent events wait while the event loop is behind.
     """
     pubsub = redis_client.pubsub()
     await pubsub.subscribe("user_events")
@@ -72,8 +103,12 @@ async def event_listener(redis_client: redis.Redis, service_provider):
             payload = data.get("payload", {})
 
             if event_name:
+                trace = (
+                    tracer.received(event_name, data.get("event_id"), data.get("published_at"))
+                    if tracer is not None else None
+                )
                 # Fire and forget: run handler in a background task
-                asyncio.create_task(_handle_event(event_name, payload, service_provider))
+                asyncio.create_task(_handle_event(event_name, payload, service_provider, trace, load_shedder))
 
         except json.JSONDecodeError:
             logger.warning("Could not decode event message: %s", message.get("data"))
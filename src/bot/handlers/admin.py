@@ -0,0 +1,107 @@
+import asyncio
+import html
+import logging
+from typing import List, Optional
+from aiogram import flags, types
+from aiogram.filters import CommandObject
+from aiogram.types import FSInputFile
+from src.domain.models import User
+from src.infrastructure.runtime_profiler import RuntimeProfiler, SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+PROFILE_USAGE = (
+    "Usage:\n"
+    "/profile cpu [seconds] - sample the event loop and send collapsed stacks\n"
+    "/profile heap start - start tracing allocations\n"
+    "/profile heap snapshot - show allocation growth since the last snapshot\n"
+    "/profile heap stop - stop tracing allocations"
+)
+DEFAULT_PROFILE_SECONDS = 10
+# Telegram's limit, counted on the text after HTML entities are parsed
+CAPTION_LIMIT = 1024
+
+# Running CPU profiles, kept so they are not garbage collected
+_profiles = set()
+
+
+def _caption(lines: List[str]) -> str:
+    """
+    Returns the lines as an HTML caption, cut to the caption limit before
+    escaping so no entity is split and escapes do not count against it.
+    """
+    return html.escape("\n".join(lines)[:CAPTION_LIMIT])
+
+
+async def _send_cpu_profile(message: types.Message, profiler: RuntimeProfiler, seconds: float) -> None:
+    try:
+        path, samples = await profiler.cpu.profile(seconds)
+    except Exception:
+        logger.error("CPU profile failed", exc_info=True)
+        await message.answer("The CPU profile failed, see the logs.")
+        return
+    lines = [f"{sum(samples.values())} samples. Top frames:"]
+    lines += [f"{share:.0%} {frame}" for frame, share in SamplingProfiler.top_frames(samples, limit=5)]
+    await message.answer_document(FSInputFile(path), caption=_caption(lines))
+
+
+@flags.read_only
+async def profile_handler(
+    message: types.Message,
+    user: User,
+    command: CommandObject,
+    runtime_profiler: Optional[RuntimeProfiler] = None,
+):
+    """
+    This handler will be called when an admin sends `/profile`.
+    It profiles the running bot on demand: CPU samples of the event loop
+    for a number of seconds, or tracemalloc snapshots of heap growth.
+    """
+    if not user.is_admin:
+        return
+    if runtime_profiler is None:
+        await message.reply("Profiling is disabled.")
+        return
+
+    args = (command.args or "").split()
+    target = args[0] if args else ""
+
+    if target == "cpu":
+        if runtime_profiler.cpu.running:
+            await message.reply("A CPU profile is already running.")
+            return
+        try:
+            seconds = float(args[1]) if len(args) > 1 else DEFAULT_PROFILE_SECONDS
+        except ValueError:
+            await message.reply(PROFILE_USAGE)
+            return
+        # Profile in the background so this update, and its session, finish now
+        task = asyncio.create_task(_send_cpu_profile(message, runtime_profiler, seconds))
+        _profiles.add(task)
+        task.add_done_callback(_profiles.discard)
+        await message.reply(f"Profiling the event loop for {seconds:g}s…")
+
+    elif target == "heap" and len(args) > 1 and args[1] == "start":
+        # Takes the baseline snapshot, which walks every traced allocation
+        await asyncio.to_thread(runtime_profiler.heap.start)
+        await message.reply("Heap tracing started.")
+
+    elif target == "heap" and len(args) > 1 and args[1] == "snapshot":
+        try:
+            path, diff = await asyncio.to_thread(runtime_profiler.heap.snapshot)
+        except RuntimeError as e:
+            await message.reply(str(e))
+            return
+        lines = ["Allocation growth since the last snapshot:"]
+        lines += [
+            f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks) {stat.traceback}"
+            for stat in diff
+        ]
+        await message.answer_document(FSInputFile(path), caption=_caption(lines))
+
+    elif target == "heap" and len(args) > 1 and args[1] == "stop":
+        runtime_profiler.heap.stop()
+        await message.reply("Heap tracing stopped.")
+
+    else:
+        await message.reply(PROFILE_USAGE)
@@ -1,10 +1,18 @@
-from aiogram import types
+import html
+from typing import Optional
+from aiogram import flags, types
 from aiogram.filters import CommandStart
 from src.bot.ui.keyboards import DynamicKeyboardFactory
+from src.bot.ui.render_cache import RenderCache
+from src.infrastructure.balance_cache import WalletBalanceCache
+from src.infrastructure.leaderboard import Leaderboard, LeaderboardMetric
+from src.infrastructure.load_shedding import LoadLevel, LoadShedder
 from src.domain.models import User, UserProfile
 from src.services.gamification_service import GamificationService
 from src.services.context_service import ContextService
+from src.services.context_pipeline import ContextAnalysisPipeline
 from src.services.personalization_service import PersonalizationService
+from src.services.user_service import UserContext
 from src.infrastructure.uow import IUnitOfWork
 
 
@@ -15,41 +23,122 @@ async def start_handler(
     gamification_service: GamificationService,
     context_service: ContextService,
     personalization_service: PersonalizationService,
+    render_cache: Optional[RenderCache] = None,
+    context_pipeline: Optional[ContextAnalysisPipeline] = None,
+    user_context: Optional[UserContext] = None,
+    load_shedder: Optional[LoadShedder] = None,
 ):
     """
     This handler will be called when user sends `/start` command.
     It provides a personalized experience based on user context.
+    When the event loop falls behind, the context analysis and the
+    achievement check are skipped; the reply uses the stored profile.
     """
-    # Get or create user profile
-    profile = await uow.user_profiles.get(user.id)
+    # Get or create user profile, unless it was loaded with the user
+    profile = user_context.profile if user_context is not None else None
+    if profile is None:
+        profile = await uow.user_profiles.get(user.id)
     if not profile:
         profile = UserProfile(user_id=user.id)
         await uow.user_profiles.add(profile)
 
-    # 1. Analyze context
-    await context_service.detect_user_mood(profile)
-    await context_service.classify_user_archetype(profile)
-    await context_service.update_engagement_score(profile)
+    # 1. Analyze context. With a pipeline the reply uses the last stored
+    # profile and the analysis is written back in the background.
+    if load_shedder is None or not load_shedder.skip("context_analysis"):
+        if context_pipeline is not None:
+            context_pipeline.submit(user.id, message.text)
+        else:
+            await context_service.detect_user_mood(profile)
+            await context_service.classify_user_archetype(profile)
+            await context_service.update_engagement_score(profile)
 
     # 2. Generate personalized content
-    keyboard_factory = DynamicKeyboardFactory()
-    keyboard = keyboard_factory.create_main_menu(profile)
-    adaptive_message = await personalization_service.generate_adaptive_message(profile)
+    if render_cache is not None:
+        language_code = message.from_user.language_code if message.from_user else None
+        adaptive_message, keyboard = render_cache.get_for_profile(profile, language_code)
+    else:
+        keyboard_factory = DynamicKeyboardFactory()
+        keyboard = keyboard_factory.create_main_menu(profile)
+        adaptive_message = await personalization_service.generate_adaptive_message(profile)
 
-    # 3. Try to unlock the "First Steps" achievement
-    await gamification_service.unlock_achievement(uow, user.id, "First Steps")
+    # 3. Try to unlock the "First Steps" achievement. Skipped under load,
+    # it is unlocked on a later /start.
+    if load_shedder is None or not load_shedder.skip("achievement_check", at=LoadLevel.DEFER):
+        await gamification_service.unlock_achievement(uow, user.id, "First Steps")
 
     await message.reply(adaptive_message, reply_markup=keyboard)
 
 
+@flags.read_only
 async def balance_handler(
     message: types.Message,
     user: User,
     uow: IUnitOfWork,
     gamification_service: GamificationService,
+    user_context: Optional[UserContext] = None,
+    balance_cache: Optional[WalletBalanceCache] = None,
 ):
     """
-    This handler will be called when user sends `/balance` command
+    This handler will be called when user sends `/balance` command.
+    It only reads the wallet, so it can be served from a read replica.
+    With a balance cache the balance is usually read from Redis.
     """
-    wallet = await gamification_service.get_wallet_by_user_id(uow, user.id)
-    await message.reply(f"Your current balance is: {wallet.balance} Besitos 💋")
+    wallet = user_context.wallet if user_context is not None else None
+    if wallet is not None:
+        balance = wallet.balance
+    elif balance_cache is not None:
+        balance = await gamification_service.get_balance(uow, user.id)
+    else:
+        wallet = await gamification_service.get_wallet_by_user_id(uow, user.id)
+        balance = wallet.balance
+    await message.reply(f"Your current balance is: {balance} Besitos 💋")
+
+
+@flags.read_only
+async def leaderboard_handler(
+    message: types.Message,
+    user: User,
+    uow: IUnitOfWork,
+    leaderboard: Optional[Leaderboard] = None,
+):
+    """
+    This handler will be called when user sends `/top` command.
+    It shows the top balances and the user's own position.
+    """
+    if leaderboard is None:
+        await message.reply("The leaderboard is not available right now.")
+        return
+
+    top = await leaderboard.top(LeaderboardMetric.BALANCE, limit=10)
+    users = {ranked.id: ranked for ranked in await uow.users.get_many(entry.user_id for entry in top)}
+    lines = ["🏆 Top Besitos"]
+    for entry in top:
+        ranked = users.get(entry.user_id)
+        name = html.escape(ranked.username or ranked.first_name) if ranked else str(entry.user_id)
+        lines.append(f"{entry.rank}. {name}: {int(entry.score)}")
+
+    own = await leaderboard.rank(LeaderboardMetric.BALANCE, user.id)
+    if own is not None and own.rank > len(top):
+        lines.append(f"…\n{own.rank}. You: {int(own.score)}")
+    await message.reply("\n".join(lines))
+
+
+@flags.read_only
+async def text_message_handler(
+    message: types.Message,
+    user: User,
+    context_service: ContextService,
+    context_pipeline: Optional[ContextAnalysisPipeline] = None,
+    load_shedder: Optional[LoadShedder] = None,
+):
+    """
+    This handler will be called for text messages no other handler takes.
+    It feeds the text to mood detection (and unknown commands to the
+    command stats) without replying.
+    """
+    if load_shedder is not None and load_shedder.skip("context_analysis"):
+        return
+    if context_pipeline is not None:
+        context_pipeline.submit(user.id, message.text)
+    elif not message.text.startswith("/"):
+        await context_service.observe_messages([user.id], [message.text])
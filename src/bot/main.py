@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
+from aiogram import Bot, Dispatcher, F
 from aiogram.enums import ParseMode
 
 from src.containers import ApplicationContainer
@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 
 from aiogram.filters import CommandStart, Command
-from .handlers import commands, errors
+from .handlers import admin, commands, errors
 
 def register_handlers(dp: Dispatcher):
     """
@@ -18,6 +18,10 @@ def register_handlers(dp: Dispatcher):
     # Register command handlers
     dp.message.register(commands.start_handler, CommandStart())
     dp.message.register(commands.balance_handler, Command("balance"))
+    dp.message.register(commands.leaderboard_handler, Command("top"))
+    dp.message.register(admin.profile_handler, Command("profile"))
+    # Any other text feeds mood detection, so it must come last
+    dp.message.register(commands.text_message_handler, F.text)
 
     # Register error handlers
     dp.errors.register(errors.error_handler)
@@ -25,10 +29,8 @@ def register_handlers(dp: Dispatcher):
 
 async def start_bot(bot: Bot, dp: Dispatcher):
     """
-    Initializes and starts the Telegram bot.
+    Starts the Telegram bot on a dispatcher set up with `setup_dispatcher`.
     """
-    register_handlers(dp)
-
     logger.info("Starting bot...")
     # Start polling
     await dp.start_polling(bot)
@@ -1,6 +1,8 @@
-from typing import Any, Awaitable, Callable, Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
+from src.infrastructure.metrics import BotMetrics
 from src.services.user_service import UserService
 from src.services.gamification_service import GamificationService
 
@@ -8,15 +10,19 @@ from src.services.gamification_service import GamificationService
 class AuthMiddleware(BaseMiddleware):
     """
     Middleware for handling user authentication, registration, and daily activity.
+    With metrics, the user lookup and the streak update are timed as the
+    "user" and "streak" stages.
     """
 
     def __init__(
         self,
         user_service: UserService,
         gamification_service: GamificationService,
+        metrics: Optional[BotMetrics] = None,
     ):
         self._user_service = user_service
         self._gamification_service = gamification_service
+        self._metrics = metrics
 
     async def __call__(
         self,
@@ -30,14 +36,21 @@ class AuthMiddleware(BaseMiddleware):
 
         uow: IUnitOfWork = data["uow"]
 
-        # Get or create the user from the database
-        user, is_new = await self._user_service.get_or_create_user(uow, telegram_user)
+        # Get or create the user, with their profile and wallet, in one query
+        started = time.perf_counter()
+        user_context, is_new = await self._user_service.get_or_create_user_context(uow, telegram_user)
+        user = user_context.user
 
         # Update daily streak
+        streak_started = time.perf_counter()
         await self._gamification_service.update_daily_streak(uow, user)
+        if self._metrics is not None:
+            self._metrics.observe_stage("user", started, streak_started)
+            self._metrics.observe_stage("streak", streak_started)
 
-        # Pass the user and is_new flag to the handler
+        # Pass the user, its loaded context and is_new flag to the handler
         data["user"] = user
+        data["user_context"] = user_context
         data["is_new_user"] = is_new
 
         return await handler(event, data)
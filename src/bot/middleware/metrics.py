@@ -0,0 +1,68 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from src.infrastructure.metrics import BotMetrics
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    """
+    Returns the name of the handler chosen for an event, in inner middlewares.
+    """
+    handler_object = data.get("handler")
+    return getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that counts updates and errors, tracks updates
+    in flight and times each update end to end. Register it before the
+    other update middlewares so their time is included.
+    """
+
+    def __init__(self, metrics: BotMetrics):
+        self._metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        metrics = self._metrics
+        update_type = (event.event_type if isinstance(event, Update) else None) or "unknown"
+        metrics.updates.inc(update_type)
+        metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.errors.inc(update_type)
+            raise
+        finally:
+            metrics.update_seconds.observe(time.perf_counter() - started, update_type)
+            metrics.in_flight.dec()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware that times the handler chosen for an event.
+    """
+
+    def __init__(self, metrics: BotMetrics):
+        self._metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._metrics.handler_seconds.observe(elapsed, name)
+            self._metrics.stage_seconds.observe(elapsed, "handler")
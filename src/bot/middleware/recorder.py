@@ -0,0 +1,30 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from src.infrastructure.update_recorder import UpdateRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that records each update, anonymized, for
+    replaying later. A failure to record never fails the update.
+    """
+
+    def __init__(self, recorder: UpdateRecorder):
+        self._recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            try:
+                self._recorder.record(event)
+            except Exception:
+                logger.warning("Could not record update %s", event.update_id, exc_info=True)
+        return await handler(event, data)
@@ -0,0 +1,45 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from src.bot.middleware.metrics import handler_name
+from src.infrastructure.sql_profiler import SQLProfiler
+
+
+class SQLProfilerMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that profiles the SQL of each update. Register
+    it before the Unit of Work middleware so the commit is included.
+    """
+
+    def __init__(self, profiler: SQLProfiler):
+        self._profiler = profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        label = (event.event_type if isinstance(event, Update) else None) or "unknown"
+        with self._profiler.profile(label) as profile:
+            try:
+                return await handler(event, data)
+            finally:
+                self._profiler.finish(profile)
+
+
+class SQLProfilerHandlerMiddleware(BaseMiddleware):
+    """
+    Inner middleware that labels the update's profile with its handler.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        profile = SQLProfiler.current()
+        if profile is not None:
+            profile.label = handler_name(data)
+        return await handler(event, data)
@@ -1,17 +1,53 @@
-from typing import Any, Awaitable, Callable, Dict
-from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware, Bot, Router
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject, Update
 from dependency_injector.providers import Provider
-from src.infrastructure.uow import IUnitOfWork
+from src.infrastructure.metrics import BotMetrics
+from src.infrastructure.replica import ReplicaRouter
+from src.infrastructure.uow import IUnitOfWork, current_unit_of_work
+
+
+async def is_read_only_update(router: Router, event: TelegramObject, data: Dict[str, Any]) -> bool:
+    """
+    Returns True if the message handler that will handle the update is
+    flagged with `@flags.read_only`.
+    """
+    if not isinstance(event, Update) or event.message is None:
+        return False
+    for current_router in router.chain_tail:
+        for handler in current_router.message.handlers:
+            matched, _ = await handler.check(event.message, **data)
+            if matched:
+                return bool(handler.flags.get("read_only"))
+    return False
 
 
 class UoWMiddleware(BaseMiddleware):
     """
     Middleware for providing a Unit of Work to handlers.
+
+    With a replica router, updates for handlers flagged `@flags.read_only`
+    get a read-only Unit of Work that reads from the replica while it is
+    within the lag tolerance; any write still goes to the primary.
+
+    With metrics, opening the Unit of Work and committing it are timed as
+    the "session" and "commit" stages.
     """
 
-    def __init__(self, uow_provider: Provider[IUnitOfWork]):
+    def __init__(
+        self,
+        uow_provider: Provider[IUnitOfWork],
+        replica_router: Optional[ReplicaRouter] = None,
+        router: Optional[Router] = None,
+        metrics: Optional[BotMetrics] = None,
+    ):
         self._uow_provider = uow_provider
+        self._replica_router = replica_router
+        self._router = router
+        self._metrics = metrics
 
     async def __call__(
         self,
@@ -19,6 +55,56 @@ class UoWMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self._uow_provider() as uow:
+        if self._replica_router is None or not self._replica_router.enabled:
+            result, _ = await self._run(self._uow_provider(), handler, event, data)
+            return result
+
+        telegram_user = data.get("event_from_user")
+        user_id = telegram_user.id if telegram_user else None
+        read_only = (
+            self._router is not None
+            and self._replica_router.replica_allowed(user_id)
+            and await is_read_only_update(self._router, event, data)
+        )
+        result, uow = await self._run(self._uow_provider(read_only=read_only), handler, event, data)
+        if user_id is not None and uow.has_writes:
+            self._replica_router.record_write(user_id)
+        return result
+
+    async def _run(self, uow: IUnitOfWork, handler, event: TelegramObject, data: Dict[str, Any]):
+        if self._metrics is None:
+            async with uow:
+                data["uow"] = uow
+                return await handler(event, data), uow
+
+        started = time.perf_counter()
+        async with uow:
+            self._metrics.observe_stage("session", started)
             data["uow"] = uow
-            return await handler(event, data)
+            result = await handler(event, data)
+            committing = time.perf_counter()
+        self._metrics.observe_stage("commit", committing)
+        return result, uow
+
+
+class CommitBeforeRequestMiddleware(BaseRequestMiddleware):
+    """
+    Bot API request middleware for group commit.
+
+    A unit of work holds the group commit writer's connection from its
+    first write until it commits, and every other writer waits for it. When
+    a handler sends a request to Telegram while holding it, the unit of work
+    is committed first, so the writer is never held across a network round
+    trip. Later writes of the handler go into a new transaction.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        uow = current_unit_of_work()
+        if uow is not None and uow.holds_writer:
+            await uow.commit()
+        return await make_request(bot, method)
@@ -1,5 +1,20 @@
+from typing import Dict, Tuple
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from src.domain.models import UserProfile
+from src.domain.models import UserProfile, UserMood, UserArchetype
+
+# (text, callback_data) pairs used to build the main menu
+ARCHETYPE_BUTTONS: Dict[UserArchetype, Tuple[str, str]] = {
+    UserArchetype.EXPLORER: ("🗺️ Explorar", "explore"),
+    UserArchetype.ACHIEVER: ("🏆 Desafíos", "challenges"),
+    UserArchetype.SOCIALIZER: ("💬 Social", "social"),
+}
+DEFAULT_ARCHETYPE_BUTTON: Tuple[str, str] = ("🚀 Acciones", "actions")
+
+MOOD_BUTTONS: Dict[UserMood, Tuple[str, str]] = {
+    UserMood.REFLECTIVE: ("📝 Escribir en el diario", "journal"),
+}
+
+HELP_BUTTON: Tuple[str, str] = ("❓ Ayuda", "help")
 
 
 class DynamicKeyboardFactory:
@@ -7,41 +22,33 @@ class DynamicKeyboardFactory:
     Factory for generating dynamic and context-aware keyboards (UI-001).
     """
 
-    def create_main_menu(self, profile: UserProfile) -> InlineKeyboardMarkup:
+    def build_main_menu(
+        self, archetype: UserArchetype, mood: UserMood
+    ) -> InlineKeyboardMarkup:
         """
-        Creates the main menu keyboard, personalized for the user's archetype and mood.
+        Builds a new main menu keyboard for the given archetype and mood.
         """
         buttons = []
 
         # Personalized buttons based on archetype
-        if profile.archetype.value == "explorer":
-            buttons.append(
-                [InlineKeyboardButton(text="🗺️ Explorar", callback_data="explore")]
-            )
-        elif profile.archetype.value == "achiever":
-            buttons.append(
-                [InlineKeyboardButton(text="🏆 Desafíos", callback_data="challenges")]
-            )
-        elif profile.archetype.value == "socializer":
-            buttons.append(
-                [InlineKeyboardButton(text="💬 Social", callback_data="social")]
-            )
-        else:
-            buttons.append(
-                [InlineKeyboardButton(text="🚀 Acciones", callback_data="actions")]
-            )
+        text, callback_data = ARCHETYPE_BUTTONS.get(archetype, DEFAULT_ARCHETYPE_BUTTON)
+        buttons.append([InlineKeyboardButton(text=text, callback_data=callback_data)])
 
         # Add a button based on mood
-        if profile.mood.value == "reflective":
+        if mood in MOOD_BUTTONS:
+            text, callback_data = MOOD_BUTTONS[mood]
             buttons.append(
-                [
-                    InlineKeyboardButton(
-                        text="📝 Escribir en el diario", callback_data="journal"
-                    )
-                ]
+                [InlineKeyboardButton(text=text, callback_data=callback_data)]
             )
 
         # Common buttons
-        buttons.append([InlineKeyboardButton(text="❓ Ayuda", callback_data="help")])
+        text, callback_data = HELP_BUTTON
+        buttons.append([InlineKeyboardButton(text=text, callback_data=callback_data)])
 
         return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+    def create_main_menu(self, profile: UserProfile) -> InlineKeyboardMarkup:
+        """
+        Creates the main menu keyboard, personalized for the user's archetype and mood.
+        """
+        return self.build_main_menu(profile.archetype, profile.mood)
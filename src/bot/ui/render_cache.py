@@ -0,0 +1,121 @@
+import logging
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+from aiogram.types import InlineKeyboardMarkup
+from src.bot.ui.keyboards import DynamicKeyboardFactory
+from src.domain.models import UserProfile, UserMood, UserArchetype
+from src.services.personalization_service import PersonalizationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = "es"
+DEFAULT_VARIANT = "default"
+
+KeyboardBuilder = Callable[[UserArchetype, UserMood], InlineKeyboardMarkup]
+GreetingBuilder = Callable[[UserMood, UserArchetype], str]
+
+
+class RenderedMenu(NamedTuple):
+    """
+    A greeting and its main menu keyboard, ready to be sent.
+    """
+    text: str
+    keyboard: InlineKeyboardMarkup
+
+
+class RenderCache:
+    """
+    Precomputed main menu renders for every (archetype, mood) state.
+
+    Renders are grouped by (locale, variant). Each group is registered with
+    its own keyboard and greeting builders and is built once for every
+    archetype and mood. The returned keyboards are shared between updates
+    and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        keyboard_factory: DynamicKeyboardFactory,
+        personalization_service: PersonalizationService,
+    ):
+        self._builders: Dict[Tuple[str, str], Tuple[KeyboardBuilder, GreetingBuilder]] = {}
+        self._entries: Dict[Tuple[str, str, UserArchetype, UserMood], RenderedMenu] = {}
+        self.register(
+            DEFAULT_LOCALE,
+            DEFAULT_VARIANT,
+            keyboard_factory.build_main_menu,
+            personalization_service.render_adaptive_message,
+        )
+
+    def register(
+        self,
+        locale: str,
+        variant: str,
+        keyboard_builder: KeyboardBuilder,
+        greeting_builder: GreetingBuilder,
+    ) -> None:
+        """
+        Registers the builders for a locale and variant.
+        Previously rendered entries for the pair are dropped.
+        """
+        self._builders[(locale, variant)] = (keyboard_builder, greeting_builder)
+        for key in [key for key in self._entries if key[:2] == (locale, variant)]:
+            del self._entries[key]
+
+    def warm(self) -> int:
+        """
+        Renders every registered (locale, variant) for all archetypes and moods.
+        Returns the number of cached entries.
+        """
+        for locale, variant in self._builders:
+            for archetype in UserArchetype:
+                for mood in UserMood:
+                    self._render(locale, variant, archetype, mood)
+        logger.info("Render cache warmed with %d entries.", len(self._entries))
+        return len(self._entries)
+
+    def get(
+        self,
+        archetype: UserArchetype,
+        mood: UserMood,
+        locale: Optional[str] = None,
+        variant: str = DEFAULT_VARIANT,
+    ) -> RenderedMenu:
+        """
+        Returns the render for a state.
+        Unknown locales and variants fall back to the default ones.
+        """
+        entry = self._entries.get((locale, variant, archetype, mood))
+        if entry is not None:
+            return entry
+
+        if (locale, variant) not in self._builders:
+            locale, variant = DEFAULT_LOCALE, DEFAULT_VARIANT
+        return self._render(locale, variant, archetype, mood)
+
+    def get_for_profile(
+        self,
+        profile: UserProfile,
+        locale: Optional[str] = None,
+        variant: str = DEFAULT_VARIANT,
+    ) -> RenderedMenu:
+        """
+        Returns the render for the profile's current archetype and mood.
+        """
+        return self.get(profile.archetype, profile.mood, locale, variant)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _render(
+        self, locale: str, variant: str, archetype: UserArchetype, mood: UserMood
+    ) -> RenderedMenu:
+        key = (locale, variant, archetype, mood)
+        entry = self._entries.get(key)
+        if entry is None:
+            keyboard_builder, greeting_builder = self._builders[(locale, variant)]
+            entry = RenderedMenu(
+                text=greeting_builder(mood, archetype),
+                keyboard=keyboard_builder(archetype, mood),
+            )
+            self._entries[key] = entry
+        return entry
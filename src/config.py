@@ -12,6 +12,13 @@ load_dotenv()
 # Project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Default half-life of engagement scores, see ENGAGEMENT_HALF_LIFE_HOURS
+DEFAULT_HALF_LIFE_HOURS = 7 * 24.0
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
 
 class Settings:
     """
@@ -20,26 +27,170 @@ class Settings:
     # Core settings
     ENVIRONMENT: str = os.getenv('ENVIRONMENT', 'development')
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    # Logs are written from a background thread: "text" or "json" lines
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Records per second per logger below WARNING (0: unlimited), with
+    # overrides such as "aiogram.event=5,src.bot.events=20"
+    LOG_RATE_LIMIT: float = float(os.getenv('LOG_RATE_LIMIT', 50))
+    LOG_RATE_LIMITS: str = os.getenv('LOG_RATE_LIMITS', '')
+
+    # Event loop runtime; compare settings with scripts/benchmarks/runtime.py
+    RUNTIME_UVLOOP: bool = _env_bool('RUNTIME_UVLOOP', False)
+    # Threads of the default executor (asyncio.to_thread); 0 keeps Python's default
+    RUNTIME_EXECUTOR_WORKERS: int = int(os.getenv('RUNTIME_EXECUTOR_WORKERS', 0))
+    # GC generation thresholds, e.g. "50000,20,100"; empty keeps the defaults
+    RUNTIME_GC_THRESHOLDS: str = os.getenv('RUNTIME_GC_THRESHOLDS', '')
+    # Eager task factory, Python 3.12+
+    RUNTIME_EAGER_TASKS: bool = _env_bool('RUNTIME_EAGER_TASKS', False)
+
+    # Database backend: "sqlite" or "postgresql"
+    DATABASE_BACKEND: str = os.getenv('DATABASE_BACKEND', 'sqlite').lower()
+
+    # --- PostgreSQL Database ---
+    POSTGRES_HOST: str = os.getenv('POSTGRES_HOST', 'localhost')
+    POSTGRES_PORT: int = int(os.getenv('POSTGRES_PORT', 5432))
+    POSTGRES_USER: str = os.getenv('POSTGRES_USER', 'user')
+    POSTGRES_PASSWORD: str = os.getenv('POSTGRES_PASSWORD', 'password')
+    POSTGRES_DB: str = os.getenv('POSTGRES_DB', 'diana_db')
+
+    # --- SQLite Database ---
+    SQLITE_PATH: str = os.getenv('SQLITE_PATH', str(PROJECT_ROOT / 'diana_bot.db'))
+
+    # An explicit DATABASE_URL wins over the backend settings above
+    DATABASE_URL: str = os.getenv('DATABASE_URL') or (
+        f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
+        f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+        if DATABASE_BACKEND == 'postgresql'
+        else f"sqlite+aiosqlite:///{SQLITE_PATH}"
+    )
+
+    # SQLite performance profile: WAL, synchronous=NORMAL, mmap and a larger page cache
+    SQLITE_TUNING: bool = _env_bool('SQLITE_TUNING', False)
+    SQLITE_MMAP_SIZE: int = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    # Group commit: writes of units of work finishing within the window share one COMMIT (SQLite files only)
+    GROUP_COMMIT: bool = _env_bool('GROUP_COMMIT', False)
+    GROUP_COMMIT_WINDOW_MS: float = float(os.getenv('GROUP_COMMIT_WINDOW_MS', 3))
+    GROUP_COMMIT_MAX_BATCH: int = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 64))
+
+    # Relationships loaded with the user in the same query for every update
+    USER_CONTEXT_RELATIONS: tuple = tuple(
+        name.strip() for name in os.getenv('USER_CONTEXT_RELATIONS', 'profile,wallet').split(',') if name.strip()
+    )
+
+    # Read replica for handlers flagged read-only (same pool settings as the primary)
+    DATABASE_REPLICA_URL: str = os.getenv('DATABASE_REPLICA_URL', '')
+    # Without a replica URL, read-only handlers can use read-only SQLite connections
+    SQLITE_READ_ONLY_REPLICA: bool = _env_bool('SQLITE_READ_ONLY_REPLICA', False)
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 1.0))
+    REPLICA_LAG_CHECK_INTERVAL: float = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+
+    # Read-through cache for repositories decorated with @cached_repository
+    CACHE_ENABLED: bool = _env_bool('CACHE_ENABLED', False)
+    # Without the Redis tier only the per-process LRU is used (single process deployments)
+    CACHE_REDIS_TIER: bool = _env_bool('CACHE_REDIS_TIER', True)
+    CACHE_LOCAL_MAX_ENTRIES: int = int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', 10000))
+    CACHE_KEY_PREFIX: str = os.getenv('CACHE_KEY_PREFIX', 'cache')
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache_invalidation')
 
-    # --- PostgreSQL Database (temporarily disabled) ---
-    # POSTGRES_HOST: str = os.getenv('POSTGRES_HOST', 'localhost')
-    # POSTGRES_PORT: int = int(os.getenv('POSTGRES_PORT', 5432))
-    # POSTGRES_USER: str = os.getenv('POSTGRES_USER', 'user')
-    # POSTGRES_PASSWORD: str = os.getenv('POSTGRES_PASSWORD', 'password')
-    # POSTGRES_DB: str = os.getenv('POSTGRES_DB', 'diana_db')
-    # DATABASE_URL: str = (
-    #     f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
-    #     f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-    # )
+    # Wallet balances in Redis, written through after commits (serves /balance)
+    WALLET_BALANCE_CACHE: bool = _env_bool('WALLET_BALANCE_CACHE', False)
+    WALLET_BALANCE_CACHE_PREFIX: str = os.getenv('WALLET_BALANCE_CACHE_PREFIX', 'wallet_balance')
+    WALLET_BALANCE_CACHE_TTL: int = int(os.getenv('WALLET_BALANCE_CACHE_TTL', 86400))
+    # Balances filled from the database on a miss expire sooner
+    WALLET_BALANCE_FILL_TTL: int = int(os.getenv('WALLET_BALANCE_FILL_TTL', 300))
 
-    # --- SQLite Database (temporary) ---
-    DATABASE_URL: str = f"sqlite+aiosqlite:///{PROJECT_ROOT}/diana_bot.db"
+    # Leaderboards on Redis sorted sets (/top)
+    LEADERBOARD_ENABLED: bool = _env_bool('LEADERBOARD_ENABLED', False)
+    LEADERBOARD_KEY_PREFIX: str = os.getenv('LEADERBOARD_KEY_PREFIX', 'leaderboard')
+    # Daily and weekly boards are kept for this many periods
+    LEADERBOARD_RETENTION_PERIODS: int = int(os.getenv('LEADERBOARD_RETENTION_PERIODS', 2))
+    LEADERBOARD_REBUILD_CHUNK_SIZE: int = int(os.getenv('LEADERBOARD_REBUILD_CHUNK_SIZE', 1000))
+
+    # Connection pool (PostgreSQL)
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT: float = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING: bool = _env_bool('DB_POOL_PRE_PING', True)
+    # Prepared statement cache per connection; set to 0 behind pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 100))
 
     # Redis
     REDIS_HOST: str = os.getenv('REDIS_HOST', 'localhost')
     REDIS_PORT: int = int(os.getenv('REDIS_PORT', 6379))
     REDIS_DB: int = int(os.getenv('REDIS_DB', 0))
 
+    # Context analysis pipeline
+    CONTEXT_ANALYSIS_BATCH_SIZE: int = int(os.getenv('CONTEXT_ANALYSIS_BATCH_SIZE', 100))
+    CONTEXT_ANALYSIS_BATCH_WINDOW: float = float(os.getenv('CONTEXT_ANALYSIS_BATCH_WINDOW', 0.05))
+    CONTEXT_ANALYSIS_FRESHNESS_SECONDS: int = int(os.getenv('CONTEXT_ANALYSIS_FRESHNESS_SECONDS', 600))
+    CONTEXT_ANALYSIS_QUEUE_SIZE: int = int(os.getenv('CONTEXT_ANALYSIS_QUEUE_SIZE', 10000))
+
+    # Engagement score
+    # Changing it re-keys every ranked profile when the context pipeline starts
+    ENGAGEMENT_HALF_LIFE_HOURS: float = float(os.getenv('ENGAGEMENT_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS))
+
+    # Archetype classification job
+    ARCHETYPE_CLASSIFICATION_INTERVAL: int = int(os.getenv('ARCHETYPE_CLASSIFICATION_INTERVAL', 900))
+    ARCHETYPE_CLASSIFICATION_CHUNK_SIZE: int = int(os.getenv('ARCHETYPE_CLASSIFICATION_CHUNK_SIZE', 500))
+
+    # Ledger balance snapshots: users get one once this many transactions follow their last
+    LEDGER_SNAPSHOT_INTERVAL: int = int(os.getenv('LEDGER_SNAPSHOT_INTERVAL', 3600))
+    LEDGER_SNAPSHOT_MIN_TAIL: int = int(os.getenv('LEDGER_SNAPSHOT_MIN_TAIL', 50))
+    LEDGER_SNAPSHOT_CHUNK_SIZE: int = int(os.getenv('LEDGER_SNAPSHOT_CHUNK_SIZE', 500))
+
+    # Wallet vs ledger reconciliation job
+    LEDGER_RECONCILIATION_INTERVAL: int = int(os.getenv('LEDGER_RECONCILIATION_INTERVAL', 86400))
+    LEDGER_RECONCILIATION_CHUNK_SIZE: int = int(os.getenv('LEDGER_RECONCILIATION_CHUNK_SIZE', 1000))
+
+    # Monthly transaction partitions (PostgreSQL) and archival of old months
+    TRANSACTION_PARTITIONS_AHEAD: int = int(os.getenv('TRANSACTION_PARTITIONS_AHEAD', 2))
+    TRANSACTION_ARCHIVE_ENABLED: bool = _env_bool('TRANSACTION_ARCHIVE_ENABLED', False)
+    TRANSACTION_ARCHIVE_DIR: str = os.getenv('TRANSACTION_ARCHIVE_DIR', str(PROJECT_ROOT / 'archive'))
+    TRANSACTION_ARCHIVE_CACHE_MONTHS: int = int(os.getenv('TRANSACTION_ARCHIVE_CACHE_MONTHS', 2))
+    TRANSACTION_HOT_MONTHS: int = int(os.getenv('TRANSACTION_HOT_MONTHS', 3))
+    TRANSACTION_ARCHIVAL_INTERVAL: int = int(os.getenv('TRANSACTION_ARCHIVAL_INTERVAL', 86400))
+    TRANSACTION_ARCHIVAL_CHUNK_SIZE: int = int(os.getenv('TRANSACTION_ARCHIVAL_CHUNK_SIZE', 500))
+
+    # Prometheus metrics, served on http://METRICS_HOST:METRICS_PORT/metrics
+    METRICS_ENABLED: bool = _env_bool('METRICS_ENABLED', False)
+    METRICS_HOST: str = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT: int = int(os.getenv('METRICS_PORT', 9108))
+    # Events slower than this from publish to handled are logged (seconds)
+    EVENT_SLOW_THRESHOLD: float = float(os.getenv('EVENT_SLOW_THRESHOLD', 5.0))
+
+    # Load shedding: from the defer threshold of event loop lag (seconds),
+    # achievement checks are skipped and achievement notifications wait;
+    # from the shed threshold, /start also skips context analysis
+    LOAD_SHEDDING_ENABLED: bool = _env_bool('LOAD_SHEDDING_ENABLED', False)
+    LOAD_SHEDDING_INTERVAL: float = float(os.getenv('LOAD_SHEDDING_INTERVAL', 0.1))
+    LOAD_SHEDDING_DEFER_THRESHOLD: float = float(os.getenv('LOAD_SHEDDING_DEFER_THRESHOLD', 0.1))
+    LOAD_SHEDDING_SHED_THRESHOLD: float = float(os.getenv('LOAD_SHEDDING_SHED_THRESHOLD', 0.5))
+
+    # SQL profiler: logs updates over the statement budget or repeating a statement
+    SQL_PROFILER_ENABLED: bool = _env_bool('SQL_PROFILER_ENABLED', False)
+    SQL_PROFILER_STATEMENT_BUDGET: int = int(os.getenv('SQL_PROFILER_STATEMENT_BUDGET', 20))
+    SQL_PROFILER_REPEAT_THRESHOLD: int = int(os.getenv('SQL_PROFILER_REPEAT_THRESHOLD', 3))
+    SQL_PROFILER_REPORT_INTERVAL: int = int(os.getenv('SQL_PROFILER_REPORT_INTERVAL', 300))
+
+    # Runtime profiler: the admin /profile command (CPU samples, heap snapshots)
+    RUNTIME_PROFILER_ENABLED: bool = _env_bool('RUNTIME_PROFILER_ENABLED', False)
+    RUNTIME_PROFILER_DIR: str = os.getenv('RUNTIME_PROFILER_DIR', str(PROJECT_ROOT / 'profiles'))
+    RUNTIME_PROFILER_INTERVAL: float = float(os.getenv('RUNTIME_PROFILER_INTERVAL', 0.005))
+    RUNTIME_PROFILER_MAX_SECONDS: int = int(os.getenv('RUNTIME_PROFILER_MAX_SECONDS', 60))
+    RUNTIME_PROFILER_FRAMES: int = int(os.getenv('RUNTIME_PROFILER_FRAMES', 10))
+
+    # Update recorder: anonymized updates for scripts/benchmarks/replay.py.
+    # Without a salt, pseudonyms change on every restart.
+    UPDATE_RECORDER_ENABLED: bool = _env_bool('UPDATE_RECORDER_ENABLED', False)
+    UPDATE_RECORDER_PATH: str = os.getenv('UPDATE_RECORDER_PATH', str(PROJECT_ROOT / 'recordings' / 'updates.jsonl'))
+    UPDATE_RECORDER_SALT: str = os.getenv('UPDATE_RECORDER_SALT', '')
+    UPDATE_RECORDER_SAMPLE_RATE: float = float(os.getenv('UPDATE_RECORDER_SAMPLE_RATE', 1.0))
+
     # Telegram
     TELEGRAM_BOT_TOKEN: str = os.getenv('TELEGRAM_BOT_TOKEN', 'your_token_here')
 
@@ -3,7 +3,6 @@ Dependency injection containers for the Diana Bot application.
 """
 
 from dependency_injector import containers, providers
-from sqlalchemy.ext.asyncio import create_async_engine
 import redis.asyncio as redis
 
 from src.config import settings
@@ -16,8 +15,23 @@ class CoreContainer(containers.DeclarativeContainer):
     config = providers.Object(settings)
 
 
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.balance_cache import create_balance_cache
+from src.infrastructure.cache import create_cache
+from src.infrastructure.leaderboard import create_leaderboard
+from src.infrastructure.archive import create_transaction_archive
+from src.infrastructure.partitioning import TransactionPartitions
+from src.infrastructure.event_tracing import create_event_tracer
+from src.infrastructure.load_shedding import create_load_shedder
+from src.infrastructure.metrics import MetricsRegistry, MetricsServer, create_bot_metrics
+from src.infrastructure.sql_profiler import create_sql_profiler
+from src.infrastructure.runtime_profiler import create_runtime_profiler
+from src.infrastructure.update_recorder import create_update_recorder
+from src.infrastructure.database import (
+    create_db_engine,
+    create_group_commit_writer,
+    create_replica_engine,
+    create_session_factory,
+)
 from src.infrastructure.event_bus import EventPublisher
 from src.infrastructure.repositories import (
     UserRepository,
@@ -27,6 +41,7 @@ from src.infrastructure.repositories import (
     UserAchievementRepository,
     UserProfileRepository,
 )
+from src.infrastructure.replica import ReplicaRouter
 from src.infrastructure.uow import UnitOfWork
 
 
@@ -38,16 +53,81 @@ class InfrastructureContainer(containers.DeclarativeContainer):
     config = providers.Object(settings)
 
     db_engine = providers.Singleton(
-        create_async_engine,
+        create_db_engine,
         url=config.provided.DATABASE_URL,
         echo=config.provided.DEBUG,
+        pool_size=config.provided.DB_POOL_SIZE,
+        max_overflow=config.provided.DB_MAX_OVERFLOW,
+        pool_timeout=config.provided.DB_POOL_TIMEOUT,
+        pool_recycle=config.provided.DB_POOL_RECYCLE,
+        pool_pre_ping=config.provided.DB_POOL_PRE_PING,
+        statement_cache_size=config.provided.DB_STATEMENT_CACHE_SIZE,
+        sqlite_tuning=config.provided.SQLITE_TUNING,
+        sqlite_mmap_size=config.provided.SQLITE_MMAP_SIZE,
+        sqlite_cache_size_kb=config.provided.SQLITE_CACHE_SIZE_KB,
+        sqlite_busy_timeout_ms=config.provided.SQLITE_BUSY_TIMEOUT_MS,
+    )
+
+    group_commit_writer = providers.Singleton(
+        create_group_commit_writer,
+        engine=db_engine,
+        enabled=config.provided.GROUP_COMMIT,
+        window=providers.Callable(lambda ms: ms / 1000, config.provided.GROUP_COMMIT_WINDOW_MS),
+        max_batch=config.provided.GROUP_COMMIT_MAX_BATCH,
+        sqlite_mmap_size=config.provided.SQLITE_MMAP_SIZE,
+        sqlite_cache_size_kb=config.provided.SQLITE_CACHE_SIZE_KB,
+        sqlite_busy_timeout_ms=config.provided.SQLITE_BUSY_TIMEOUT_MS,
+    )
+
+    replica_engine = providers.Singleton(
+        create_replica_engine,
+        engine=db_engine,
+        url=config.provided.DATABASE_REPLICA_URL,
+        sqlite_read_only=config.provided.SQLITE_READ_ONLY_REPLICA,
+        echo=config.provided.DEBUG,
+        pool_size=config.provided.DB_POOL_SIZE,
+        max_overflow=config.provided.DB_MAX_OVERFLOW,
+        pool_timeout=config.provided.DB_POOL_TIMEOUT,
+        pool_recycle=config.provided.DB_POOL_RECYCLE,
+        pool_pre_ping=config.provided.DB_POOL_PRE_PING,
+        statement_cache_size=config.provided.DB_STATEMENT_CACHE_SIZE,
+    )
+
+    replica_router = providers.Singleton(
+        ReplicaRouter,
+        replica_engine=replica_engine,
+        max_lag=config.provided.REPLICA_MAX_LAG_SECONDS,
+        check_interval=config.provided.REPLICA_LAG_CHECK_INTERVAL,
+    )
+
+    redis_pool = providers.Singleton(
+        redis.ConnectionPool,
+        host=config.provided.REDIS_HOST,
+        port=config.provided.REDIS_PORT,
+        db=config.provided.REDIS_DB,
     )
 
-    session_factory = providers.Factory(
-        sessionmaker,
-        bind=db_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
+    redis_client = providers.Singleton(
+        redis.Redis,
+        connection_pool=redis_pool,
+    )
+
+    cache = providers.Singleton(
+        create_cache,
+        redis_client=redis_client,
+        enabled=config.provided.CACHE_ENABLED,
+        redis_tier=config.provided.CACHE_REDIS_TIER,
+        prefix=config.provided.CACHE_KEY_PREFIX,
+        channel=config.provided.CACHE_INVALIDATION_CHANNEL,
+        local_max_entries=config.provided.CACHE_LOCAL_MAX_ENTRIES,
+    )
+
+    session_factory = providers.Singleton(
+        create_session_factory,
+        engine=db_engine,
+        group_commit_writer=group_commit_writer,
+        replica_engine=replica_engine,
+        cache=cache,
     )
 
     user_repository = providers.Factory(
@@ -85,21 +165,97 @@ class InfrastructureContainer(containers.DeclarativeContainer):
         session_factory=session_factory,
     )
 
-    redis_pool = providers.Singleton(
-        redis.ConnectionPool,
-        host=config.provided.REDIS_HOST,
-        port=config.provided.REDIS_PORT,
-        db=config.provided.REDIS_DB,
+    event_publisher = providers.Factory(
+        EventPublisher,
+        redis_client=redis_client,
     )
 
-    redis_client = providers.Singleton(
-        redis.Redis,
-        connection_pool=redis_pool,
+    balance_cache = providers.Singleton(
+        create_balance_cache,
+        redis_client=redis_client,
+        enabled=config.provided.WALLET_BALANCE_CACHE,
+        prefix=config.provided.WALLET_BALANCE_CACHE_PREFIX,
+        ttl=config.provided.WALLET_BALANCE_CACHE_TTL,
+        fill_ttl=config.provided.WALLET_BALANCE_FILL_TTL,
     )
 
-    event_publisher = providers.Factory(
-        EventPublisher,
+    leaderboard = providers.Singleton(
+        create_leaderboard,
         redis_client=redis_client,
+        enabled=config.provided.LEADERBOARD_ENABLED,
+        prefix=config.provided.LEADERBOARD_KEY_PREFIX,
+        retention_periods=config.provided.LEADERBOARD_RETENTION_PERIODS,
+    )
+
+    transaction_partitions = providers.Singleton(
+        TransactionPartitions,
+        engine=db_engine,
+        months_ahead=config.provided.TRANSACTION_PARTITIONS_AHEAD,
+    )
+
+    transaction_archive = providers.Singleton(
+        create_transaction_archive,
+        directory=config.provided.TRANSACTION_ARCHIVE_DIR,
+        enabled=config.provided.TRANSACTION_ARCHIVE_ENABLED,
+        cache_months=config.provided.TRANSACTION_ARCHIVE_CACHE_MONTHS,
+    )
+
+    metrics_registry = providers.Singleton(MetricsRegistry)
+
+    bot_metrics = providers.Singleton(
+        create_bot_metrics,
+        enabled=config.provided.METRICS_ENABLED,
+        registry=metrics_registry,
+    )
+
+    event_tracer = providers.Singleton(
+        create_event_tracer,
+        enabled=config.provided.METRICS_ENABLED,
+        registry=metrics_registry,
+        slow_threshold=config.provided.EVENT_SLOW_THRESHOLD,
+    )
+
+    load_shedder = providers.Singleton(
+        create_load_shedder,
+        enabled=config.provided.LOAD_SHEDDING_ENABLED,
+        registry=metrics_registry,
+        interval=config.provided.LOAD_SHEDDING_INTERVAL,
+        defer_threshold=config.provided.LOAD_SHEDDING_DEFER_THRESHOLD,
+        shed_threshold=config.provided.LOAD_SHEDDING_SHED_THRESHOLD,
+    )
+
+    metrics_server = providers.Singleton(
+        MetricsServer,
+        registry=metrics_registry,
+        host=config.provided.METRICS_HOST,
+        port=config.provided.METRICS_PORT,
+    )
+
+    sql_profiler = providers.Singleton(
+        create_sql_profiler,
+        enabled=config.provided.SQL_PROFILER_ENABLED,
+        engine=db_engine,
+        replica_engine=replica_engine,
+        statement_budget=config.provided.SQL_PROFILER_STATEMENT_BUDGET,
+        repeat_threshold=config.provided.SQL_PROFILER_REPEAT_THRESHOLD,
+        report_interval=config.provided.SQL_PROFILER_REPORT_INTERVAL,
+    )
+
+    runtime_profiler = providers.Singleton(
+        create_runtime_profiler,
+        enabled=config.provided.RUNTIME_PROFILER_ENABLED,
+        output_dir=config.provided.RUNTIME_PROFILER_DIR,
+        interval=config.provided.RUNTIME_PROFILER_INTERVAL,
+        max_seconds=config.provided.RUNTIME_PROFILER_MAX_SECONDS,
+        frames=config.provided.RUNTIME_PROFILER_FRAMES,
+    )
+
+    update_recorder = providers.Singleton(
+        create_update_recorder,
+        enabled=config.provided.UPDATE_RECORDER_ENABLED,
+        path=config.provided.UPDATE_RECORDER_PATH,
+        salt=config.provided.UPDATE_RECORDER_SALT,
+        sample_rate=config.provided.UPDATE_RECORDER_SAMPLE_RATE,
     )
 
 
@@ -126,19 +282,30 @@ from src.services.onboarding_service import OnboardingService
 from src.services.gamification_service import GamificationService
 from src.services.notification_service import NotificationService
 from src.services.context_service import ContextService
+from src.services.mood_detection import MoodDetector
+from src.services.engagement import EngagementDecay
+from src.services.archetype_classifier import ArchetypeClassifier, ArchetypeClassificationJob
+from src.services.context_pipeline import ContextAnalysisPipeline
 from src.services.personalization_service import PersonalizationService
+from src.services.leaderboard_service import LeaderboardService
+from src.services.ledger_service import LedgerReconciliationJob, LedgerService, LedgerSnapshotJob
+from src.services.archival_service import TransactionArchivalJob
+from src.bot.ui.keyboards import DynamicKeyboardFactory
+from src.bot.ui.render_cache import RenderCache
 
 
 class ServiceContainer(containers.DeclarativeContainer):
     """
     Container for application services.
     """
+    config = providers.Object(settings)
     infrastructure = providers.DependenciesContainer()
     bot = providers.DependenciesContainer()
 
     user_service = providers.Factory(
         UserService,
         event_publisher=infrastructure.event_publisher,
+        context_relations=config.provided.USER_CONTEXT_RELATIONS,
     )
 
     onboarding_service = providers.Factory(
@@ -154,16 +321,94 @@ class ServiceContainer(containers.DeclarativeContainer):
     gamification_service = providers.Factory(
         GamificationService,
         event_publisher=infrastructure.event_publisher,
+        balance_cache=infrastructure.balance_cache,
+        leaderboard=infrastructure.leaderboard,
+    )
+
+    mood_detector = providers.Singleton(
+        MoodDetector,
+    )
+
+    engagement_decay = providers.Singleton(
+        EngagementDecay,
+        half_life_seconds=providers.Callable(
+            lambda hours: hours * 3600, config.provided.ENGAGEMENT_HALF_LIFE_HOURS
+        ),
     )
 
     context_service = providers.Factory(
         ContextService,
+        mood_detector=mood_detector,
+        engagement_decay=engagement_decay,
+    )
+
+    context_pipeline = providers.Singleton(
+        ContextAnalysisPipeline,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        context_service=context_service,
+        batch_size=config.provided.CONTEXT_ANALYSIS_BATCH_SIZE,
+        batch_window=config.provided.CONTEXT_ANALYSIS_BATCH_WINDOW,
+        freshness_seconds=config.provided.CONTEXT_ANALYSIS_FRESHNESS_SECONDS,
+        max_queue_size=config.provided.CONTEXT_ANALYSIS_QUEUE_SIZE,
+        leaderboard=infrastructure.leaderboard,
+    )
+
+    archetype_classification_job = providers.Singleton(
+        ArchetypeClassificationJob,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        classifier=providers.Singleton(ArchetypeClassifier),
+        interval_seconds=config.provided.ARCHETYPE_CLASSIFICATION_INTERVAL,
+        chunk_size=config.provided.ARCHETYPE_CLASSIFICATION_CHUNK_SIZE,
     )
 
     personalization_service = providers.Factory(
         PersonalizationService,
     )
 
+    ledger_service = providers.Factory(
+        LedgerService,
+        archive=infrastructure.transaction_archive,
+    )
+
+    ledger_snapshot_job = providers.Singleton(
+        LedgerSnapshotJob,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        interval_seconds=config.provided.LEDGER_SNAPSHOT_INTERVAL,
+        min_tail=config.provided.LEDGER_SNAPSHOT_MIN_TAIL,
+        chunk_size=config.provided.LEDGER_SNAPSHOT_CHUNK_SIZE,
+    )
+
+    ledger_reconciliation_job = providers.Singleton(
+        LedgerReconciliationJob,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        ledger_service=ledger_service,
+        interval_seconds=config.provided.LEDGER_RECONCILIATION_INTERVAL,
+        chunk_size=config.provided.LEDGER_RECONCILIATION_CHUNK_SIZE,
+    )
+
+    transaction_archival_job = providers.Singleton(
+        TransactionArchivalJob,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        partitions=infrastructure.transaction_partitions,
+        archive=infrastructure.transaction_archive,
+        hot_months=config.provided.TRANSACTION_HOT_MONTHS,
+        interval_seconds=config.provided.TRANSACTION_ARCHIVAL_INTERVAL,
+        chunk_size=config.provided.TRANSACTION_ARCHIVAL_CHUNK_SIZE,
+    )
+
+    leaderboard_service = providers.Factory(
+        LeaderboardService,
+        leaderboard=infrastructure.leaderboard,
+        uow_provider=providers.Delegate(infrastructure.uow),
+        chunk_size=config.provided.LEADERBOARD_REBUILD_CHUNK_SIZE,
+    )
+
+    render_cache = providers.Singleton(
+        RenderCache,
+        keyboard_factory=providers.Factory(DynamicKeyboardFactory),
+        personalization_service=personalization_service,
+    )
+
 
 class ApplicationContainer(containers.DeclarativeContainer):
     """
@@ -188,6 +433,7 @@ class ApplicationContainer(containers.DeclarativeContainer):
 
     services = providers.Container(
         ServiceContainer,
+        config=config,
         infrastructure=infrastructure,
         bot=bot,
     )
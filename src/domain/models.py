@@ -6,7 +6,10 @@ from sqlalchemy import (
     Column,
     DateTime,
     Enum,
+    Float,
+    Index,
     String,
+    event,
     func,
     ForeignKey,
     Integer,
@@ -78,7 +81,14 @@ class UserProfile(Base):
     archetype: UserArchetype = Column(
         Enum(UserArchetype), default=UserArchetype.EXPLORER, nullable=False
     )
-    engagement_score: int = Column(Integer, default=0, nullable=False)
+    # Time-decayed engagement: value as of engagement_updated_at, see EngagementDecay
+    engagement_score: float = Column(Float, default=0.0, nullable=False)
+    engagement_updated_at: datetime = Column(DateTime, nullable=True)
+    engagement_rank: float = Column(Float, nullable=True, index=True)
+    # Decay rate the rank key was computed with
+    engagement_rank_rate: float = Column(Float, nullable=True)
+    analyzed_at: datetime = Column(DateTime, nullable=True)
+    classified_at: datetime = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="profile")
 
@@ -97,7 +107,20 @@ class Wallet(Base):
 
 
 class Transaction(Base):
+    """
+    Append-only ledger of balance changes. Rows are never updated or deleted;
+    corrections are new transactions. Old months are moved out of the table
+    to the transaction archive (see `TransactionArchivalJob`).
+    """
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Per-user history and the tail after a balance snapshot
+        Index("ix_transactions_user_id_id", "user_id", "id"),
+        # Per-user "as of" lookups and changes since an archetype classification
+        Index("ix_transactions_user_id_created_at", "user_id", "created_at"),
+        # Audits over a time range
+        Index("ix_transactions_created_at", "created_at"),
+    )
 
     id: int = Column(Integer, primary_key=True)
     user_id: int = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -108,6 +131,30 @@ class Transaction(Base):
     user = relationship("User", back_populates="transactions")
 
 
+@event.listens_for(Transaction, "before_update")
+@event.listens_for(Transaction, "before_delete")
+def _reject_ledger_changes(mapper, connection, target: Transaction) -> None:
+    raise ValueError("Transactions are append-only; record a correcting transaction instead.")
+
+
+class BalanceSnapshot(Base):
+    """
+    A user's ledger balance after all of their transactions up to and
+    including `transaction_id`.
+    """
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        Index("ix_balance_snapshots_user_id_transaction_id", "user_id", "transaction_id", unique=True),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    user_id: int = Column(BigInteger, ForeignKey("users.id"), nullable=False)
+    # Not a foreign key: snapshots outlive transactions moved to the archive
+    transaction_id: int = Column(Integer, nullable=False)
+    balance: int = Column(Integer, nullable=False)
+    created_at: datetime = Column(DateTime, default=func.now(), nullable=False)
+
+
 class Achievement(Base):
     __tablename__ = "achievements"
 
@@ -119,6 +166,10 @@ class Achievement(Base):
 
 class UserAchievement(Base):
     __tablename__ = "user_achievements"
+    __table_args__ = (
+        # Achievements unlocked since a user's archetype was classified
+        Index("ix_user_achievements_user_id_unlocked_at", "user_id", "unlocked_at"),
+    )
 
     id: int = Column(Integer, primary_key=True)
     user_id: int = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -127,3 +178,12 @@ class UserAchievement(Base):
 
     user = relationship("User", back_populates="achievements")
     achievement = relationship("Achievement")
+
+
+class UserCommandStat(Base):
+    __tablename__ = "user_command_stats"
+
+    user_id: int = Column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    command: str = Column(String, primary_key=True)
+    count: int = Column(Integer, default=0, nullable=False)
+    updated_at: datetime = Column(DateTime, default=func.now(), nullable=False)
@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("id", "user_id", "amount", "description", "created_at")
+# The arrays of an archived month and their types; descriptions are split
+# into their lengths (offsets once written) and one UTF-8 blob
+_DTYPES = {
+    "id": np.int64,
+    "user_id": np.int64,
+    "amount": np.int64,
+    "description_lengths": np.int64,
+    "description_data": np.uint8,
+    "has_description": bool,
+    "created_at": "datetime64[us]",
+}
+
+
+class ArchivedTransaction(NamedTuple):
+    """
+    A transaction read back from the archive, with the fields of `Transaction`.
+    """
+    id: int
+    user_id: int
+    amount: int
+    description: Optional[str]
+    created_at: datetime
+
+
+class ArchiveColumns:
+    """
+    A month of transactions collected for the archive as per-column arrays,
+    so a month is never held as Python rows. Rows are appended in chunks,
+    in (user_id, id) order.
+    """
+
+    def __init__(self):
+        self._chunks: Dict[str, List[np.ndarray]] = {name: [] for name in _DTYPES}
+        self.rows = 0
+
+    def append(self, rows: Sequence[Sequence]) -> None:
+        """
+        Appends (id, user_id, amount, description, created_at) rows.
+        """
+        if not rows:
+            return
+        ids, user_ids, amounts, descriptions, created_at = zip(*rows)
+        encoded = [b"" if d is None else d.encode("utf-8") for d in descriptions]
+        for name, values in (
+            ("id", ids),
+            ("user_id", user_ids),
+            ("amount", amounts),
+            ("description_lengths", [len(d) for d in encoded]),
+            ("has_description", [d is not None for d in descriptions]),
+            ("created_at", created_at),
+        ):
+            self._chunks[name].append(np.array(values, dtype=_DTYPES[name]))
+        self._chunks["description_data"].append(np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        self.rows += len(rows)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the arrays of the archive file.
+        """
+        arrays = {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=_DTYPES[name])
+            for name, chunks in self._chunks.items()
+        }
+        lengths = arrays.pop("description_lengths")
+        arrays["description_offsets"] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return arrays
+
+
+class TransactionArchive:
+    """
+    Archived months of the transaction ledger, one compressed columnar file
+    (NumPy .npz) per month.
+
+    Rows are sorted by (user_id, id), so a user's rows in a month are found
+    with a binary search. Descriptions are stored as one UTF-8 blob with the
+    offset of each row's text. Recently read months are kept decoded in
+    memory, up to `cache_months`; the archive is read from worker threads,
+    so the cache is guarded by a lock.
+    """
+
+    def __init__(self, directory: Path, cache_months: int = 2):
+        self._directory = Path(directory)
+        self._cache_months = cache_months
+        self._cache: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def path(self, month: datetime) -> Path:
+        return self._directory / f"transactions_{month:%Y_%m}.npz"
+
+    def months(self) -> List[datetime]:
+        """
+        Returns the archived months, oldest first.
+        """
+        if not self._directory.exists():
+            return []
+        return sorted(
+            datetime.strptime(path.stem, "transactions_%Y_%m")
+            for path in self._directory.glob("transactions_*.npz")
+        )
+
+    def write(self, month: datetime, columns: ArchiveColumns) -> Path:
+        """
+        Writes a month of transactions, collected in (user_id, id) order.
+        The file appears atomically, replacing any earlier export of the month.
+        """
+        arrays = columns.arrays()
+        user_steps, id_steps = np.diff(arrays["user_id"]), np.diff(arrays["id"])
+        if np.any((user_steps < 0) | ((user_steps == 0) & (id_steps <= 0))):
+            raise ValueError("Archived transactions must be in (user_id, id) order")
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(month)
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as file:
+            np.savez_compressed(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(partial, path)
+        with self._cache_lock:
+            self._cache.pop(path.name, None)
+        logger.info("Archived %d transactions of %s to %s", columns.rows, f"{month:%Y-%m}", path)
+        return path
+
+    def history(self, user_id: int, limit: int = 20, before_id: Optional[int] = None) -> List[ArchivedTransaction]:
+        """
+        Returns the user's archived transactions, newest first, starting before `before_id`.
+        """
+        found: List[ArchivedTransaction] = []
+        for month in reversed(self.months()):
+            columns, start, stop = self._user_rows(month, user_id)
+            ids = columns["id"][start:stop]
+            if before_id is not None:
+                stop = start + int(np.searchsorted(ids, before_id))
+            for index in range(stop - 1, start - 1, -1):
+                found.append(self._row(columns, index))
+                if len(found) == limit:
+                    return found
+        return found
+
+    def total_up_to(self, user_id: int, at: datetime) -> int:
+        """
+        Returns the sum of the user's archived transactions created at or before `at`.
+        """
+        total = 0
+        cutoff = np.datetime64(at, "us")
+        for month in self.months():
+            if month > at:
+                break
+            columns, start, stop = self._user_rows(month, user_id)
+            mask = columns["created_at"][start:stop] <= cutoff
+            total += int(columns["amount"][start:stop][mask].sum())
+        return total
+
+    def _user_rows(self, month: datetime, user_id: int):
+        columns = self._load(month)
+        user_ids = columns["user_id"]
+        start = int(np.searchsorted(user_ids, user_id, side="left"))
+        stop = int(np.searchsorted(user_ids, user_id, side="right"))
+        return columns, start, stop
+
+    def _load(self, month: datetime) -> Dict[str, np.ndarray]:
+        path = self.path(month)
+        with self._cache_lock:
+            columns = self._cache.get(path.name)
+            if columns is not None:
+                self._cache.move_to_end(path.name)
+                return columns
+        # Decoded outside the lock so reads of cached months do not wait
+        with np.load(path) as archive:
+            columns = {name: archive[name] for name in archive.files}
+        with self._cache_lock:
+            self._cache[path.name] = columns
+            while len(self._cache) > self._cache_months:
+                self._cache.popitem(last=False)
+        return columns
+
+    @staticmethod
+    def _row(columns: Dict[str, np.ndarray], index: int) -> ArchivedTransaction:
+        description = None
+        if columns["has_description"][index]:
+            start, stop = columns["description_offsets"][index:index + 2]
+            description = columns["description_data"][start:stop].tobytes().decode("utf-8")
+        return ArchivedTransaction(
+            id=int(columns["id"][index]),
+            user_id=int(columns["user_id"][index]),
+            amount=int(columns["amount"][index]),
+            description=description,
+            created_at=columns["created_at"][index].astype(datetime),
+        )
+
+
+def create_transaction_archive(directory: str, enabled: bool, cache_months: int = 2) -> Optional[TransactionArchive]:
+    """
+    Returns the transaction archive, or None when archival is disabled.
+    """
+    if not enabled:
+        return None
+    return TransactionArchive(Path(directory), cache_months=cache_months)
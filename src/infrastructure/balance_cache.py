@@ -0,0 +1,112 @@
+import logging
+from collections import Counter
+from typing import Optional
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Stores a committed balance unless the hash already has a newer one
+_SET_IF_NEWER = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '-1')
+if current >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'balance', ARGV[1], 'version', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Stores a balance read from the database unless a write got there first
+_FILL = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'balance', ARGV[1], 'version', 0)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class WalletBalanceCache:
+    """
+    Wallet balances kept in one Redis hash per user.
+
+    Balance changes are written through after their unit of work commits,
+    versioned by the id of the transaction that made them, so a late write
+    never overwrites a newer balance. Misses are filled from the database
+    with version 0 and only if no write got there first; filled entries
+    expire after `fill_ttl` seconds, which bounds how long a fill from a
+    lagging replica can be served. Redis errors are logged and reported as
+    misses, so callers fall back to the database.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        prefix: str = "wallet",
+        ttl: int = 24 * 3600,
+        fill_ttl: int = 300,
+    ):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._ttl = ttl
+        self._fill_ttl = fill_ttl
+        self._set_if_newer = redis_client.register_script(_SET_IF_NEWER)
+        self._fill = redis_client.register_script(_FILL)
+        self.stats: Counter = Counter()
+
+    def key(self, user_id: int) -> str:
+        return f"{self._prefix}:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[int]:
+        """
+        Returns the cached balance, or None on a miss.
+        """
+        try:
+            balance = await self._redis.hget(self.key(user_id), "balance")
+        except redis.RedisError:
+            logger.warning("Could not read the cached balance of user %s", user_id, exc_info=True)
+            self.stats["errors"] += 1
+            return None
+        self.stats["misses" if balance is None else "hits"] += 1
+        return None if balance is None else int(balance)
+
+    async def set(self, user_id: int, balance: int, version: int) -> None:
+        """
+        Stores a committed balance, written by the transaction `version`.
+        """
+        try:
+            await self._set_if_newer(keys=[self.key(user_id)], args=[balance, version, self._ttl])
+        except redis.RedisError:
+            logger.warning("Could not cache the balance of user %s", user_id, exc_info=True)
+            await self.forget(user_id)
+
+    async def fill(self, user_id: int, balance: int) -> None:
+        """
+        Stores a balance read from the database on a miss.
+        """
+        try:
+            await self._fill(keys=[self.key(user_id)], args=[balance, self._fill_ttl])
+        except redis.RedisError:
+            logger.warning("Could not cache the balance of user %s", user_id, exc_info=True)
+
+    async def forget(self, user_id: int) -> None:
+        try:
+            await self._redis.delete(self.key(user_id))
+        except redis.RedisError:
+            logger.error("Could not drop the cached balance of user %s", user_id, exc_info=True)
+
+
+def create_balance_cache(
+    redis_client: redis.Redis,
+    enabled: bool,
+    prefix: str = "wallet",
+    ttl: int = 24 * 3600,
+    fill_ttl: int = 300,
+) -> Optional[WalletBalanceCache]:
+    """
+    Returns the wallet balance cache, or None when it is disabled.
+    """
+    if not enabled:
+        return None
+    return WalletBalanceCache(redis_client, prefix=prefix, ttl=ttl, fill_ttl=fill_ttl)
@@ -0,0 +1,469 @@
+import asyncio
+import enum
+import json
+import logging
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
+import redis.asyncio as redis
+from sqlalchemy import Date, DateTime, Enum, event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+logger = logging.getLogger(__name__)
+
+# Marks a key that is not in a cache tier; None is a cached "not found"
+NOT_FOUND = object()
+# Returned for rows that could not be cached, so waiters load them on their own
+_UNCACHEABLE = object()
+
+
+class LocalCache:
+    """
+    Per-process LRU cache with a TTL per entry.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return NOT_FOUND
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return NOT_FOUND
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RowCodec:
+    """
+    Converts a model's column values to and from JSON.
+    """
+
+    def __init__(self, model: Type):
+        self._columns = [(attr.key, attr.columns[0].type) for attr in inspect(model).column_attrs]
+
+    def values(self, instance: Any) -> Optional[Dict[str, Any]]:
+        """
+        Returns the column values of a loaded instance, or None if some are not loaded.
+        """
+        loaded = inspect(instance).dict
+        if any(key not in loaded for key, _ in self._columns):
+            return None
+        return {key: loaded[key] for key, _ in self._columns}
+
+    def dumps(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for key, value in values.items():
+            if isinstance(value, enum.Enum):
+                value = value.name
+            elif isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            row[key] = value
+        return row
+
+    def loads(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        values = {}
+        for key, column_type in self._columns:
+            value = row.get(key)
+            if value is not None:
+                if isinstance(column_type, Enum) and column_type.enum_class is not None:
+                    value = column_type.enum_class[value]
+                elif isinstance(column_type, DateTime):
+                    value = datetime.fromisoformat(value)
+                elif isinstance(column_type, Date):
+                    value = date.fromisoformat(value)
+            values[key] = value
+        return values
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    How a repository's lookups are cached.
+
+    `lookups` are unique columns, besides the primary key, that the
+    repository looks rows up by. `version` is part of every key, so bumping
+    it retires all entries written by older code.
+    """
+    model: Type
+    region: str
+    ttl: float = 60
+    negative_ttl: float = 10
+    local_ttl: float = 5
+    version: int = 1
+    lookups: Tuple[str, ...] = ()
+
+    @property
+    def primary_key(self) -> str:
+        return inspect(self.model).primary_key[0].key
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return (self.primary_key,) + self.lookups
+
+
+# Cached models, filled by @cached_repository
+CACHE_POLICIES: Dict[Type, CachePolicy] = {}
+_CODECS: Dict[Type, RowCodec] = {}
+
+
+def cached_repository(
+    model: Type,
+    region: Optional[str] = None,
+    ttl: float = 60,
+    negative_ttl: float = 10,
+    local_ttl: float = 5,
+    version: int = 1,
+    lookups: Iterable[str] = (),
+):
+    """
+    Class decorator that opts a repository in to the cache.
+
+    The repository's `get()` and its `_get_cached()` lookups are then served
+    from the cache whenever the session has one, and committed changes to
+    the model invalidate the affected keys.
+    """
+    policy = CachePolicy(
+        model=model,
+        region=region or model.__tablename__,
+        ttl=ttl,
+        negative_ttl=negative_ttl,
+        local_ttl=local_ttl,
+        version=version,
+        lookups=tuple(lookups),
+    )
+
+    def decorator(cls):
+        cls.cache_policy = policy
+        CACHE_POLICIES[model] = policy
+        _CODECS[model] = RowCodec(model)
+        return cls
+
+    return decorator
+
+
+class Cache:
+    """
+    Two-tier read-through cache: a per-process LRU in front of Redis.
+
+    Concurrent misses for a key share one load. Missing rows are cached for
+    `negative_ttl`. Every key has a version counter in Redis that is bumped
+    after each committed change, and entries are only served for the version
+    they were loaded under, so a load racing with a write cannot repopulate
+    Redis with the old row. Likewise, the local tier is not refilled with a
+    row read before an invalidation of its key seen by this process. Other
+    processes drop their local copies through pub/sub; if a message is
+    lost, the short local TTL bounds staleness. Redis errors are logged and
+    the cache falls back to the loader.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        prefix: str = "cache",
+        channel: str = "cache_invalidation",
+        local_max_entries: int = 10_000,
+        version_ttl: int = 24 * 3600,
+    ):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._channel = channel
+        self._version_ttl = version_ttl
+        self._local = LocalCache(local_max_entries)
+        # Invalidations seen by this process, numbered, for the most recently
+        # invalidated keys; reads older than `_forgotten` cannot be checked
+        self._invalidations = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._max_invalidated = local_max_entries
+        self._forgotten = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._node_id = uuid.uuid4().hex
+        self.stats: Counter = Counter()
+
+    def key(self, policy: CachePolicy, field: str, value: Any) -> str:
+        return f"{self._prefix}:{policy.region}:v{policy.version}:{field}={value}"
+
+    def keys_for(self, policy: CachePolicy, instance: Any) -> Set[str]:
+        """
+        Returns every key under which the instance may be cached, including
+        the keys of lookup values it had before the current flush.
+        """
+        state = inspect(instance)
+        keys = set()
+        for field in policy.fields:
+            values = list(state.attrs[field].history.deleted)
+            if field in state.dict:
+                values.append(state.dict[field])
+            keys.update(self.key(policy, field, value) for value in values if value is not None)
+        return keys
+
+    async def get_or_load(
+        self,
+        policy: CachePolicy,
+        field: str,
+        value: Any,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        store: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached column values for a lookup, or None if the row
+        does not exist. On a miss, `loader` loads the instance. Without
+        `store`, loaded rows are not cached, for loaders that may read stale
+        data such as a lagging replica.
+        """
+        key = self.key(policy, field, value)
+        values = self._local.get(key)
+        if values is not NOT_FOUND:
+            self.stats["local_hits"] += 1
+            return values
+        if not store:
+            values = await self._read_redis(policy, key)
+            if values is not NOT_FOUND:
+                return values
+            self.stats["loads"] += 1
+            return await self._load(policy, loader)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            try:
+                values = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The loading caller was cancelled, load on our own
+                values = _UNCACHEABLE
+            if values is _UNCACHEABLE:
+                return await self._load(policy, loader)
+            return values
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            values = await self._fetch(policy, key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(values)
+        finally:
+            del self._inflight[key]
+        return None if values is _UNCACHEABLE else values
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        """
+        Drops the keys from both tiers, bumps their versions and tells the
+        other processes to drop their local copies.
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return
+        for key in keys:
+            self._drop_local(key)
+        self.stats["invalidations"] += len(keys)
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(f"{key}:ver")
+                    pipe.expire(f"{key}:ver", self._version_ttl)
+                    pipe.delete(key)
+                pipe.publish(self._channel, json.dumps({"node": self._node_id, "keys": keys}))
+                await pipe.execute()
+        except redis.RedisError:
+            logger.warning("Could not invalidate %d cache keys in Redis", len(keys), exc_info=True)
+
+    async def listen(self) -> None:
+        """
+        Drops local entries invalidated by other processes until cancelled.
+        Returns at once without Redis.
+        """
+        if self._redis is None:
+            return
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self._channel)
+        logger.info("Cache invalidation listener subscribed to '%s' channel.", self._channel)
+        while True:
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                data = json.loads(message["data"])
+                if data.get("node") != self._node_id:
+                    for key in data.get("keys", ()):
+                        self._drop_local(key)
+            except json.JSONDecodeError:
+                logger.warning("Could not decode cache invalidation: %s", message.get("data"))
+            except Exception:
+                logger.error("Error in cache invalidation listener", exc_info=True)
+                # Entries may have been missed while disconnected, including
+                # those of reads still in flight
+                self._local.clear()
+                self._invalidations += 1
+                self._forgotten = self._invalidations
+                await asyncio.sleep(1)
+
+    def _drop_local(self, key: str) -> None:
+        """
+        Drops a local entry and remembers when, so reads that started
+        before do not put it back.
+        """
+        self._local.delete(key)
+        self._invalidations += 1
+        self._invalidated[key] = self._invalidations
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self._max_invalidated:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+
+    def _fill_local(self, key: str, values: Any, ttl: float, read_after: int) -> None:
+        """
+        Caches values read after invalidation number `read_after` in the
+        local tier, unless their key has been invalidated since.
+        """
+        if read_after < self._forgotten or self._invalidated.get(key, 0) > read_after:
+            self.stats["stale_fills"] += 1
+            return
+        self._local.set(key, values, ttl)
+
+    async def _fetch(
+        self,
+        policy: CachePolicy,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Any:
+        codec = _CODECS[policy.model]
+        read_after = self._invalidations
+        version = 0
+        redis_available = self._redis is not None
+        if redis_available:
+            try:
+                payload, raw_version = await self._redis.mget(key, f"{key}:ver")
+                version = int(raw_version or 0)
+                values = self._decode(policy, key, payload, version, read_after)
+                if values is not NOT_FOUND:
+                    return values
+            except redis.RedisError:
+                logger.warning("Cache read from Redis failed for %s", key, exc_info=True)
+                redis_available = False
+
+        self.stats["loads"] += 1
+        instance = await loader()
+        values = None if instance is None else codec.values(instance)
+        if instance is not None and values is None:
+            return _UNCACHEABLE
+
+        ttl = policy.ttl if values is not None else policy.negative_ttl
+        self._fill_local(key, values, min(policy.local_ttl, ttl), read_after)
+        if redis_available:
+            row = None if values is None else codec.dumps(values)
+            try:
+                await self._redis.set(key, json.dumps({"ver": version, "row": row}), ex=max(1, round(ttl)))
+            except redis.RedisError:
+                logger.warning("Cache write to Redis failed for %s", key, exc_info=True)
+        return values
+
+    async def _read_redis(self, policy: CachePolicy, key: str) -> Any:
+        if self._redis is None:
+            return NOT_FOUND
+        read_after = self._invalidations
+        try:
+            payload, raw_version = await self._redis.mget(key, f"{key}:ver")
+        except redis.RedisError:
+            logger.warning("Cache read from Redis failed for %s", key, exc_info=True)
+            return NOT_FOUND
+        return self._decode(policy, key, payload, int(raw_version or 0), read_after)
+
+    def _decode(
+        self, policy: CachePolicy, key: str, payload: Optional[bytes], version: int, read_after: int
+    ) -> Any:
+        """
+        Returns the values of a Redis entry, or NOT_FOUND if there is no
+        entry for the current version.
+        """
+        if payload is None:
+            return NOT_FOUND
+        entry = json.loads(payload)
+        if entry["ver"] != version:
+            return NOT_FOUND
+        self.stats["redis_hits"] += 1
+        values = None if entry["row"] is None else _CODECS[policy.model].loads(entry["row"])
+        self._fill_local(key, values, min(policy.local_ttl, policy.ttl), read_after)
+        return values
+
+    async def _load(
+        self, policy: CachePolicy, loader: Callable[[], Awaitable[Optional[Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        instance = await loader()
+        return None if instance is None else _CODECS[policy.model].values(instance)
+
+
+def create_cache(
+    redis_client: Optional[redis.Redis],
+    enabled: bool,
+    redis_tier: bool = True,
+    prefix: str = "cache",
+    channel: str = "cache_invalidation",
+    local_max_entries: int = 10_000,
+) -> Optional[Cache]:
+    """
+    Returns the repository cache, or None when caching is disabled.
+    Without `redis_tier` only the per-process tier is used.
+    """
+    if not enabled:
+        return None
+    logger.info("Repository cache enabled (Redis tier: %s)", redis_tier)
+    return Cache(
+        redis_client if redis_tier else None,
+        prefix=prefix,
+        channel=channel,
+        local_max_entries=local_max_entries,
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session: Session, flush_context) -> None:
+    cache: Optional[Cache] = session.info.get("cache")
+    if cache is None:
+        return
+    pending = session.info.setdefault("cache_pending", set())
+    for instance in chain(session.new, session.dirty, session.deleted):
+        policy = CACHE_POLICIES.get(type(instance))
+        if policy is not None:
+            pending.update(cache.keys_for(policy, instance))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    keys: List[str] = session.info.pop("cache_pending", None)
+    if keys:
+        await_only(session.info["cache"].invalidate(keys))
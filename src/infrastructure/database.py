@@ -0,0 +1,167 @@
+import logging
+from typing import Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from src.infrastructure.cache import Cache
+from src.infrastructure.replica import ReplicaRoutingSession
+from src.infrastructure.group_commit import GroupCommitSession, GroupCommitWriter
+from src.infrastructure.sqlite import apply_sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+
+def create_db_engine(
+    url: str,
+    echo: bool = False,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    statement_cache_size: int = 100,
+    sqlite_tuning: bool = False,
+    sqlite_mmap_size: int = 256 * 1024 * 1024,
+    sqlite_cache_size_kb: int = 64 * 1024,
+    sqlite_busy_timeout_ms: int = 5000,
+) -> AsyncEngine:
+    """
+    Creates the async engine for the configured backend.
+
+    PostgreSQL (asyncpg) gets a sized connection pool and prepared statement
+    caches. SQLite keeps SQLAlchemy's pool defaults, since it has a single
+    writer; with `sqlite_tuning` its connections get the WAL performance
+    profile from `apply_sqlite_pragmas`.
+    """
+    database_url = make_url(url)
+    backend = database_url.get_backend_name()
+
+    if backend == "postgresql":
+        if database_url.get_driver_name() == "asyncpg":
+            database_url = database_url.update_query_dict(
+                {"prepared_statement_cache_size": str(statement_cache_size)}
+            )
+            connect_args = {"statement_cache_size": statement_cache_size}
+        else:
+            connect_args = {}
+        logger.info(
+            "Using PostgreSQL (%s) with pool_size=%d, max_overflow=%d",
+            database_url.get_driver_name(), pool_size, max_overflow,
+        )
+        return create_async_engine(
+            database_url,
+            echo=echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
+        )
+
+    logger.info("Using %s database at %s", backend, database_url.database)
+    engine = create_async_engine(database_url, echo=echo)
+    if backend == "sqlite" and sqlite_tuning and is_file_database(url):
+        apply_sqlite_pragmas(
+            engine,
+            mmap_size=sqlite_mmap_size,
+            cache_size_kb=sqlite_cache_size_kb,
+            busy_timeout_ms=sqlite_busy_timeout_ms,
+        )
+    return engine
+
+
+def is_file_database(url: str) -> bool:
+    database = make_url(url).database
+    return bool(database) and database != ":memory:" and "mode=memory" not in url
+
+
+def create_replica_engine(
+    engine: AsyncEngine,
+    url: Optional[str] = None,
+    sqlite_read_only: bool = False,
+    **engine_options,
+) -> Optional[AsyncEngine]:
+    """
+    Returns the engine read-only units of work read from, or None.
+
+    `url` points at a replica of the primary database and gets the same
+    engine options. Without one, a file-backed SQLite primary can be read
+    through separate read-only connections with `sqlite_read_only`.
+    """
+    if url:
+        return create_db_engine(url, **engine_options)
+    if sqlite_read_only and engine.dialect.name == "sqlite" and is_file_database(str(engine.url)):
+        read_only_url = engine.url.set(
+            database=f"file:{engine.url.database}", query={"mode": "ro", "uri": "true"}
+        )
+        logger.info("Using read-only SQLite connections for read-only handlers")
+        return create_async_engine(read_only_url, echo=engine.echo)
+    return None
+
+
+def create_group_commit_writer(
+    engine: AsyncEngine,
+    enabled: bool,
+    window: float = 0.003,
+    max_batch: int = 64,
+    sqlite_mmap_size: int = 256 * 1024 * 1024,
+    sqlite_cache_size_kb: int = 64 * 1024,
+    sqlite_busy_timeout_ms: int = 5000,
+) -> Optional[GroupCommitWriter]:
+    """
+    Returns the group commit writer, or None when group commit is disabled
+    or the database is not an SQLite file.
+
+    The writer gets its own unpooled engine for the same database, with the
+    WAL profile, which also makes SAVEPOINTs work. Other backends are not
+    supported: all writes share the writer's one connection, held by each
+    unit of work from its first write to its commit, which serializes the
+    writers of a pooled server database.
+    """
+    if not enabled:
+        return None
+    if engine.dialect.name != "sqlite":
+        logger.warning("Group commit only supports SQLite files, it stays off on %s", engine.dialect.name)
+        return None
+    if not is_file_database(str(engine.url)):
+        return None
+    write_engine = create_async_engine(engine.url, echo=engine.echo, poolclass=NullPool)
+    apply_sqlite_pragmas(
+        write_engine,
+        mmap_size=sqlite_mmap_size,
+        cache_size_kb=sqlite_cache_size_kb,
+        busy_timeout_ms=sqlite_busy_timeout_ms,
+        explicit_begin=True,
+    )
+    logger.info("Group commit enabled with a %.1f ms window", window * 1000)
+    return GroupCommitWriter(write_engine, window=window, max_batch=max_batch)
+
+
+def create_session_factory(
+    engine: AsyncEngine,
+    group_commit_writer: Optional[GroupCommitWriter] = None,
+    replica_engine: Optional[AsyncEngine] = None,
+    cache: Optional[Cache] = None,
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Creates the session factory. With a group commit writer, sessions read
+    from the pool and route their writes through the writer. With a replica
+    engine, read-only sessions read from the replica. With a cache, cached
+    repositories read through it and commits invalidate what they changed.
+    """
+    options = {}
+    if cache is not None:
+        options["info"] = {"cache": cache}
+    if replica_engine is not None:
+        options.update(
+            sync_session_class=ReplicaRoutingSession,
+            replica_bind=replica_engine.sync_engine,
+        )
+    if group_commit_writer is not None:
+        options.update(
+            sync_session_class=GroupCommitSession,
+            group_commit_writer=group_commit_writer,
+            join_transaction_mode="create_savepoint",
+        )
+    return async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, **options)
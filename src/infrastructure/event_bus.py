@@ -1,7 +1,11 @@
 import json
+import logging
+import time
 import redis.asyncio as redis
 from src.domain.events import Event
 
+logger = logging.getLogger(__name__)
+
 
 class EventPublisher:
     """
@@ -19,6 +23,8 @@ class EventPublisher:
             channel: The Redis channel to publish to.
             event: The event to publish.
         """
-        message = event.model_dump_json()
-        await self._redis_client.publish(channel, message)
-        print(f"Published event {event.event_name} to channel {channel}")
+        # The publish time travels with the event for latency tracing
+        message = event.model_dump(mode="json")
+        message["published_at"] = time.time()
+        await self._redis_client.publish(channel, json.dumps(message))
+        logger.debug("Published event %s to channel %s", event.event_name, channel)
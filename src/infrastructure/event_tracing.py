@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Optional
+from src.infrastructure.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Seconds; events include Telegram calls and retry delays
+EVENT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class EventTrace:
+    """
+    Timings of one event, from publish until its handler finished.
+    """
+
+    def __init__(self, tracer: "EventTracer", event_name: str, event_id: Optional[str], published_at: Optional[float]):
+        self._tracer = tracer
+        self.event_name = event_name
+        self.event_id = event_id
+        self.received = time.perf_counter()
+        # Wall clock, as the publisher may be another process
+        self.publish_lag = max(time.time() - published_at, 0.0) if published_at is not None else None
+        self.queue_wait: Optional[float] = None
+        self.handler_seconds: Optional[float] = None
+        self.retries = 0
+        self._started: Optional[float] = None
+
+    def started(self) -> None:
+        """
+        Marks the handler as started.
+        """
+        self._started = time.perf_counter()
+        self.queue_wait = self._started - self.received
+
+    def retried(self) -> None:
+        self.retries += 1
+
+    def finished(self, outcome: str) -> None:
+        """
+        Marks the handler as finished with `outcome` ("ok", "failed" or "ignored") and records the trace.
+        """
+        now = time.perf_counter()
+        if self._started is None:
+            self.started()
+        self.handler_seconds = now - self._started
+        self._tracer.record(self, outcome)
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.publish_lag or 0.0) + (self.queue_wait or 0.0) + (self.handler_seconds or 0.0)
+
+
+class EventTracer:
+    """
+    Traces events across the event bus: publish-to-receive lag (Redis and
+    the listener loop), the wait before the handler task runs, handler time
+    including retries (Telegram calls), and retry counts, per event type.
+    Events slower end to end than `slow_threshold` seconds are logged with
+    their breakdown.
+    """
+
+    def __init__(self, registry: MetricsRegistry, slow_threshold: float = 5.0):
+        self._slow_threshold = slow_threshold
+        self.publish_lag = registry.histogram(
+            "event_publish_lag_seconds", "Time from publishing an event to the listener receiving it.",
+            ["event"], EVENT_BUCKETS,
+        )
+        self.queue_wait = registry.histogram(
+            "event_queue_wait_seconds", "Time from receiving an event to its handler starting.",
+            ["event"], EVENT_BUCKETS,
+        )
+        self.handler_seconds = registry.histogram(
+            "event_handler_duration_seconds", "Time spent handling an event, retries included.",
+            ["event"], EVENT_BUCKETS,
+        )
+        self.total_seconds = registry.histogram(
+            "event_total_duration_seconds", "Time from publishing an event to its handler finishing.",
+            ["event"], EVENT_BUCKETS,
+        )
+        self.handled = registry.counter("events_handled_total", "Events handled, by outcome.", ["event", "outcome"])
+        self.retries = registry.counter("event_retries_total", "Event handler retries.", ["event"])
+
+    def received(self, event_name: str, event_id: Optional[str] = None, published_at: Optional[float] = None) -> EventTrace:
+        return EventTrace(self, event_name, event_id, published_at)
+
+    def record(self, trace: EventTrace, outcome: str) -> None:
+        name = trace.event_name
+        if trace.publish_lag is not None:
+            self.publish_lag.observe(trace.publish_lag, name)
+            self.total_seconds.observe(trace.total_seconds, name)
+        self.queue_wait.observe(trace.queue_wait, name)
+        self.handler_seconds.observe(trace.handler_seconds, name)
+        self.handled.inc(name, outcome)
+        if trace.retries:
+            self.retries.inc(name, amount=trace.retries)
+
+        if trace.total_seconds > self._slow_threshold:
+            logger.warning(
+                "Slow event %s %s (%s): %.3fs total, publish lag %s, queue wait %.3fs, handler %.3fs, %d retries",
+                name, trace.event_id, outcome, trace.total_seconds,
+                f"{trace.publish_lag:.3f}s" if trace.publish_lag is not None else "unknown",
+                trace.queue_wait, trace.handler_seconds, trace.retries,
+            )
+
+
+def create_event_tracer(enabled: bool, registry: MetricsRegistry, slow_threshold: float = 5.0) -> Optional[EventTracer]:
+    """
+    Returns the event tracer, or None when metrics are disabled.
+    """
+    if not enabled:
+        return None
+    return EventTracer(registry, slow_threshold)
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.util import await_only
+from src.infrastructure.replica import ReplicaRoutingSession
+
+logger = logging.getLogger(__name__)
+
+
+class WriteLease:
+    """
+    Exclusive use of the writer connection by one session.
+    """
+
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.granted: asyncio.Future = loop.create_future()
+        self.released: asyncio.Future = loop.create_future()
+        self.durable: asyncio.Future = loop.create_future()
+
+    @property
+    def connection(self) -> Connection:
+        return self.granted.result().sync_connection
+
+
+class GroupCommitWriter:
+    """
+    Commits the writes of concurrent units of work together.
+
+    All write transactions share one connection, opened from the writer's
+    own engine so it never competes with the read pool (a session may hold a
+    read connection while it waits for the writer). The writer hands it to one
+    session at a time; each session's work runs inside a SAVEPOINT of the
+    writer's open transaction, so a failed session only rolls back its own
+    changes. Sessions that finish within `window` seconds of the group's
+    first one, up to `max_batch`, are committed with a single COMMIT, and
+    only then do their commits return.
+    """
+
+    def __init__(self, engine: AsyncEngine, window: float = 0.003, max_batch: int = 64):
+        # Engine used only by the writer, not the application's engine
+        self._engine = engine
+        self._window = window
+        self._max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[AsyncConnection] = None
+
+    async def acquire(self) -> WriteLease:
+        """
+        Waits for exclusive use of the writer connection.
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        lease = WriteLease()
+        self._queue.put_nowait(lease)
+        try:
+            await lease.granted
+        except asyncio.CancelledError:
+            # Granted just as the caller was cancelled: hand the connection back
+            if not lease.granted.cancelled():
+                lease.released.set_result(False)
+            raise
+        return lease
+
+    async def release(self, lease: WriteLease, commit: bool) -> None:
+        """
+        Returns the connection to the writer. With `commit`, waits until the
+        group transaction containing the lease's changes is durable.
+        """
+        if not lease.released.done():
+            lease.released.set_result(commit)
+        if commit:
+            await lease.durable
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        await self._engine.dispose()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            lease = await self._queue.get()
+            if lease.granted.cancelled():
+                continue
+            if self._connection is None:
+                self._connection = await self._engine.connect()
+                # Take SQLite's write lock up front instead of on the first write
+                self._connection.sync_connection.info["sqlite_begin"] = "BEGIN IMMEDIATE"
+
+            members: List[WriteLease] = []
+            try:
+                await self._connection.begin()
+                deadline = loop.time() + self._window
+                while lease is not None:
+                    lease.granted.set_result(self._connection)
+                    members.append(lease)
+                    await lease.released
+                    if len(members) >= self._max_batch:
+                        break
+                    lease = await self._next_lease(deadline)
+                await self._connection.commit()
+            except Exception as e:
+                logger.error("Group commit of %d sessions failed", len(members), exc_info=True)
+                await self._rollback()
+                for member in members:
+                    if not member.durable.done():
+                        member.durable.set_exception(e)
+                if lease is not None and lease not in members and not lease.granted.done():
+                    lease.granted.set_exception(e)
+                continue
+
+            for member in members:
+                if not member.durable.done():
+                    member.durable.set_result(None)
+            logger.debug("Group commit of %d sessions", len(members))
+
+    async def _next_lease(self, deadline: float) -> Optional[WriteLease]:
+        """
+        Returns the next waiting lease, waiting until `deadline` for one to
+        arrive, or None when the group should be committed.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue.empty():
+                lease = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    return None
+                try:
+                    lease = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            if not lease.granted.cancelled():
+                return lease
+
+    async def _rollback(self) -> None:
+        try:
+            await self._connection.rollback()
+        except Exception:
+            logger.error("Could not roll back the group commit connection", exc_info=True)
+            await self._connection.close()
+            self._connection = None
+
+
+class GroupCommitSession(ReplicaRoutingSession):
+    """
+    Session that reads from the pool and writes through a `GroupCommitWriter`.
+
+    The first flush or DML statement acquires the writer connection; from
+    then on the session uses it for everything until commit or rollback.
+    Every other writer waits meanwhile, so the connection must not be held
+    across external I/O: bot handlers commit before each Bot API request
+    (see `CommitBeforeRequestMiddleware`).
+    """
+
+    def __init__(self, *args: Any, group_commit_writer: Optional[GroupCommitWriter] = None, **kw: Any):
+        super().__init__(*args, **kw)
+        self.group_commit_writer = group_commit_writer
+        self.write_lease: Optional[WriteLease] = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.write_lease is None and self.group_commit_writer is not None and self.is_write(clause):
+            self.write_lease = await_only(self.group_commit_writer.acquire())
+        if self.write_lease is not None:
+            self.info["wrote"] = True
+            return self.write_lease.connection
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+# Runs before other after_commit listeners, such as cache invalidation, so
+# they only see the commit once it is durable
+@event.listens_for(GroupCommitSession, "after_commit", insert=True)
+def _release_after_commit(session: GroupCommitSession) -> None:
+    lease, session.write_lease = session.write_lease, None
+    if lease is not None:
+        await_only(session.group_commit_writer.release(lease, commit=True))
+
+
+@event.listens_for(GroupCommitSession, "after_transaction_end")
+def _release_after_rollback(session: GroupCommitSession, transaction) -> None:
+    if transaction.parent is None and session.write_lease is not None:
+        lease, session.write_lease = session.write_lease, None
+        if not lease.released.done():
+            lease.released.set_result(False)
@@ -0,0 +1,240 @@
+import enum
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardWindow(str, enum.Enum):
+    ALL_TIME = "all"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+
+
+class LeaderboardMetric(str, enum.Enum):
+    """
+    Ranked metrics. The all-time board holds each user's current value;
+    the daily and weekly boards hold what the user did in that period.
+    """
+    # All time: balance. Windows: points earned.
+    BALANCE = "balance"
+    # All time: current streak. Windows: longest streak reached.
+    STREAK = "streak"
+    # All time: engagement rank key. Windows: interactions.
+    ENGAGEMENT = "engagement"
+
+
+# How window boards combine updates: add them up or keep the highest
+_WINDOW_MAX = {LeaderboardMetric.STREAK}
+
+# All-time values that never decrease, so a late update cannot lower them
+_ALL_TIME_MONOTONIC = {LeaderboardMetric.ENGAGEMENT}
+
+# Stores (member, score, version) triples unless the member has a newer version
+_SET_IF_NEWER = """
+local updated = 0
+for i = 1, #ARGV, 3 do
+    local current = tonumber(redis.call('HGET', KEYS[2], ARGV[i]) or '-1')
+    if current < tonumber(ARGV[i + 2]) then
+        redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+        updated = updated + 1
+    end
+end
+return updated
+"""
+
+_WINDOW_LENGTH = {
+    LeaderboardWindow.DAILY: timedelta(days=1),
+    LeaderboardWindow.WEEKLY: timedelta(weeks=1),
+}
+
+
+class LeaderboardEntry(NamedTuple):
+    user_id: int
+    # 1-based position, highest score first
+    rank: int
+    score: float
+
+
+class Leaderboard:
+    """
+    Rankings kept in Redis sorted sets, one per metric and window.
+
+    Updates are applied incrementally, rank lookups are O(log N), and top-N
+    and around-me queries are O(log N + N). Daily and weekly boards are keyed
+    by their period (UTC date or ISO week), so a new period starts an empty
+    board, and old ones expire after `retention_periods` periods. Update
+    errors are logged and dropped; `rebuild` restores all-time boards from
+    the database.
+
+    Updates are sent after their unit of work commits, so two of them for
+    the same user can arrive out of order. Monotonic metrics only ever
+    raise a score; other metrics pass a version per user (as the balance
+    cache does) and an update older than the stored one is ignored.
+    """
+
+    def __init__(self, redis_client: redis.Redis, prefix: str = "leaderboard", retention_periods: int = 2):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._retention_periods = retention_periods
+        self._set_if_newer = redis_client.register_script(_SET_IF_NEWER)
+
+    def key(
+        self,
+        metric: LeaderboardMetric,
+        window: LeaderboardWindow = LeaderboardWindow.ALL_TIME,
+        now: Optional[datetime] = None,
+    ) -> str:
+        now = now or datetime.utcnow()
+        if window is LeaderboardWindow.DAILY:
+            period = now.strftime("%Y-%m-%d")
+        elif window is LeaderboardWindow.WEEKLY:
+            year, week, _ = now.isocalendar()
+            period = f"{year}-W{week:02d}"
+        else:
+            period = "all"
+        return f"{self._prefix}:{metric.value}:{window.value}:{period}"
+
+    async def record(
+        self,
+        metric: LeaderboardMetric,
+        scores: Optional[Dict[int, float]] = None,
+        increments: Optional[Dict[int, float]] = None,
+        now: Optional[datetime] = None,
+        versions: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """
+        Stores users' current values (`scores`) on the all-time board and
+        feeds the window boards: summed metrics add `increments`, maximum
+        metrics keep the highest of `scores`. With `versions`, a user's
+        all-time score is only replaced by a higher version.
+        """
+        now = now or datetime.utcnow()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                if scores:
+                    key = self.key(metric, now=now)
+                    if versions is not None:
+                        args = []
+                        for user_id, score in scores.items():
+                            args += [user_id, score, versions[user_id]]
+                        await self._set_if_newer(keys=[key, f"{key}:versions"], args=args, client=pipe)
+                    else:
+                        pipe.zadd(key, scores, gt=metric in _ALL_TIME_MONOTONIC)
+                for window, length in _WINDOW_LENGTH.items():
+                    key = self.key(metric, window, now)
+                    if metric in _WINDOW_MAX:
+                        if not scores:
+                            continue
+                        pipe.zadd(key, scores, gt=True)
+                    else:
+                        positive = {user_id: n for user_id, n in (increments or {}).items() if n > 0}
+                        if not positive:
+                            continue
+                        for user_id, amount in positive.items():
+                            pipe.zincrby(key, amount, user_id)
+                    pipe.expire(key, int(length.total_seconds()) * self._retention_periods)
+                await pipe.execute()
+        except redis.RedisError:
+            logger.warning("Could not update the %s leaderboard", metric.value, exc_info=True)
+
+    async def top(
+        self,
+        metric: LeaderboardMetric,
+        limit: int = 10,
+        window: LeaderboardWindow = LeaderboardWindow.ALL_TIME,
+        now: Optional[datetime] = None,
+    ) -> List[LeaderboardEntry]:
+        return await self._range(self.key(metric, window, now), 0, limit - 1)
+
+    async def rank(
+        self,
+        metric: LeaderboardMetric,
+        user_id: int,
+        window: LeaderboardWindow = LeaderboardWindow.ALL_TIME,
+        now: Optional[datetime] = None,
+    ) -> Optional[LeaderboardEntry]:
+        """
+        Returns the user's position, or None if the user is not ranked.
+        """
+        key = self.key(metric, window, now)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(key, user_id)
+            pipe.zscore(key, user_id)
+            position, score = await pipe.execute()
+        if position is None:
+            return None
+        return LeaderboardEntry(user_id=user_id, rank=position + 1, score=score)
+
+    async def around(
+        self,
+        metric: LeaderboardMetric,
+        user_id: int,
+        radius: int = 2,
+        window: LeaderboardWindow = LeaderboardWindow.ALL_TIME,
+        now: Optional[datetime] = None,
+    ) -> List[LeaderboardEntry]:
+        """
+        Returns the user's entry with up to `radius` neighbours on each side.
+        """
+        key = self.key(metric, window, now)
+        position = await self._redis.zrevrank(key, user_id)
+        if position is None:
+            return []
+        return await self._range(key, max(position - radius, 0), position + radius)
+
+    async def size(
+        self,
+        metric: LeaderboardMetric,
+        window: LeaderboardWindow = LeaderboardWindow.ALL_TIME,
+        now: Optional[datetime] = None,
+    ) -> int:
+        return await self._redis.zcard(self.key(metric, window, now))
+
+    async def rebuild(
+        self, metric: LeaderboardMetric, chunks: AsyncIterable[Sequence[Tuple[int, float]]]
+    ) -> int:
+        """
+        Replaces the all-time board with (user_id, score) rows, written one
+        chunk at a time to a temporary key that is then renamed over the
+        board, so readers never see a partial board. Returns the row count.
+        """
+        key = self.key(metric)
+        staging_key = f"{key}:rebuild:{uuid.uuid4().hex}"
+        count = 0
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await self._redis.zadd(staging_key, {user_id: score for user_id, score in chunk})
+                    count += len(chunk)
+            if count:
+                await self._redis.rename(staging_key, key)
+            else:
+                await self._redis.delete(key)
+        except BaseException:
+            await self._redis.delete(staging_key)
+            raise
+        logger.info("Rebuilt the %s leaderboard with %d users", metric.value, count)
+        return count
+
+    async def _range(self, key: str, start: int, stop: int) -> List[LeaderboardEntry]:
+        rows = await self._redis.zrevrange(key, start, stop, withscores=True)
+        return [
+            LeaderboardEntry(user_id=int(member), rank=start + offset + 1, score=score)
+            for offset, (member, score) in enumerate(rows)
+        ]
+
+
+def create_leaderboard(
+    redis_client: redis.Redis, enabled: bool, prefix: str = "leaderboard", retention_periods: int = 2
+) -> Optional[Leaderboard]:
+    """
+    Returns the leaderboard, or None when it is disabled.
+    """
+    if not enabled:
+        return None
+    return Leaderboard(redis_client, prefix=prefix, retention_periods=retention_periods)
@@ -0,0 +1,109 @@
+import asyncio
+import enum
+import logging
+import time
+from typing import Optional
+from src.infrastructure.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class LoadLevel(enum.IntEnum):
+    NORMAL = 0
+    # Non-urgent work is postponed
+    DEFER = 1
+    # Expensive optional work is skipped as well
+    SHED = 2
+
+
+class LoadShedder:
+    """
+    Measures event loop lag and decides what optional work to drop.
+
+    `run` sleeps for `interval` seconds at a time; how much later than
+    that it wakes up is the lag, smoothed over samples so a single slow
+    callback does not flip the level. From `defer_threshold` seconds of
+    lag, non-urgent work waits in `calm` and cheap optional work is
+    skipped; from `shed_threshold`, expensive optional work is skipped
+    too. Core replies never consult the shedder.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        interval: float = 0.1,
+        defer_threshold: float = 0.1,
+        shed_threshold: float = 0.5,
+        smoothing: float = 0.3,
+    ):
+        self._interval = interval
+        self._defer_threshold = defer_threshold
+        self._shed_threshold = shed_threshold
+        self._smoothing = smoothing
+        self.lag = 0.0
+        self.level = LoadLevel.NORMAL
+        self.lag_seconds = registry.gauge("event_loop_lag_seconds", "Smoothed event loop lag.")
+        self.level_gauge = registry.gauge("load_shedding_level", "0 normal, 1 deferring, 2 shedding.")
+        self.shed = registry.counter("load_shed_total", "Optional work skipped under load.", ["work"])
+        self.deferred = registry.counter("load_deferred_total", "Non-urgent work postponed under load.", ["work"])
+
+    def observe(self, lag: float) -> None:
+        """
+        Adds a lag sample and updates the level.
+        """
+        self.lag += self._smoothing * (lag - self.lag)
+        if self.lag >= self._shed_threshold:
+            level = LoadLevel.SHED
+        elif self.lag >= self._defer_threshold:
+            level = LoadLevel.DEFER
+        else:
+            level = LoadLevel.NORMAL
+        if level != self.level:
+            logger.warning("Event loop lag %.0f ms, load level %s -> %s", self.lag * 1000, self.level.name, level.name)
+            self.level = level
+        self.lag_seconds.set(value=self.lag)
+        self.level_gauge.set(value=int(level))
+
+    def skip(self, work: str, at: LoadLevel = LoadLevel.SHED) -> bool:
+        """
+        Returns whether to skip `work` at the current level, counting it if so.
+        """
+        if self.level < at:
+            return False
+        self.shed.inc(work)
+        return True
+
+    async def calm(self, work: str, max_wait: float = 60) -> None:
+        """
+        Waits, up to `max_wait` seconds, until the loop is no longer behind.
+        """
+        if self.level < LoadLevel.DEFER:
+            return
+        self.deferred.inc(work)
+        deadline = time.monotonic() + max_wait
+        while self.level >= LoadLevel.DEFER and time.monotonic() < deadline:
+            await asyncio.sleep(self._interval)
+
+    async def run(self) -> None:
+        """
+        Samples the loop lag every `interval` seconds until cancelled.
+        """
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.observe(max(time.perf_counter() - started - self._interval, 0.0))
+
+
+def create_load_shedder(
+    enabled: bool,
+    registry: MetricsRegistry,
+    interval: float = 0.1,
+    defer_threshold: float = 0.1,
+    shed_threshold: float = 0.5,
+) -> Optional[LoadShedder]:
+    """
+    Returns the load shedder, or None when load shedding is disabled.
+    """
+    if not enabled:
+        return None
+    return LoadShedder(registry, interval, defer_threshold, shed_threshold)
@@ -0,0 +1,150 @@
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO, Tuple
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# LogRecord attributes; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `rate` records per second per logger, with bursts
+    of up to `rate` records; `rates` overrides the rate for some loggers
+    (0 means unlimited). Warnings and errors always pass. The next record
+    let through carries the number of records suppressed before it as
+    `suppressed`.
+    """
+
+    def __init__(self, rate: float = 0, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self._rate = rate
+        self._rates = rates or {}
+        # Per logger: tokens, last refill, suppressed records
+        self._buckets: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return self._release(record)
+        rate = self._rates.get(record.name, self._rate)
+        if not rate:
+            return self._release(record)
+        now = time.monotonic()
+        bucket = self._buckets.get(record.name)
+        if bucket is None:
+            bucket = self._buckets[record.name] = [rate, now, 0]
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        return self._release(record)
+
+    def _release(self, record: logging.LogRecord) -> bool:
+        bucket = self._buckets.get(record.name)
+        if bucket is not None and bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller: when the queue is full the
+    record is dropped and counted in `dropped`.
+
+    Only the message is merged on the calling thread, so arguments such as
+    ORM objects are rendered where they were logged. Formatting, exception
+    tracebacks and I/O happen on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message = f"{message} ({suppressed} earlier records from this logger suppressed)"
+        record.msg = message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, with `extra` fields included.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_rates(value: str) -> Dict[str, float]:
+    """
+    Parses per-logger rates such as "aiogram.event=5,src.bot.events=20".
+    """
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name] = float(rate)
+    return rates
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_output: bool = False,
+    rate: float = 0,
+    rates: Optional[Dict[str, float]] = None,
+    queue_size: int = 10000,
+    stream: Optional[TextIO] = None,
+) -> Tuple[QueueListener, NonBlockingQueueHandler]:
+    """
+    Routes all logging through a bounded queue to a listener thread that
+    formats the records and writes them to `stream` (stdout by default),
+    so log I/O never stalls the event loop. Returns the started listener,
+    to stop (and flush) at shutdown, and the queue handler.
+    """
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate, rates))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener, queue_handler
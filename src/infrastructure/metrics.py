@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cached read (~1 ms) up to a stalled update
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, per label values.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, per label values.
+    """
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, *labelvalues: str, value: float) -> None:
+        self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    """
+    Observations counted in cumulative buckets, per label values.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (last is +Inf)], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format.
+
+    Updates are plain dict and list operations without locks: they all
+    happen on the event loop thread, and an observation costs about a
+    microsecond.
+    """
+
+    def __init__(self, namespace: str = "diana"):
+        self._namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self._name(name), documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self._name(name), documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(self._name(name), documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def _name(self, name: str) -> str:
+        return f"{self._namespace}_{name}" if self._namespace else name
+
+    def _register(self, metric: _Metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered with a different type or labels.")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class BotMetrics:
+    """
+    The bot's update metrics: counts, errors, in-flight updates, and
+    latency histograms per update, per processing stage and per handler.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.updates = registry.counter("updates_total", "Updates processed.", ["type"])
+        self.errors = registry.counter("update_errors_total", "Updates that raised an error.", ["type"])
+        self.in_flight = registry.gauge("updates_in_flight", "Updates being processed.")
+        self.update_seconds = registry.histogram(
+            "update_duration_seconds", "Time to process an update, end to end.", ["type"]
+        )
+        self.stage_seconds = registry.histogram(
+            "update_stage_duration_seconds", "Time spent in each stage of update processing.", ["stage"]
+        )
+        self.handler_seconds = registry.histogram(
+            "handler_duration_seconds", "Time spent in each handler.", ["handler"]
+        )
+
+    def stage(self, name: str):
+        """
+        Times a block as one stage of update processing.
+        """
+        return self.stage_seconds.time(name)
+
+    def observe_stage(self, name: str, started: float, ended: Optional[float] = None) -> None:
+        """
+        Records a stage that ran from `started` to `ended` (default now), both from `time.perf_counter()`.
+        """
+        self.stage_seconds.observe((ended if ended is not None else time.perf_counter()) - started, name)
+
+
+class MetricsServer:
+    """
+    Serves the registry on http://{host}:{port}/metrics for Prometheus to scrape.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self._registry = registry
+        self._host = host
+        self._port = port
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self._registry.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def run(self) -> None:
+        """
+        Serves until cancelled.
+        """
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self._host, self._port).start()
+            logger.info("Serving metrics on http://%s:%d/metrics", self._host, self._port)
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def create_bot_metrics(enabled: bool, registry: MetricsRegistry) -> Optional[BotMetrics]:
+    """
+    Returns the bot metrics, or None when metrics are disabled.
+    """
+    if not enabled:
+        return None
+    return BotMetrics(registry)
@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, MetaData, Row, String, Table, delete, func, inspect, select, text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from src.domain.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TABLE_PREFIX = "transactions_archive_"
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"transactions_p{month:%Y_%m}"
+
+
+def archive_table(month: datetime) -> Table:
+    """
+    A standalone table holding one month of transactions on its way to the archive.
+    """
+    return Table(
+        f"{ARCHIVE_TABLE_PREFIX}{month:%Y_%m}",
+        MetaData(),
+        Column("id", Integer, nullable=False),
+        Column("user_id", BigInteger, nullable=False),
+        Column("amount", Integer, nullable=False),
+        Column("description", String, nullable=True),
+        Column("created_at", DateTime, nullable=False),
+    )
+
+
+class TransactionPartitions:
+    """
+    Monthly partitions of the transactions table.
+
+    On PostgreSQL `transactions` is range-partitioned by `created_at`;
+    `ensure` creates the partitions of the coming months ahead of time and
+    `detach` turns a month's partition into a standalone table. SQLite has no
+    partitioning, so there `detach` rotates the month's rows out of
+    `transactions` into a standalone table of the same shape. Either way the
+    hot table only keeps the months that were not detached.
+
+    Every operation runs in its own transaction on the engine, outside of
+    units of work, as most of them are DDL.
+    """
+
+    def __init__(self, engine: AsyncEngine, months_ahead: int = 2):
+        self._engine = engine
+        self._months_ahead = months_ahead
+
+    @property
+    def is_postgres(self) -> bool:
+        return self._engine.dialect.name == "postgresql"
+
+    async def ensure(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Creates the missing partitions from the current month to `months_ahead`
+        months ahead. Returns the names of the created partitions.
+        """
+        if not self.is_postgres:
+            return []
+        current = month_start(now or datetime.utcnow())
+        created = []
+        async with self._engine.begin() as connection:
+            for offset in range(self._months_ahead + 1):
+                month = add_months(current, offset)
+                name = partition_name(month)
+                if await self._exists(connection, name):
+                    continue
+                start, end = self._bounds(month)
+                await connection.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF transactions "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                ))
+                created.append(name)
+        if created:
+            logger.info("Created transaction partitions: %s", ", ".join(created))
+        return created
+
+    async def oldest_month(self) -> Optional[datetime]:
+        """
+        Returns the month of the oldest transaction still in the hot table.
+        """
+        async with self._engine.connect() as connection:
+            oldest = (await connection.execute(select(func.min(Transaction.created_at)))).scalar()
+        return month_start(oldest) if oldest is not None else None
+
+    async def detach(self, month: datetime) -> Table:
+        """
+        Moves a month of transactions out of the hot table into its archive table.
+        """
+        table = archive_table(month)
+        name = partition_name(month)
+        async with self._engine.begin() as connection:
+            if self.is_postgres and await self._exists(connection, name):
+                await connection.execute(text(f"ALTER TABLE transactions DETACH PARTITION {name}"))
+                await connection.execute(text(f"ALTER TABLE {name} RENAME TO {table.name}"))
+            else:
+                # Rows of SQLite, or rows PostgreSQL put in the default partition.
+                # Core statements, as the ORM refuses to delete ledger rows.
+                start, end = self._bounds(month)
+                in_month = (Transaction.created_at >= start, Transaction.created_at < end)
+                # The table is left over from an earlier detach when rows of the
+                # month committed late; add them to it
+                await connection.run_sync(table.create, checkfirst=True)
+                await connection.execute(table.insert().from_select(
+                    [column.name for column in table.columns],
+                    select(*[Transaction.__table__.c[column.name] for column in table.columns]).where(*in_month),
+                ))
+                await connection.execute(delete(Transaction.__table__).where(*in_month))
+        logger.info("Detached the transactions of %s into %s", f"{month:%Y-%m}", table.name)
+        return table
+
+    async def detached(self) -> List[datetime]:
+        """
+        Returns the months whose archive tables still exist, oldest first.
+        """
+        async with self._engine.connect() as connection:
+            names = await connection.run_sync(lambda sync_connection: inspect(sync_connection).get_table_names())
+        return sorted(
+            datetime.strptime(name[len(ARCHIVE_TABLE_PREFIX):], "%Y_%m")
+            for name in names
+            if name.startswith(ARCHIVE_TABLE_PREFIX)
+        )
+
+    async def read(self, month: datetime, chunk_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """
+        Yields the (id, user_id, amount, description, created_at) rows of a
+        detached month by (user_id, id), in chunks.
+        """
+        table = archive_table(month)
+        async with self._engine.connect() as connection:
+            result = await connection.stream(
+                select(*table.columns)
+                .order_by(table.c.user_id, table.c.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for chunk in result.partitions(chunk_size):
+                yield chunk
+
+    async def drop(self, month: datetime) -> None:
+        async with self._engine.begin() as connection:
+            await connection.run_sync(archive_table(month).drop)
+
+    @staticmethod
+    def _bounds(month: datetime) -> Tuple[datetime, datetime]:
+        return month, add_months(month, 1)
+
+    @staticmethod
+    async def _exists(connection: AsyncConnection, name: str) -> bool:
+        return (await connection.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is not None
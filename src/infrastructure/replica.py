@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Seconds the standby is behind; 0 while it has replayed everything it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRoutingSession(Session):
+    """
+    Session that can send the reads of a read-only unit of work to a replica.
+
+    Reads go to `replica_bind` while `info["read_only"]` is set and the
+    session has not written anything. Flushes and DML always go to the
+    primary, and once a session has written, its reads follow to the primary
+    so it sees its own changes.
+    """
+
+    def __init__(self, *args: Any, replica_bind: Optional[Engine] = None, **kw: Any):
+        super().__init__(*args, **kw)
+        self.replica_bind = replica_bind
+
+    def is_write(self, clause=None) -> bool:
+        return self._flushing or getattr(clause, "is_dml", False)
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.is_write(clause):
+            self.info["wrote"] = True
+        elif (
+            self.replica_bind is not None
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+        ):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read-only unit of work may read from the replica.
+
+    A background check measures the replica lag every `check_interval`
+    seconds. The replica is used only while the lag is within `max_lag`
+    and the user has not written within the last `max_lag` seconds, so a
+    user never reads data older than their own last write. Writes are
+    tracked per process.
+    """
+
+    def __init__(
+        self,
+        replica_engine: Optional[AsyncEngine],
+        max_lag: float = 1.0,
+        check_interval: float = 5.0,
+    ):
+        self._replica_engine = replica_engine
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        # Unknown until the first check
+        self.lag = math.inf
+        self._recent_writes: Dict[int, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._replica_engine is not None
+
+    def replica_allowed(self, user_id: Optional[int] = None) -> bool:
+        if self._replica_engine is None or self.lag > self._max_lag:
+            return False
+        if user_id is None:
+            return True
+        written_at = self._recent_writes.get(user_id)
+        return written_at is None or time.monotonic() - written_at > self._max_lag
+
+    def record_write(self, user_id: int) -> None:
+        self._recent_writes[user_id] = time.monotonic()
+
+    async def check_lag(self) -> float:
+        """
+        Measures the replica lag in seconds. An unreachable replica has an
+        infinite lag, so every read falls back to the primary.
+        """
+        try:
+            async with self._replica_engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    self.lag = float((await connection.execute(POSTGRES_LAG_QUERY)).scalar() or 0)
+                else:
+                    # Read-only connection to the primary's own file
+                    await connection.execute(text("SELECT 1"))
+                    self.lag = 0.0
+        except Exception:
+            logger.warning("Replica lag check failed, reading from the primary", exc_info=True)
+            self.lag = math.inf
+        return self.lag
+
+    async def run(self) -> None:
+        """
+        Checks the replica lag until cancelled. Returns at once without a replica.
+        """
+        if self._replica_engine is None:
+            return
+        logger.info("Replica router started.")
+        while True:
+            lag = await self.check_lag()
+            if lag > self._max_lag:
+                logger.warning("Replica lag %.2fs exceeds %.2fs, reading from the primary", lag, self._max_lag)
+            self._forget_old_writes()
+            await asyncio.sleep(self._check_interval)
+
+    def _forget_old_writes(self) -> None:
+        cutoff = time.monotonic() - self._max_lag
+        self._recent_writes = {
+            user_id: written_at
+            for user_id, written_at in self._recent_writes.items()
+            if written_at > cutoff
+        }
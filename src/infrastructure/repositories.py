@@ -1,7 +1,13 @@
-from typing import Generic, List, Optional, Type, TypeVar
-from sqlalchemy import select
+from datetime import datetime
+from itertools import chain
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar,
+)
+from sqlalchemy import Select, and_, case, exists, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, make_transient_to_detached
 from src.domain.models import Base
+from src.infrastructure.cache import CachePolicy, cached_repository
 
 ModelType = TypeVar("ModelType", bound=Base)
 
@@ -9,7 +15,11 @@ ModelType = TypeVar("ModelType", bound=Base)
 class SQLAlchemyRepository(Generic[ModelType]):
     """
     A generic repository for SQLAlchemy models with basic async CRUD operations.
+
+    Repositories decorated with `@cached_repository` serve `get()` from the
+    session's cache, if it has one.
     """
+    cache_policy: Optional[CachePolicy] = None
 
     def __init__(self, session: AsyncSession, model: Type[ModelType]):
         self._session = session
@@ -21,8 +31,16 @@ class SQLAlchemyRepository(Generic[ModelType]):
         await self._session.refresh(instance)
         return instance
 
-    async def get(self, id: int) -> Optional[ModelType]:
-        return await self._session.get(self._model, id)
+    async def get(self, id: int, cached: bool = True) -> Optional[ModelType]:
+        if (
+            not cached
+            or self.cache_policy is None
+            or self._session.identity_map.get(self._identity_key(id)) is not None
+        ):
+            return await self._session.get(self._model, id, populate_existing=not cached)
+        return await self._get_cached(
+            self.cache_policy.primary_key, id, lambda: self._session.get(self._model, id)
+        )
 
     async def list(self) -> List[ModelType]:
         result = await self._session.execute(select(self._model))
@@ -32,9 +50,94 @@ class SQLAlchemyRepository(Generic[ModelType]):
         await self._session.delete(instance)
         await self._session.flush()
 
+    async def _get_cached(
+        self, field: Optional[str], value: Any, load: Callable[[], Awaitable[Optional[ModelType]]]
+    ) -> Optional[ModelType]:
+        """
+        Looks a row up by a unique `field` through the cache, falling back
+        to `load` when the repository or session is not cached.
+        """
+        cache = self._session.info.get("cache")
+        if cache is None or self.cache_policy is None:
+            return await load()
+        if self._has_pending_writes(cache.key(self.cache_policy, field, value)):
+            return await load()
+
+        # The caller that loads the row gets its own instance back
+        loaded: List[ModelType] = []
+
+        async def loader() -> Optional[ModelType]:
+            instance = await load()
+            if instance is not None:
+                loaded.append(instance)
+            return instance
+
+        row = await cache.get_or_load(
+            self.cache_policy, field, value, loader,
+            # Replica reads may lag behind the primary, so they are not cached
+            store=not self._session.info.get("read_only"),
+        )
+        if loaded:
+            return loaded[0]
+        return None if row is None else self._attach(row)
+
+    def _has_pending_writes(self, key: str) -> bool:
+        """
+        True if the session changed the row cached under `key` in a way the
+        cache does not know about yet: flushed or bulk changes waiting for
+        the commit, or changes to an instance of the model not flushed yet.
+        """
+        sync_session = self._session.sync_session
+        if key in sync_session.info.get("cache_pending", ()):
+            return True
+        cache = sync_session.info["cache"]
+        return any(
+            type(instance) is self._model and key in cache.keys_for(self.cache_policy, instance)
+            for instance in chain(sync_session.new, sync_session.dirty, sync_session.deleted)
+        )
+
+    def _attach(self, row: Dict[str, Any]) -> ModelType:
+        """
+        Returns the session's instance for a cached row, adding one built
+        from the row if the session does not have it yet.
+        """
+        primary_key = self.cache_policy.primary_key
+        instance = self._session.identity_map.get(self._identity_key(row[primary_key]))
+        if instance is None:
+            instance = self._model(**row)
+            make_transient_to_detached(instance)
+            self._session.add(instance)
+        return instance
+
+    def _identity_key(self, id: Any):
+        return self._session.sync_session.identity_key(self._model, id)
+
+    async def _stream(self, statement: Select, chunk_size: int) -> AsyncIterator[Sequence[Any]]:
+        """
+        Yields the rows of a statement in chunks, without loading them all.
+        """
+        result = await self._session.stream(statement.execution_options(yield_per=chunk_size))
+        async for chunk in result.partitions(chunk_size):
+            yield chunk
+
+    def _invalidate_on_commit(self, ids: Iterable[Any]) -> None:
+        """
+        Invalidates cached rows changed by bulk statements, which bypass
+        the flush, when the session commits.
+        """
+        cache = self._session.info.get("cache")
+        if cache is None or self.cache_policy is None:
+            return
+        pending = self._session.info.setdefault("cache_pending", set())
+        for id in ids:
+            pending.add(cache.key(self.cache_policy, self.cache_policy.primary_key, id))
+
 
 from src.domain.models import User, Wallet, Transaction, Achievement, UserProfile
 
+# Relationships loaded together with the user for every update
+USER_CONTEXT_RELATIONS: Sequence[str] = ("profile", "wallet")
+
 
 class UserRepository(SQLAlchemyRepository[User]):
     """
@@ -43,7 +146,36 @@ class UserRepository(SQLAlchemyRepository[User]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, User)
 
+    async def get_with_context(
+        self, user_id: int, relations: Sequence[str] = USER_CONTEXT_RELATIONS
+    ) -> Optional[User]:
+        """
+        Loads a user and the given relationships in a single joined query.
+        """
+        result = await self._session.execute(
+            select(self._model)
+            .options(*(joinedload(getattr(self._model, name)) for name in relations))
+            .where(self._model.id == user_id)
+        )
+        return result.unique().scalars().first()
+
+    async def get_many(self, user_ids: Iterable[int]) -> List[User]:
+        result = await self._session.execute(
+            select(self._model).where(self._model.id.in_(list(user_ids)))
+        )
+        return result.scalars().all()
+
+    def stream_streaks(self, chunk_size: int) -> AsyncIterator[Sequence[Tuple[int, int]]]:
+        """
+        Yields (user_id, current_streak) of users with a streak, in chunks.
+        """
+        return self._stream(
+            select(self._model.id, self._model.current_streak).where(self._model.current_streak > 0),
+            chunk_size,
+        )
+
 
+@cached_repository(Wallet, lookups=("user_id",))
 class WalletRepository(SQLAlchemyRepository[Wallet]):
     """
     Repository for the Wallet model.
@@ -51,9 +183,45 @@ class WalletRepository(SQLAlchemyRepository[Wallet]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, Wallet)
 
-    async def get_by_user_id(self, user_id: int) -> Optional[Wallet]:
+    async def get_by_user_id(self, user_id: int, cached: bool = True) -> Optional[Wallet]:
+        """
+        Returns the user's wallet. Pass `cached=False` to read the balance
+        from the database before changing it.
+        """
+        if not cached:
+            return await self._find_by_user_id(user_id, populate_existing=True)
+        return await self._get_cached("user_id", user_id, lambda: self._find_by_user_id(user_id))
+
+    async def balances_after(self, after_user_id: int, limit: int) -> List[Tuple[int, int]]:
+        """
+        Returns up to `limit` (user_id, balance) pairs ordered by user id,
+        starting after `after_user_id`.
+        """
+        result = await self._session.execute(
+            select(self._model.user_id, self._model.balance)
+            .where(self._model.user_id > after_user_id)
+            .order_by(self._model.user_id)
+            .limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def balances_of(self, user_ids: Iterable[int]) -> Dict[int, int]:
         result = await self._session.execute(
-            select(self._model).filter_by(user_id=user_id)
+            select(self._model.user_id, self._model.balance).where(self._model.user_id.in_(list(user_ids)))
+        )
+        return dict(result.all())
+
+    def stream_balances(self, chunk_size: int) -> AsyncIterator[Sequence[Tuple[int, int]]]:
+        """
+        Yields (user_id, balance) of every wallet, in chunks.
+        """
+        return self._stream(select(self._model.user_id, self._model.balance), chunk_size)
+
+    async def _find_by_user_id(self, user_id: int, populate_existing: bool = False) -> Optional[Wallet]:
+        result = await self._session.execute(
+            select(self._model)
+            .filter_by(user_id=user_id)
+            .execution_options(populate_existing=populate_existing)
         )
         return result.scalars().first()
 
@@ -65,10 +233,177 @@ class TransactionRepository(SQLAlchemyRepository[Transaction]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, Transaction)
 
+    async def totals_by_user(self, user_ids: Iterable[int]) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Returns (transaction count, points earned, points spent) per user.
+        """
+        result = await self._session.execute(
+            select(
+                self._model.user_id,
+                func.count(self._model.id),
+                func.coalesce(func.sum(case((self._model.amount > 0, self._model.amount), else_=0)), 0),
+                func.coalesce(func.sum(case((self._model.amount < 0, -self._model.amount), else_=0)), 0),
+            )
+            .where(self._model.user_id.in_(list(user_ids)))
+            .group_by(self._model.user_id)
+        )
+        return {user_id: (count, earned, spent) for user_id, count, earned, spent in result.all()}
+
+    async def history(
+        self, user_id: int, limit: int = 20, before_id: Optional[int] = None
+    ) -> List[Transaction]:
+        """
+        Returns a user's transactions, newest first, starting before `before_id`.
+        """
+        statement = select(self._model).where(self._model.user_id == user_id)
+        if before_id is not None:
+            statement = statement.where(self._model.id < before_id)
+        result = await self._session.execute(statement.order_by(self._model.id.desc()).limit(limit))
+        return result.scalars().all()
+
+    async def last_id_at(self, user_id: int, at: datetime) -> Optional[int]:
+        """
+        Returns the id of the user's last transaction created at or before `at`.
+        """
+        result = await self._session.execute(
+            select(self._model.id)
+            .where(self._model.user_id == user_id, self._model.created_at <= at)
+            .order_by(self._model.created_at.desc(), self._model.id.desc())
+            .limit(1)
+        )
+        return result.scalar()
+
+    async def total_between(self, user_id: int, after_id: int, up_to_id: int) -> int:
+        """
+        Returns the sum of the user's transactions with after_id < id <= up_to_id.
+        """
+        result = await self._session.execute(
+            select(func.coalesce(func.sum(self._model.amount), 0))
+            .where(self._model.user_id == user_id, self._model.id > after_id, self._model.id <= up_to_id)
+        )
+        return result.scalar()
+
+    async def max_id(self, created_before: Optional[datetime] = None) -> int:
+        statement = select(func.coalesce(func.max(self._model.id), 0))
+        if created_before is not None:
+            statement = statement.where(self._model.created_at < created_before)
+        return (await self._session.execute(statement)).scalar()
+
+    async def users_after(
+        self, transaction_id: int, after_user_id: int, limit: int, created_before: Optional[datetime] = None
+    ) -> List[int]:
+        """
+        Returns ids of users with transactions newer than `transaction_id`,
+        optionally only those created before `created_before`, ordered by
+        user id, starting after `after_user_id`.
+        """
+        statement = select(self._model.user_id).where(
+            self._model.id > transaction_id, self._model.user_id > after_user_id
+        )
+        if created_before is not None:
+            statement = statement.where(self._model.created_at < created_before)
+        result = await self._session.execute(
+            statement.group_by(self._model.user_id).order_by(self._model.user_id).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def tail_totals(
+        self, user_ids: Iterable[int], created_before: Optional[datetime] = None
+    ) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Returns (count, sum of amounts, last id) of each user's transactions
+        after their latest balance snapshot, optionally only those created
+        before `created_before`. Users without such transactions are left out.
+        """
+        user_ids = list(user_ids)
+        latest = _latest_snapshot_ids(user_ids)
+        statement = (
+            select(
+                self._model.user_id,
+                func.count(self._model.id),
+                func.sum(self._model.amount),
+                func.max(self._model.id),
+            )
+            .outerjoin(latest, latest.c.user_id == self._model.user_id)
+            .where(
+                self._model.user_id.in_(user_ids),
+                self._model.id > func.coalesce(latest.c.transaction_id, 0),
+            )
+            .group_by(self._model.user_id)
+        )
+        if created_before is not None:
+            statement = statement.where(self._model.created_at < created_before)
+        result = await self._session.execute(statement)
+        return {user_id: (count, total, last_id) for user_id, count, total, last_id in result.all()}
+
+
+from src.domain.models import BalanceSnapshot
+
+
+def _latest_snapshot_ids(user_ids: List[int]):
+    """
+    Subquery of (user_id, transaction_id) of each user's latest balance snapshot.
+    """
+    return (
+        select(BalanceSnapshot.user_id, func.max(BalanceSnapshot.transaction_id).label("transaction_id"))
+        .where(BalanceSnapshot.user_id.in_(user_ids))
+        .group_by(BalanceSnapshot.user_id)
+        .subquery()
+    )
+
+
+class BalanceSnapshotRepository(SQLAlchemyRepository[BalanceSnapshot]):
+    """
+    Repository for the BalanceSnapshot model.
+    """
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, BalanceSnapshot)
+
+    async def latest(self, user_id: int, up_to_transaction_id: Optional[int] = None) -> Optional[BalanceSnapshot]:
+        """
+        Returns the user's latest snapshot, or the latest one that does not
+        include transactions after `up_to_transaction_id`.
+        """
+        statement = select(self._model).where(self._model.user_id == user_id)
+        if up_to_transaction_id is not None:
+            statement = statement.where(self._model.transaction_id <= up_to_transaction_id)
+        result = await self._session.execute(
+            statement.order_by(self._model.transaction_id.desc()).limit(1)
+        )
+        return result.scalars().first()
+
+    async def max_transaction_id(self) -> int:
+        """
+        Returns the newest transaction id covered by any snapshot, or 0.
+        """
+        statement = select(func.coalesce(func.max(self._model.transaction_id), 0))
+        return (await self._session.execute(statement)).scalar()
+
+    async def latest_many(self, user_ids: Iterable[int]) -> Dict[int, BalanceSnapshot]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        latest = _latest_snapshot_ids(user_ids)
+        result = await self._session.execute(
+            select(self._model).join(
+                latest,
+                and_(
+                    latest.c.user_id == self._model.user_id,
+                    latest.c.transaction_id == self._model.transaction_id,
+                ),
+            )
+        )
+        return {snapshot.user_id: snapshot for snapshot in result.scalars()}
+
+    async def add_many(self, snapshots: Iterable[BalanceSnapshot]) -> None:
+        self._session.add_all(list(snapshots))
+        await self._session.flush()
+
 
-from src.domain.models import UserAchievement
+from src.domain.models import UserAchievement, UserArchetype, UserCommandStat
 
 
+@cached_repository(Achievement, ttl=600, lookups=("name",))
 class AchievementRepository(SQLAlchemyRepository[Achievement]):
     """
     Repository for the Achievement model.
@@ -77,6 +412,9 @@ class AchievementRepository(SQLAlchemyRepository[Achievement]):
         super().__init__(session, Achievement)
 
     async def get_by_name(self, name: str) -> Optional[Achievement]:
+        return await self._get_cached("name", name, lambda: self._find_by_name(name))
+
+    async def _find_by_name(self, name: str) -> Optional[Achievement]:
         result = await self._session.execute(
             select(self._model).filter_by(name=name)
         )
@@ -98,10 +436,159 @@ class UserAchievementRepository(SQLAlchemyRepository[UserAchievement]):
         )
         return result.scalars().first()
 
+    async def counts_by_user(self, user_ids: Iterable[int]) -> Dict[int, int]:
+        result = await self._session.execute(
+            select(self._model.user_id, func.count(self._model.id))
+            .where(self._model.user_id.in_(list(user_ids)))
+            .group_by(self._model.user_id)
+        )
+        return dict(result.all())
+
 
+# Version 2: engagement_rank_rate
+@cached_repository(UserProfile, version=2)
 class UserProfileRepository(SQLAlchemyRepository[UserProfile]):
     """
     Repository for the UserProfile model.
     """
     def __init__(self, session: AsyncSession):
         super().__init__(session, UserProfile)
+
+    async def get_many(self, user_ids: Iterable[int]) -> List[UserProfile]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        result = await self._session.execute(
+            select(self._model).where(self._model.user_id.in_(user_ids))
+        )
+        return result.scalars().all()
+
+    def stream_engagement_ranks(self, chunk_size: int) -> AsyncIterator[Sequence[Tuple[int, float]]]:
+        """
+        Yields (user_id, engagement_rank) of ranked profiles, in chunks.
+        """
+        return self._stream(
+            select(self._model.user_id, self._model.engagement_rank)
+            .where(self._model.engagement_rank.is_not(None)),
+            chunk_size,
+        )
+
+    async def find_ranked_at_other_rate(self, rate: float, limit: int, after_user_id: int = 0) -> List[UserProfile]:
+        """
+        Returns ranked profiles whose rank key was computed with another decay rate, by user id.
+        """
+        rank_rate = self._model.engagement_rank_rate
+        result = await self._session.execute(
+            select(self._model)
+            .where(self._model.engagement_rank.is_not(None))
+            .where(self._model.user_id > after_user_id)
+            .where(or_(rank_rate.is_(None), func.abs(rank_rate - rate) > rate * 1e-9))
+            .order_by(self._model.user_id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def top_by_engagement_rank(self, limit: int) -> List[UserProfile]:
+        result = await self._session.execute(
+            select(self._model)
+            .where(self._model.engagement_rank.is_not(None))
+            .order_by(self._model.engagement_rank.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def find_engagement_rank_below(self, rank: float, limit: int) -> List[UserProfile]:
+        result = await self._session.execute(
+            select(self._model)
+            .where(self._model.engagement_rank < rank)
+            .order_by(self._model.engagement_rank)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def find_unclassified(self, limit: int, after_user_id: int = 0) -> List[int]:
+        """
+        Returns ids of users whose behavioral features changed since their
+        archetype was last classified, or that were never classified.
+        Results are ordered by user id, starting after `after_user_id`.
+        """
+        classified_at = self._model.classified_at
+        result = await self._session.execute(
+            select(self._model.user_id)
+            .join(User, User.id == self._model.user_id)
+            .where(self._model.user_id > after_user_id)
+            .where(
+                or_(
+                    classified_at.is_(None),
+                    User.updated_at > classified_at,
+                    exists().where(
+                        and_(Transaction.user_id == self._model.user_id, Transaction.created_at > classified_at)
+                    ),
+                    exists().where(
+                        and_(UserAchievement.user_id == self._model.user_id, UserAchievement.unlocked_at > classified_at)
+                    ),
+                    exists().where(
+                        and_(UserCommandStat.user_id == self._model.user_id, UserCommandStat.updated_at > classified_at)
+                    ),
+                )
+            )
+            .order_by(self._model.user_id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def set_archetypes(
+        self, archetypes: Dict[int, UserArchetype], classified_at: datetime
+    ) -> None:
+        if not archetypes:
+            return
+        await self._session.execute(
+            update(self._model),
+            [
+                {"user_id": user_id, "archetype": archetype, "classified_at": classified_at}
+                for user_id, archetype in archetypes.items()
+            ],
+        )
+        self._invalidate_on_commit(archetypes)
+
+
+class UserCommandStatRepository(SQLAlchemyRepository[UserCommandStat]):
+    """
+    Repository for the UserCommandStat model.
+    """
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, UserCommandStat)
+
+    async def increment_many(
+        self, counts: Dict[Tuple[int, str], int], now: Optional[datetime] = None
+    ) -> None:
+        """
+        Adds command usage counts keyed by (user_id, command).
+        """
+        if not counts:
+            return
+        now = now or datetime.utcnow()
+        result = await self._session.execute(
+            select(self._model).where(
+                self._model.user_id.in_({user_id for user_id, _ in counts})
+            )
+        )
+        existing = {(stat.user_id, stat.command): stat for stat in result.scalars()}
+        for key, count in counts.items():
+            stat = existing.get(key)
+            if stat is None:
+                self._session.add(self._model(user_id=key[0], command=key[1], count=count, updated_at=now))
+            else:
+                stat.count += count
+                stat.updated_at = now
+        await self._session.flush()
+
+    async def counts_by_user(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        result = await self._session.execute(
+            select(self._model.user_id, self._model.command, self._model.count)
+            .where(self._model.user_id.in_(list(user_ids)))
+        )
+        counts: Dict[int, Dict[str, int]] = {}
+        for user_id, command, count in result.all():
+            counts.setdefault(user_id, {})[command] = count
+        return counts
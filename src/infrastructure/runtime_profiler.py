@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Collapsed stacks use ";" between frames; the count follows the last space
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+def collapse_stack(frame) -> str:
+    """
+    Returns a frame's stack in the collapsed format, outermost frame first.
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of the event loop thread.
+
+    A background thread samples the stack of the loop thread every
+    `interval` seconds, so profiled code runs unmodified and the cost is a
+    stack walk per sample. Samples are written as collapsed stacks, one
+    "frame;frame;frame count" line per stack, which flamegraph.pl and
+    speedscope turn into a flame graph.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005, max_seconds: float = 60):
+        self._output_dir = Path(output_dir)
+        self._interval = interval
+        self._max_seconds = max_seconds
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float) -> Tuple[Path, Counter]:
+        """
+        Samples the loop thread for `seconds` (capped at `max_seconds`) and
+        writes the collapsed stacks. Returns the file and the samples.
+        Raises RuntimeError if a profile is already running.
+        """
+        if self._lock.locked():
+            raise RuntimeError("A profile is already running.")
+        async with self._lock:
+            seconds = min(max(seconds, self._interval), self._max_seconds)
+            samples: Counter = Counter()
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample, args=(threading.get_ident(), samples, stop), name="sampling-profiler", daemon=True
+            )
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+            path = await asyncio.to_thread(self._write, samples)
+        logger.info("Wrote %d samples over %.1fs to %s", sum(samples.values()), seconds, path)
+        return path, samples
+
+    def _sample(self, thread_id: int, samples: Counter, stop: threading.Event) -> None:
+        while not stop.wait(self._interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                samples[collapse_stack(frame)] += 1
+
+    def _write(self, samples: Counter) -> Path:
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        path = self._output_dir / time.strftime("cpu-%Y%m%d-%H%M%S.collapsed")
+        with open(path, "w") as file:
+            for stack, count in samples.most_common():
+                file.write(f"{stack} {count}\n")
+        return path
+
+    @staticmethod
+    def top_frames(samples: Counter, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Returns the innermost frames with the most samples and their share of the samples.
+        """
+        total = sum(samples.values())
+        leaves: Counter = Counter()
+        for stack, count in samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [(frame, count / total) for frame, count in leaves.most_common(limit)] if total else []
+
+
+class HeapTracker:
+    """
+    Heap growth tracking with tracemalloc.
+
+    Tracing is started on demand since it slows allocations down. Each
+    `snapshot` is compared with the previous one, so allocation growth in
+    handlers, caches or the event listener shows up as the top differences
+    between snapshots, and is dumped for offline comparison.
+    """
+
+    def __init__(self, output_dir: str, frames: int = 10):
+        self._output_dir = Path(output_dir)
+        self._frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+        self._baseline = self._take()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._baseline = None
+
+    def snapshot(self, limit: int = 10) -> Tuple[Path, List[tracemalloc.StatisticDiff]]:
+        """
+        Takes a snapshot and returns its file and the `limit` largest
+        allocation changes since the previous one. Raises RuntimeError
+        when tracing is not started.
+        """
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            raise RuntimeError("Heap tracing is not started.")
+        snapshot = self._take()
+        diff = snapshot.compare_to(self._baseline, "lineno")[:limit]
+        self._baseline = snapshot
+
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        path = self._output_dir / time.strftime("heap-%Y%m%d-%H%M%S.tracemalloc")
+        snapshot.dump(str(path))
+        return path, diff
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        # Leave out tracemalloc's own allocations
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+
+class RuntimeProfiler:
+    """
+    The on-demand CPU and heap profilers behind the admin /profile command.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005, max_seconds: float = 60, frames: int = 10):
+        self.cpu = SamplingProfiler(output_dir, interval, max_seconds)
+        self.heap = HeapTracker(output_dir, frames)
+
+
+def create_runtime_profiler(
+    enabled: bool, output_dir: str, interval: float = 0.005, max_seconds: float = 60, frames: int = 10
+) -> Optional[RuntimeProfiler]:
+    """
+    Returns the runtime profiler, or None when profiling is disabled.
+    """
+    if not enabled:
+        return None
+    return RuntimeProfiler(output_dir, interval, max_seconds, frames)
@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["SQLProfile"]] = ContextVar("sql_profile", default=None)
+
+
+def shorten_statement(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit - 1] + "…"
+
+
+class SQLProfile:
+    """
+    The statements one unit of work (usually one update) sent to the database.
+    """
+
+    def __init__(self, label: str = "", slowest: int = 3):
+        self.label = label
+        self.statements = 0
+        self.seconds = 0.0
+        self.repeats: Counter = Counter()
+        self._slowest_size = slowest
+        self._slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.repeats[statement] += 1
+        entry = (seconds, statement)
+        if len(self._slowest) < self._slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        return sorted(self._slowest, reverse=True)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Returns the statements sent at least `threshold` times, the usual
+        sign of an N+1 query pattern, most repeated first.
+        """
+        return [(statement, count) for statement, count in self.repeats.most_common() if count >= threshold]
+
+
+class _HandlerStats:
+    def __init__(self, slowest: int):
+        self.updates = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.seconds = 0.0
+        self.over_budget = 0
+        self._slowest_size = slowest
+        self.slowest: List[Tuple[float, str]] = []
+
+    def add(self, profile: SQLProfile, over_budget: bool) -> None:
+        self.updates += 1
+        self.statements += profile.statements
+        self.max_statements = max(self.max_statements, profile.statements)
+        self.seconds += profile.seconds
+        self.over_budget += over_budget
+        self.slowest = heapq.nlargest(self._slowest_size, self.slowest + profile.slowest())
+
+
+class SQLProfiler:
+    """
+    Opt-in profiler of the SQL each update sends.
+
+    Engine events time every statement and add it to the profile of the
+    current context, so concurrent updates are told apart by their asyncio
+    task. Updates that send more than `statement_budget` statements, or the
+    same statement `repeat_threshold` times or more, are logged, and totals
+    are kept per handler and logged by `run` every `report_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        statement_budget: int = 20,
+        repeat_threshold: int = 3,
+        slowest: int = 3,
+        report_interval: float = 300,
+    ):
+        self.statement_budget = statement_budget
+        self.repeat_threshold = repeat_threshold
+        self._slowest = slowest
+        self._report_interval = report_interval
+        self._handlers: Dict[str, _HandlerStats] = {}
+
+    def attach(self, engine) -> None:
+        """
+        Starts timing the statements of an engine. Engines that are None are skipped.
+        """
+        if engine is None:
+            return
+        sync_engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None and _current.get() is not None:
+            context.sql_profiler_started = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        profile = _current.get()
+        started = getattr(context, "sql_profiler_started", None)
+        if profile is not None and started is not None:
+            profile.record(statement, time.perf_counter() - started)
+
+    @contextmanager
+    def profile(self, label: str = "") -> Iterator[SQLProfile]:
+        """
+        Profiles the statements sent from the current context within the block.
+        """
+        profile = SQLProfile(label, self._slowest)
+        token = _current.set(profile)
+        try:
+            yield profile
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def current() -> Optional[SQLProfile]:
+        return _current.get()
+
+    def finish(self, profile: SQLProfile) -> None:
+        """
+        Adds a finished profile to its handler's totals and logs it if it
+        went over budget or repeated statements.
+        """
+        over_budget = profile.statements > self.statement_budget
+        label = profile.label or "unknown"
+        stats = self._handlers.get(label)
+        if stats is None:
+            stats = self._handlers[label] = _HandlerStats(self._slowest)
+        stats.add(profile, over_budget)
+
+        if over_budget:
+            logger.warning(
+                "%s sent %d statements (budget %d) in %.1f ms; slowest: %s",
+                label, profile.statements, self.statement_budget, profile.seconds * 1000,
+                "; ".join(f"{seconds * 1000:.1f} ms {shorten_statement(statement)}" for seconds, statement in profile.slowest()),
+            )
+        for statement, count in profile.repeated(self.repeat_threshold):
+            logger.warning("%s sent the same statement %d times (N+1?): %s", label, count, shorten_statement(statement))
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Returns the totals per handler.
+        """
+        return {
+            label: {
+                "updates": stats.updates,
+                "statements_per_update": stats.statements / stats.updates,
+                "max_statements": stats.max_statements,
+                "db_ms_per_update": stats.seconds / stats.updates * 1000,
+                "over_budget": stats.over_budget,
+                "slowest": [(seconds * 1000, shorten_statement(statement)) for seconds, statement in stats.slowest],
+            }
+            for label, stats in self._handlers.items()
+        }
+
+    async def run(self) -> None:
+        """
+        Logs the totals per handler every `report_interval` seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self._report_interval)
+            for label, stats in sorted(self.summary().items()):
+                logger.info(
+                    "SQL %s: %d updates, %.1f statements and %.1f ms per update, max %d, %d over budget",
+                    label, stats["updates"], stats["statements_per_update"], stats["db_ms_per_update"],
+                    stats["max_statements"], stats["over_budget"],
+                )
+
+
+def create_sql_profiler(
+    enabled: bool,
+    engine,
+    replica_engine=None,
+    statement_budget: int = 20,
+    repeat_threshold: int = 3,
+    report_interval: float = 300,
+) -> Optional[SQLProfiler]:
+    """
+    Returns a profiler attached to the engines, or None when profiling is disabled.
+    """
+    if not enabled:
+        return None
+    profiler = SQLProfiler(statement_budget, repeat_threshold, report_interval=report_interval)
+    profiler.attach(engine)
+    profiler.attach(replica_engine)
+    return profiler
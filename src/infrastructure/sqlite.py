@@ -0,0 +1,40 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def apply_sqlite_pragmas(
+    engine: AsyncEngine,
+    mmap_size: int = 256 * 1024 * 1024,
+    cache_size_kb: int = 64 * 1024,
+    busy_timeout_ms: int = 5000,
+    explicit_begin: bool = False,
+) -> None:
+    """
+    Applies the performance profile to every new SQLite connection of the engine.
+
+    Connections run in WAL mode with synchronous=NORMAL, a memory-mapped file
+    and a larger page cache. With `explicit_begin`, SQLAlchemy starts the
+    transactions instead of the driver so that SAVEPOINTs work; the group
+    commit writer needs this and starts them with BEGIN IMMEDIATE. Pooled
+    connections keep the driver's behaviour of beginning on the first write,
+    since a read snapshot taken by an early BEGIN cannot be upgraded to a
+    write once another connection has committed.
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if explicit_begin:
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(cache_size_kb)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    if explicit_begin:
+        @event.listens_for(engine.sync_engine, "begin")
+        def _on_begin(connection: Connection):
+            connection.exec_driver_sql(connection.info.get("sqlite_begin", "BEGIN"))
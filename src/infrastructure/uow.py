@@ -1,6 +1,8 @@
 from __future__ import annotations
+import logging
 from abc import ABC, abstractmethod
-from typing import Type
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, Type
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
@@ -11,8 +13,22 @@ from src.infrastructure.repositories import (
     AchievementRepository,
     UserAchievementRepository,
     UserProfileRepository,
+    UserCommandStatRepository,
+    BalanceSnapshotRepository,
 )
 
+logger = logging.getLogger(__name__)
+
+# The innermost unit of work open in the current task
+_current_uow: ContextVar[Optional["UnitOfWork"]] = ContextVar("current_uow", default=None)
+
+
+def current_unit_of_work() -> Optional["UnitOfWork"]:
+    """
+    Returns the unit of work open in the current task, if any.
+    """
+    return _current_uow.get()
+
 
 class IUnitOfWork(ABC):
     users: UserRepository
@@ -21,6 +37,8 @@ class IUnitOfWork(ABC):
     achievements: AchievementRepository
     user_achievements: UserAchievementRepository
     user_profiles: UserProfileRepository
+    command_stats: UserCommandStatRepository
+    balance_snapshots: BalanceSnapshotRepository
 
     @abstractmethod
     async def __aenter__(self):
@@ -38,13 +56,23 @@ class IUnitOfWork(ABC):
     async def rollback(self):
         ...
 
+    @abstractmethod
+    def on_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        ...
+
 
 class UnitOfWork(IUnitOfWork):
-    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], read_only: bool = False):
         self._session_factory = session_factory
+        # Read-only units of work read from the replica, if the factory has one
+        self._read_only = read_only
+        self._commit_callbacks: List[Callable[[], Awaitable[None]]] = []
 
     async def __aenter__(self):
-        self.session = self._session_factory()
+        if self._read_only:
+            self.session = self._session_factory(info={"read_only": True})
+        else:
+            self.session = self._session_factory()
 
         self.users = UserRepository(self.session)
         self.wallets = WalletRepository(self.session)
@@ -52,18 +80,53 @@ class UnitOfWork(IUnitOfWork):
         self.achievements = AchievementRepository(self.session)
         self.user_achievements = UserAchievementRepository(self.session)
         self.user_profiles = UserProfileRepository(self.session)
+        self.command_stats = UserCommandStatRepository(self.session)
+        self.balance_snapshots = BalanceSnapshotRepository(self.session)
 
+        self._token = _current_uow.set(self)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            await self.rollback()
-        else:
-            await self.commit()
-        await self.session.close()
+        try:
+            if exc_type:
+                await self.rollback()
+            else:
+                await self.commit()
+            await self.session.close()
+        finally:
+            _current_uow.reset(self._token)
+
+    @property
+    def has_writes(self) -> bool:
+        """
+        True once the unit of work sent a write to the primary.
+        Only tracked by replica routing sessions.
+        """
+        return self.session.info.get("wrote", False)
+
+    @property
+    def holds_writer(self) -> bool:
+        """
+        True while the unit of work holds the group commit writer's connection.
+        """
+        return getattr(self.session.sync_session, "write_lease", None) is not None
+
+    def on_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Runs `callback` once the unit of work has committed. Callbacks are
+        dropped on rollback, and their errors are logged, not raised.
+        """
+        self._commit_callbacks.append(callback)
 
     async def commit(self):
         await self.session.commit()
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception:
+                logger.error("Error in after-commit callback", exc_info=True)
 
     async def rollback(self):
+        self._commit_callbacks.clear()
         await self.session.rollback()
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_UPDATES = ("message", "edited_message")
+
+
+class Anonymizer:
+    """
+    Replaces what identifies people in an update with stable pseudonyms.
+
+    Only the fields the bot's handlers read are kept: ids become salted
+    hashes (the same user always gets the same pseudonym within a
+    recording), names become placeholders, and message text keeps its
+    command and length but not its words. Anything else, such as
+    contacts, media or locations, is dropped.
+    """
+
+    def __init__(self, salt: bytes):
+        self._salt = salt
+
+    def pseudonym(self, value: int) -> int:
+        digest = hashlib.blake2b(str(value).encode(), key=self._salt, digest_size=6).digest()
+        pseudonym = int.from_bytes(digest, "big") or 1
+        # Group chats have negative ids
+        return -pseudonym if value < 0 else pseudonym
+
+    def update(self, data: dict) -> Optional[dict]:
+        """
+        Returns the anonymized update, or None for update types the bot does not handle.
+        """
+        anonymized = {"update_id": data["update_id"]}
+        for kind in MESSAGE_UPDATES:
+            if kind in data:
+                anonymized[kind] = self.message(data[kind])
+                return anonymized
+        if "callback_query" in data:
+            query = data["callback_query"]
+            anonymized["callback_query"] = {
+                "id": query["id"],
+                "from": self.user(query["from"]),
+                "chat_instance": query.get("chat_instance", ""),
+                # Callback data is generated by the bot's own keyboards
+                **({"data": query["data"]} if "data" in query else {}),
+                **({"message": self.message(query["message"])} if "message" in query else {}),
+            }
+            return anonymized
+        return None
+
+    def user(self, data: dict) -> dict:
+        pseudonym = self.pseudonym(data["id"])
+        user = {"id": pseudonym, "is_bot": data.get("is_bot", False), "first_name": f"user{pseudonym}"}
+        if data.get("username"):
+            user["username"] = f"u{pseudonym}"
+        if data.get("language_code"):
+            user["language_code"] = data["language_code"]
+        return user
+
+    def chat(self, data: dict) -> dict:
+        return {"id": self.pseudonym(data["id"]), "type": data["type"]}
+
+    def message(self, data: dict) -> dict:
+        message = {"message_id": data["message_id"], "date": data["date"], "chat": self.chat(data["chat"])}
+        if "from" in data:
+            message["from"] = self.user(data["from"])
+        if "text" in data:
+            message["text"] = self.text(data["text"])
+            commands = [entity for entity in data.get("entities", ()) if entity["type"] == "bot_command"]
+            if commands:
+                message["entities"] = commands
+        return message
+
+    @staticmethod
+    def text(text: str) -> str:
+        # Keep a leading command (it selects the handler), mask every other character
+        command = re.match(r"/\S+", text)
+        head = command.group(0) if command else ""
+        return head + re.sub(r"\S", "x", text[len(head):])
+
+
+class UpdateRecorder:
+    """
+    Records anonymized updates to an append-only file, one compact JSON
+    object per line: {"t": unix time received, "u": update}.
+
+    `record` only serializes the update into a buffer; `run` appends the
+    buffer to the file from a worker thread every `flush_interval`
+    seconds, so the event loop never waits on the disk. If the disk falls
+    behind, updates beyond `max_buffer` are dropped rather than kept in
+    memory. With `sample_rate` below 1 a fixed share of users is recorded,
+    with all of their updates. Without a salt a random one is used, so
+    pseudonyms differ between runs.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        salt: str = "",
+        sample_rate: float = 1.0,
+        flush_interval: float = 1.0,
+        max_buffer: int = 10000,
+    ):
+        self._path = Path(path)
+        self._anonymizer = Anonymizer((salt or secrets.token_hex(16)).encode())
+        self._sample_rate = sample_rate
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._buffer: List[str] = []
+        self.recorded = 0
+        self.dropped = 0
+
+    def record(self, update: Update) -> bool:
+        """
+        Buffers an update for writing. Returns whether it was recorded.
+        """
+        data = self._anonymizer.update(update.model_dump(mode="json", exclude_none=True, by_alias=True))
+        if data is None or not self._sampled(data):
+            return False
+        if len(self._buffer) >= self._max_buffer:
+            self.dropped += 1
+            return False
+        self._buffer.append(json.dumps({"t": round(time.time(), 3), "u": data}, separators=(",", ":")))
+        self.recorded += 1
+        return True
+
+    def _sampled(self, data: dict) -> bool:
+        if self._sample_rate >= 1:
+            return True
+        body = next(iter(value for key, value in data.items() if key != "update_id"))
+        user = body.get("from") or body.get("chat")
+        return user is not None and abs(user["id"]) % 10000 < self._sample_rate * 10000
+
+    async def flush(self) -> int:
+        """
+        Appends the buffered updates to the file. Returns how many were written.
+        """
+        lines, self._buffer = self._buffer, []
+        if lines:
+            await asyncio.to_thread(self._append, lines)
+        return len(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "a") as file:
+            file.write("\n".join(lines) + "\n")
+
+    async def run(self) -> None:
+        """
+        Flushes every `flush_interval` seconds until cancelled, then flushes once more.
+        """
+        logger.info("Recording updates to %s", self._path)
+        dropped = 0
+        try:
+            while True:
+                await asyncio.sleep(self._flush_interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.error("Could not write recorded updates", exc_info=True)
+                if self.dropped > dropped:
+                    logger.warning("Dropped %d updates, the recording is behind", self.dropped - dropped)
+                    dropped = self.dropped
+        finally:
+            await self.flush()
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, dict]]:
+    """
+    Yields the (time received, update) pairs of a recording. A line cut
+    short by a crash while writing is skipped.
+    """
+    with open(path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping a malformed line in %s", path)
+                continue
+            yield record["t"], record["u"]
+
+
+def create_update_recorder(
+    enabled: bool, path: str, salt: str = "", sample_rate: float = 1.0
+) -> Optional[UpdateRecorder]:
+    """
+    Returns the update recorder, or None when recording is disabled.
+    """
+    if not enabled:
+        return None
+    return UpdateRecorder(path, salt, sample_rate)
@@ -4,15 +4,19 @@ Main application file for the Diana Bot.
 
 import asyncio
 import logging
+from aiogram import Bot, Dispatcher
+from src.config import settings
 from src.containers import ApplicationContainer
-from src.bot.main import start_bot
+from src.bot.main import register_handlers, start_bot
+from src.infrastructure.logging_pipeline import parse_rates, setup_logging
+from src.infrastructure.runtime import run, runtime_options_from_settings
 
 
 from src.bot.middleware.auth import AuthMiddleware
-from src.bot.middleware.uow import UoWMiddleware
-
-
-
+from src.bot.middleware.uow import CommitBeforeRequestMiddleware, UoWMiddleware
+from src.bot.middleware.metrics import HandlerMetricsMiddleware, MetricsMiddleware
+from src.bot.middleware.sql_profiler import SQLProfilerHandlerMiddleware, SQLProfilerMiddleware
+from src.bot.middleware.recorder import UpdateRecorderMiddleware
 from src.bot.events import event_listener
 
 
@@ -36,49 +40,117 @@ async def setup_database(container: ApplicationContainer):
             logging.info("Created 'First Steps' achievement.")
 
 
+def setup_dispatcher(container: ApplicationContainer, dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Registers the middleware, the long-lived services and the handlers, as
+    the bot runs in production. Also used by the benchmarks.
+    """
+    uow_provider = container.infrastructure.uow
+    user_service = container.services.user_service()
+    gamification_service = container.services.gamification_service()
+    replica_router = container.infrastructure.replica_router()
+
+    metrics = container.infrastructure.bot_metrics()
+    uow_middleware = UoWMiddleware(uow_provider, replica_router, dispatcher, metrics=metrics)
+    auth_middleware = AuthMiddleware(user_service, gamification_service, metrics=metrics)
+
+    # The order is important: UoW middleware must come before Auth middleware,
+    # and metrics and the SQL profiler before both so they see their work
+    update_recorder = container.infrastructure.update_recorder()
+    if update_recorder is not None:
+        dispatcher.update.outer_middleware.register(UpdateRecorderMiddleware(update_recorder))
+    if metrics is not None:
+        dispatcher.update.outer_middleware.register(MetricsMiddleware(metrics))
+        dispatcher.message.middleware(HandlerMetricsMiddleware(metrics))
+    sql_profiler = container.infrastructure.sql_profiler()
+    if sql_profiler is not None:
+        dispatcher.update.outer_middleware.register(SQLProfilerMiddleware(sql_profiler))
+        dispatcher.message.middleware(SQLProfilerHandlerMiddleware())
+    dispatcher.update.outer_middleware.register(uow_middleware)
+    dispatcher.update.outer_middleware.register(auth_middleware)
+
+    render_cache = container.services.render_cache()
+    render_cache.warm()
+
+    # Pass long-lived services to the dispatcher context
+    dispatcher["gamification_service"] = gamification_service
+    dispatcher["context_service"] = container.services.context_service()
+    dispatcher["personalization_service"] = container.services.personalization_service()
+    dispatcher["render_cache"] = render_cache
+    dispatcher["context_pipeline"] = container.services.context_pipeline()
+    dispatcher["balance_cache"] = container.infrastructure.balance_cache()
+    dispatcher["leaderboard"] = container.infrastructure.leaderboard()
+    dispatcher["runtime_profiler"] = container.infrastructure.runtime_profiler()
+    dispatcher["load_shedder"] = container.infrastructure.load_shedder()
+
+    if container.infrastructure.group_commit_writer() is not None:
+        # Units of work release the writer before waiting on Telegram
+        bot.session.middleware(CommitBeforeRequestMiddleware())
+
+    register_handlers(dispatcher)
+
+
 async def main() -> None:
     """
     Main application entry point.
     Initializes the container and starts the application.
     """
-    logging.basicConfig(level=logging.INFO)
-    
+    # Log records are formatted and written off the event loop
+    log_listener, _ = setup_logging(
+        level=settings.LOG_LEVEL,
+        json_output=settings.LOG_FORMAT == "json",
+        rate=settings.LOG_RATE_LIMIT,
+        rates=parse_rates(settings.LOG_RATE_LIMITS),
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
     container = ApplicationContainer()
     container.wire(modules=[__name__, "src.bot.handlers"])
 
     await setup_database(container)
 
-    # Setup middleware
-    uow_provider = container.infrastructure.uow
-    user_service = container.services.user_service()
-    gamification_service = container.services.gamification_service()
-    
-    uow_middleware = UoWMiddleware(uow_provider)
-    auth_middleware = AuthMiddleware(user_service, gamification_service)
-
     bot = container.bot.bot()
     dispatcher = container.bot.dispatcher()
-    # The order is important: UoW middleware must come before Auth middleware
-    dispatcher.update.outer_middleware.register(uow_middleware)
-    dispatcher.update.outer_middleware.register(auth_middleware)
+    setup_dispatcher(container, dispatcher, bot)
 
-    # Get services
-    gamification_service = container.services.gamification_service()
-    context_service = container.services.context_service()
-    personalization_service = container.services.personalization_service()
     redis_client = container.infrastructure.redis_client()
     service_provider = container.services
-
-    # Pass long-lived services to the dispatcher context
-    dispatcher["gamification_service"] = gamification_service
-    dispatcher["context_service"] = context_service
-    dispatcher["personalization_service"] = personalization_service
-
-    # Start the bot and the event listener concurrently
-    await asyncio.gather(
-        start_bot(bot, dispatcher),
-        event_listener(redis_client, service_provider),
-    )
+    replica_router = container.infrastructure.replica_router()
+    context_pipeline = container.services.context_pipeline()
+    archetype_classification_job = container.services.archetype_classification_job()
+    ledger_snapshot_job = container.services.ledger_snapshot_job()
+    ledger_reconciliation_job = container.services.ledger_reconciliation_job()
+    transaction_archival_job = container.services.transaction_archival_job()
+    metrics = container.infrastructure.bot_metrics()
+    sql_profiler = container.infrastructure.sql_profiler()
+    update_recorder = container.infrastructure.update_recorder()
+    load_shedder = container.infrastructure.load_shedder()
+    leaderboard = container.infrastructure.leaderboard()
+    group_commit_writer = container.infrastructure.group_commit_writer()
+    cache = container.infrastructure.cache()
+
+    # Start the bot, the event listener and the background workers concurrently
+    try:
+        await asyncio.gather(
+            start_bot(bot, dispatcher),
+            event_listener(redis_client, service_provider, container.infrastructure.event_tracer(), load_shedder),
+            context_pipeline.run(),
+            archetype_classification_job.run(),
+            ledger_snapshot_job.run(),
+            ledger_reconciliation_job.run(),
+            transaction_archival_job.run(),
+            replica_router.run(),
+            *([cache.listen()] if cache is not None else []),
+            *([container.infrastructure.metrics_server().run()] if metrics is not None else []),
+            *([sql_profiler.run()] if sql_profiler is not None else []),
+            *([update_recorder.run()] if update_recorder is not None else []),
+            *([load_shedder.run()] if load_shedder is not None else []),
+            *([container.services.leaderboard_service().rebuild_if_empty()] if leaderboard is not None else []),
+        )
+    finally:
+        if group_commit_writer is not None:
+            await group_commit_writer.close()
+        log_listener.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main(), runtime_options_from_settings(settings))
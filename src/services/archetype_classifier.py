@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+import numpy as np
+from src.domain.models import UserArchetype
+from src.infrastructure.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+# Behavioral features, in feature vector order
+FEATURES: Sequence[str] = (
+    "start_commands",
+    "balance_commands",
+    "other_commands",
+    "current_streak",
+    "max_streak",
+    "transactions",
+    "points_earned",
+    "points_spent",
+    "achievements",
+)
+
+# Initial hand-tuned weights (features x archetypes) over log1p-scaled features.
+# Rows follow FEATURES, columns follow UserArchetype.
+DEFAULT_WEIGHTS: Mapping[UserArchetype, Mapping[str, float]] = {
+    UserArchetype.EXPLORER: {"start_commands": 0.6, "other_commands": 1.0},
+    UserArchetype.ACHIEVER: {"max_streak": 0.8, "points_earned": 0.5, "achievements": 1.2},
+    UserArchetype.SOCIALIZER: {"start_commands": 0.5, "transactions": 0.5},
+    UserArchetype.PHILOSOPHER: {"current_streak": 0.9, "balance_commands": -0.4},
+    UserArchetype.CREATOR: {"points_spent": 1.2, "balance_commands": 0.5},
+}
+# Users without any signal stay explorers, the model default
+DEFAULT_BIAS: Mapping[UserArchetype, float] = {UserArchetype.EXPLORER: 0.1}
+
+
+class ArchetypeClassifier:
+    """
+    Linear classifier over compact behavioral feature vectors.
+
+    A whole batch of users is classified with one (users x features) @
+    (features x archetypes) matrix product.
+    """
+
+    ARCHETYPES: Sequence[UserArchetype] = tuple(UserArchetype)
+
+    def __init__(
+        self,
+        weights: Mapping[UserArchetype, Mapping[str, float]] = DEFAULT_WEIGHTS,
+        bias: Mapping[UserArchetype, float] = DEFAULT_BIAS,
+    ):
+        feature_index = {name: i for i, name in enumerate(FEATURES)}
+        self._weights = np.zeros((len(FEATURES), len(self.ARCHETYPES)), dtype=np.float32)
+        self._bias = np.zeros(len(self.ARCHETYPES), dtype=np.float32)
+        for column, archetype in enumerate(self.ARCHETYPES):
+            for name, weight in weights.get(archetype, {}).items():
+                self._weights[feature_index[name], column] = weight
+            self._bias[column] = bias.get(archetype, 0.0)
+
+    def classify(self, features: np.ndarray) -> List[UserArchetype]:
+        """
+        Classifies a (users x features) matrix of raw feature counts.
+        """
+        if len(features) == 0:
+            return []
+        scores = np.log1p(np.maximum(features, 0).astype(np.float32)) @ self._weights + self._bias
+        return [self.ARCHETYPES[i] for i in scores.argmax(axis=1)]
+
+
+class ArchetypeClassificationJob:
+    """
+    Periodic batch job that assigns `user_profiles.archetype`.
+
+    Each run only reclassifies users whose features changed since their last
+    classification, in chunks of `chunk_size`, so the request path only has
+    to read the stored archetype.
+    """
+
+    def __init__(
+        self,
+        uow_provider: Callable[[], IUnitOfWork],
+        classifier: Optional[ArchetypeClassifier] = None,
+        interval_seconds: float = 900,
+        chunk_size: int = 500,
+    ):
+        self._uow_provider = uow_provider
+        self._classifier = classifier or ArchetypeClassifier()
+        self._interval = interval_seconds
+        self._chunk_size = chunk_size
+
+    async def run(self) -> None:
+        """
+        Runs the job every `interval_seconds` until cancelled.
+        """
+        logger.info("Archetype classification job started.")
+        while True:
+            try:
+                classified = await self.run_once()
+                logger.info("Reclassified archetypes for %d users.", classified)
+            except Exception:
+                logger.error("Archetype classification run failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+    async def run_once(self) -> int:
+        """
+        Reclassifies every changed user. Returns the number of users classified.
+        """
+        total = 0
+        last_user_id = 0
+        while True:
+            async with self._uow_provider() as uow:
+                user_ids = await uow.user_profiles.find_unclassified(
+                    self._chunk_size, after_user_id=last_user_id
+                )
+                if not user_ids:
+                    return total
+                features = await self.load_features(uow, user_ids)
+                archetypes = self._classifier.classify(features)
+                await uow.user_profiles.set_archetypes(
+                    dict(zip(user_ids, archetypes)), datetime.utcnow()
+                )
+            total += len(user_ids)
+            last_user_id = user_ids[-1]
+            if len(user_ids) < self._chunk_size:
+                return total
+
+    @staticmethod
+    async def load_features(uow: IUnitOfWork, user_ids: List[int]) -> np.ndarray:
+        """
+        Builds the (users x features) matrix for the given users.
+        """
+        users = {user.id: user for user in await uow.users.get_many(user_ids)}
+        transactions = await uow.transactions.totals_by_user(user_ids)
+        achievements = await uow.user_achievements.counts_by_user(user_ids)
+        commands: Dict[int, Dict[str, int]] = await uow.command_stats.counts_by_user(user_ids)
+
+        features = np.zeros((len(user_ids), len(FEATURES)), dtype=np.float32)
+        for row, user_id in enumerate(user_ids):
+            user_commands = commands.get(user_id, {})
+            start = user_commands.get("start", 0)
+            balance = user_commands.get("balance", 0)
+            user = users.get(user_id)
+            count, earned, spent = transactions.get(user_id, (0, 0, 0))
+            features[row] = (
+                start,
+                balance,
+                sum(user_commands.values()) - start - balance,
+                user.current_streak if user else 0,
+                user.max_streak if user else 0,
+                count,
+                earned,
+                spent,
+                achievements.get(user_id, 0),
+            )
+        return features
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional
+from src.domain.models import BalanceSnapshot
+from src.infrastructure.archive import ArchiveColumns, TransactionArchive
+from src.infrastructure.partitioning import TransactionPartitions, add_months, month_start
+from src.infrastructure.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionArchivalJob:
+    """
+    Periodic job that keeps the transactions table down to its hot months.
+
+    Each run creates the partitions of the coming months, then moves every
+    month older than `hot_months` from the database to the archive, oldest
+    first:
+
+    1. users with transactions in the month get a balance snapshot covering
+       them, so current balances never need archived rows;
+    2. the month is detached from the hot table;
+    3. its rows are read in chunks of `chunk_size`, in the archive's order,
+       written to the archive, and the detached table dropped.
+
+    Each step commits on its own. A month left detached by an interrupted
+    run is exported by the next one.
+    """
+
+    def __init__(
+        self,
+        uow_provider: Callable[[], IUnitOfWork],
+        partitions: TransactionPartitions,
+        archive: Optional[TransactionArchive],
+        hot_months: int = 3,
+        interval_seconds: float = 24 * 3600,
+        chunk_size: int = 500,
+    ):
+        self._uow_provider = uow_provider
+        self._partitions = partitions
+        self._archive = archive
+        self._hot_months = hot_months
+        self._interval = interval_seconds
+        self._chunk_size = chunk_size
+
+    async def run(self) -> None:
+        """
+        Runs the job every `interval_seconds` until cancelled.
+        """
+        logger.info("Transaction archival job started.")
+        while True:
+            try:
+                archived = await self.run_once()
+                if archived:
+                    logger.info("Archived transactions of %s.", ", ".join(f"{month:%Y-%m}" for month in archived))
+            except Exception:
+                logger.error("Transaction archival run failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> List[datetime]:
+        """
+        Maintains the partitions and archives the cold months. Returns the archived months.
+        """
+        now = now or datetime.utcnow()
+        await self._partitions.ensure(now)
+        if self._archive is None:
+            return []
+
+        archived = []
+        for month in await self._partitions.detached():
+            await self._export(month)
+            archived.append(month)
+
+        cutoff = add_months(month_start(now), -self._hot_months)
+        while True:
+            month = await self._partitions.oldest_month()
+            if month is None or month >= cutoff:
+                break
+            if archived and month <= archived[-1]:
+                logger.warning("Transactions of %s are still in the hot table after archival", f"{month:%Y-%m}")
+                break
+            await self._snapshot_through(add_months(month, 1))
+            await self._partitions.detach(month)
+            await self._export(month)
+            archived.append(month)
+        return archived
+
+    async def _snapshot_through(self, end: datetime) -> None:
+        """
+        Snapshots the balance of every user with transactions before `end`
+        that are not covered by a snapshot yet.
+        """
+        last_user_id = 0
+        while True:
+            async with self._uow_provider() as uow:
+                user_ids = await uow.transactions.users_after(0, last_user_id, self._chunk_size, created_before=end)
+                if not user_ids:
+                    break
+                snapshots = await uow.balance_snapshots.latest_many(user_ids)
+                tails = await uow.transactions.tail_totals(user_ids, created_before=end)
+                await uow.balance_snapshots.add_many([
+                    BalanceSnapshot(
+                        user_id=user_id,
+                        transaction_id=last_id,
+                        balance=(snapshots[user_id].balance if user_id in snapshots else 0) + tail_total,
+                    )
+                    for user_id, (_, tail_total, last_id) in tails.items()
+                ])
+            last_user_id = user_ids[-1]
+            if len(user_ids) < self._chunk_size:
+                break
+
+    async def _export(self, month: datetime) -> None:
+        columns = ArchiveColumns()
+        async for rows in self._partitions.read(month, self._chunk_size):
+            columns.append(rows)
+        await asyncio.to_thread(self._archive.write, month, columns)
+        await self._partitions.drop(month)
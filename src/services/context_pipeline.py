@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from src.domain.models import UserProfile
+from src.infrastructure.leaderboard import Leaderboard, LeaderboardMetric
+from src.infrastructure.uow import IUnitOfWork
+from src.services.context_service import ContextService
+
+logger = logging.getLogger(__name__)
+
+
+class ContextAnalysisPipeline:
+    """
+    Runs context analysis in the background, off the /start critical path.
+
+    Handlers submit user ids and reply with the last stored profile. A single
+    worker drains the queue in batches, analyzes every profile of a batch in
+    one unit of work and writes the results back to `user_profiles`.
+    Profiles analyzed within the freshness window only get their engagement
+    score updated. Jobs for users whose registration is not committed yet,
+    and batches whose unit of work fails, are requeued with their
+    interactions and commands, up to `MAX_RETRIES` times.
+    """
+
+    MAX_MESSAGES_PER_USER = 20
+    MAX_RETRIES = 3
+    RETRY_DELAY = 0.5  # seconds, multiplied by the attempt
+
+    def __init__(
+        self,
+        uow_provider: Callable[[], IUnitOfWork],
+        context_service: ContextService,
+        batch_size: int = 100,
+        batch_window: float = 0.05,
+        freshness_seconds: int = 600,
+        max_queue_size: int = 10000,
+        leaderboard: Optional[Leaderboard] = None,
+    ):
+        self._uow_provider = uow_provider
+        self._context_service = context_service
+        self._leaderboard = leaderboard
+        self._batch_size = batch_size
+        self._batch_window = batch_window
+        self._freshness = timedelta(seconds=freshness_seconds)
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=max_queue_size)
+        # Interactions per queued user, so repeated submits collapse into one job
+        self._pending: Dict[int, int] = {}
+        self._messages: Dict[int, List[str]] = {}
+        self._commands: Counter = Counter()
+        self._retries: Dict[int, int] = {}
+
+    def is_fresh(self, profile: UserProfile, now: Optional[datetime] = None) -> bool:
+        """
+        Returns True if the profile was analyzed within the freshness window.
+        """
+        if profile.analyzed_at is None:
+            return False
+        now = now or datetime.utcnow()
+        return now - profile.analyzed_at < self._freshness
+
+    def submit(self, user_id: int, text: Optional[str] = None) -> bool:
+        """
+        Queues an analysis job for a user without waiting for it.
+        The optional message text is fed to mood detection and command stats.
+        Returns False if the job had to be dropped because the queue is full.
+        """
+        if user_id in self._pending:
+            self._pending[user_id] += 1
+            self._add_message(user_id, text)
+            return True
+
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            logger.warning("Context analysis queue is full, dropping job for user %s", user_id)
+            return False
+
+        self._pending[user_id] = 1
+        self._add_message(user_id, text)
+        return True
+
+    async def run(self) -> None:
+        """
+        Re-keys engagement ranks of another half-life, then processes queued jobs until cancelled.
+        """
+        try:
+            await self.rekey_engagement_ranks()
+        except Exception:
+            logger.error("Could not re-key engagement ranks", exc_info=True)
+        logger.info("Context analysis pipeline started.")
+        while True:
+            user_ids = await self._next_batch()
+            try:
+                await self.process_batch(user_ids)
+            except Exception:
+                logger.error(
+                    "Context analysis failed for a batch of %d users", len(user_ids), exc_info=True
+                )
+
+    async def rekey_engagement_ranks(self) -> int:
+        """
+        Recomputes the rank keys computed with another decay rate than the
+        current half-life's, so ranks stay comparable after
+        ENGAGEMENT_HALF_LIFE_HOURS changes, and rebuilds the engagement
+        leaderboard if any changed. Returns the number of profiles re-keyed.
+        """
+        rate = self._context_service.engagement_rate
+        rekeyed, after_user_id = 0, 0
+        while True:
+            async with self._uow_provider() as uow:
+                profiles = await uow.user_profiles.find_ranked_at_other_rate(rate, self._batch_size, after_user_id)
+                for profile in profiles:
+                    self._context_service.rekey_engagement(profile)
+            if not profiles:
+                break
+            rekeyed += len(profiles)
+            after_user_id = profiles[-1].user_id
+
+        if rekeyed:
+            logger.info("Re-keyed the engagement rank of %d profiles for the current half-life", rekeyed)
+            if self._leaderboard is not None:
+                async with self._uow_provider() as uow:
+                    await self._leaderboard.rebuild(
+                        LeaderboardMetric.ENGAGEMENT, uow.user_profiles.stream_engagement_ranks(self._batch_size)
+                    )
+        return rekeyed
+
+    async def process_batch(self, user_ids: List[int]) -> int:
+        """
+        Analyzes a batch of users in a single unit of work.
+        Returns the number of profiles that were fully analyzed.
+        """
+        interactions = {user_id: self._pending.pop(user_id, 1) for user_id in user_ids}
+        senders, messages = [], []
+        for user_id in user_ids:
+            for text in self._messages.pop(user_id, ()):
+                senders.append(user_id)
+                messages.append(text)
+        # One vectorized pass over the messages of the whole batch
+        await self._context_service.observe_messages(senders, messages)
+        batch_users = set(user_ids)
+        commands = {key: n for key, n in self._commands.items() if key[0] in batch_users}
+        for key in commands:
+            del self._commands[key]
+
+        now = datetime.utcnow()
+
+        try:
+            known_users, analyzed = await self._analyze(interactions, commands, now)
+        except Exception:
+            # Nothing was committed; put the batch back so its interactions
+            # and commands are not lost
+            for user_id in interactions:
+                self._retry(user_id, interactions[user_id], self._commands_of(commands, user_id))
+            raise
+
+        for user_id in interactions:
+            if user_id in known_users:
+                self._retries.pop(user_id, None)
+            else:
+                self._retry(user_id, interactions[user_id], self._commands_of(commands, user_id))
+
+        logger.debug("Analyzed %d of %d queued profiles", analyzed, len(user_ids))
+        return analyzed
+
+    async def _analyze(self, interactions: Dict[int, int], commands: Dict[tuple, int], now: datetime):
+        """
+        Writes back the analysis of a batch in one unit of work. Returns the
+        ids of the users that have a profile and the number analyzed.
+        """
+        analyzed = 0
+        async with self._uow_provider() as uow:
+            profiles = await uow.user_profiles.get_many(interactions)
+            # Users whose registration is not committed yet have no profile, they are retried
+            known_users = {profile.user_id for profile in profiles}
+            await uow.command_stats.increment_many(
+                {key: n for key, n in commands.items() if key[0] in known_users}, now
+            )
+            for profile in profiles:
+                if not self.is_fresh(profile, now):
+                    await self._context_service.detect_user_mood(profile)
+                    profile.analyzed_at = now
+                    analyzed += 1
+                await self._context_service.update_engagement_score(
+                    profile, interactions[profile.user_id]
+                )
+            if self._leaderboard is not None and profiles:
+                ranks = {profile.user_id: profile.engagement_rank for profile in profiles}
+                counts = {user_id: interactions[user_id] for user_id in ranks}
+                uow.on_commit(lambda: self._leaderboard.record(LeaderboardMetric.ENGAGEMENT, ranks, counts))
+        return known_users, analyzed
+
+    @staticmethod
+    def _commands_of(commands: Dict[tuple, int], user_id: int) -> Dict[tuple, int]:
+        return {key: n for key, n in commands.items() if key[0] == user_id}
+
+    def _retry(self, user_id: int, interactions: int, commands: Dict[tuple, int]) -> None:
+        """
+        Puts a job back after a delay, keeping its interactions and commands.
+        """
+        attempt = self._retries.get(user_id, 0) + 1
+        if attempt > self.MAX_RETRIES:
+            del self._retries[user_id]
+            logger.warning(
+                "Could not analyze user %s after %d retries, dropping the analysis", user_id, self.MAX_RETRIES
+            )
+            return
+        self._retries[user_id] = attempt
+        self._commands.update(commands)
+        if user_id in self._pending:
+            # Submitted again meanwhile, that job is already queued
+            self._pending[user_id] += interactions
+            return
+        self._pending[user_id] = interactions
+        asyncio.get_running_loop().call_later(self.RETRY_DELAY * attempt, self._requeue, user_id)
+
+    def _requeue(self, user_id: int) -> None:
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            logger.warning("Context analysis queue is full, dropping job for user %s", user_id)
+            self._pending.pop(user_id, None)
+            self._retries.pop(user_id, None)
+
+    def _add_message(self, user_id: int, text: Optional[str]) -> None:
+        if not text:
+            return
+        if text.startswith("/"):
+            # "/start@diana_bot payload" -> "start"
+            self._commands[(user_id, text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower())] += 1
+            return
+        messages = self._messages.setdefault(user_id, [])
+        if len(messages) >= self.MAX_MESSAGES_PER_USER:
+            del messages[0]
+        messages.append(text)
+
+    async def _next_batch(self) -> List[int]:
+        user_ids = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._batch_window
+
+        while len(user_ids) < self._batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                user_ids.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return user_ids
@@ -1,36 +1,111 @@
-import random
+from datetime import datetime
+from typing import List, Optional, Sequence
 from src.domain.models import UserProfile, UserMood, UserArchetype
+from src.infrastructure.uow import IUnitOfWork
+from src.services.engagement import EngagementDecay
+from src.services.mood_detection import MoodDetector
 
 
 class ContextService:
     """
     Service for analyzing and managing user context (AI-001).
-    This is a mock implementation to satisfy the initial DoD.
     """
 
-    async def detect_user_mood(self, profile: UserProfile) -> UserMood:
+    def __init__(
+        self,
+        mood_detector: Optional[MoodDetector] = None,
+        engagement_decay: Optional[EngagementDecay] = None,
+    ):
+        self._mood_detector = mood_detector or MoodDetector()
+        self._engagement_decay = engagement_decay or EngagementDecay()
+
+    async def observe_messages(
+        self, user_ids: Sequence[int], messages: Sequence[str]
+    ) -> None:
+        """
+        Folds a batch of user messages into the rolling mood aggregates.
         """
-        Mock implementation for detecting user mood.
-        Returns a random mood and updates the profile.
+        self._mood_detector.observe(user_ids, messages)
+
+    async def detect_user_mood(
+        self, profile: UserProfile, messages: Sequence[str] = ()
+    ) -> UserMood:
         """
-        mood = random.choice(list(UserMood))
+        Detects the user's mood from the rolling aggregate of their messages,
+        including any new ones, and updates the profile. Without any
+        observed messages (e.g. after a restart) the stored mood is kept.
+        """
+        if messages:
+            self._mood_detector.observe([profile.user_id] * len(messages), messages)
+        if not self._mood_detector.has_observations(profile.user_id):
+            return profile.mood
+        mood = self._mood_detector.mood_for(profile.user_id)
         profile.mood = mood
         return mood
 
     async def classify_user_archetype(self, profile: UserProfile) -> UserArchetype:
         """
-        Mock implementation for classifying user archetype.
-        Returns a random archetype and updates the profile.
+        Returns the user's archetype.
+        Archetypes are assigned by `ArchetypeClassificationJob`, so this is only a lookup.
         """
-        archetype = random.choice(list(UserArchetype))
-        profile.archetype = archetype
-        return archetype
+        return profile.archetype
 
     async def update_engagement_score(
-        self, profile: UserProfile, score_change: int = 1
-    ) -> int:
+        self,
+        profile: UserProfile,
+        score_change: float = 1,
+        now: Optional[datetime] = None,
+    ) -> float:
+        """
+        Decays the user's engagement score to now, adds `score_change` and
+        refreshes the rank key. Returns the new score.
+        """
+        now = now or datetime.utcnow()
+        decay = self._engagement_decay
+        value = decay.add(profile.engagement_score, profile.engagement_updated_at, score_change, now)
+        profile.engagement_score = value
+        profile.engagement_updated_at = now
+        self.rekey_engagement(profile)
+        return value
+
+    @property
+    def engagement_rate(self) -> float:
+        return self._engagement_decay.rate
+
+    def rekey_engagement(self, profile: UserProfile) -> None:
+        """
+        Recomputes the profile's rank key with the current half-life.
+        """
+        decay = self._engagement_decay
+        profile.engagement_rank = decay.rank_key(profile.engagement_score, profile.engagement_updated_at)
+        profile.engagement_rank_rate = decay.rate
+
+    def get_engagement_score(
+        self, profile: UserProfile, now: Optional[datetime] = None
+    ) -> float:
+        """
+        Returns the user's engagement score decayed to now.
+        """
+        return self._engagement_decay.value_at(
+            profile.engagement_score, profile.engagement_updated_at, now or datetime.utcnow()
+        )
+
+    async def get_top_engaged_profiles(self, uow: IUnitOfWork, limit: int = 10) -> List[UserProfile]:
+        """
+        Returns the most engaged profiles right now, using the rank index.
+        """
+        return await uow.user_profiles.top_by_engagement_rank(limit)
+
+    async def get_disengaged_profiles(
+        self,
+        uow: IUnitOfWork,
+        threshold: float,
+        limit: int = 100,
+        now: Optional[datetime] = None,
+    ) -> List[UserProfile]:
         """
-        Updates the user's engagement score.
+        Returns profiles whose score has decayed below `threshold`, least engaged first.
+        Profiles that never engaged have no rank and are not included.
         """
-        profile.engagement_score += score_change
-        return profile.engagement_score
+        rank = self._engagement_decay.threshold_key(threshold, now or datetime.utcnow())
+        return await uow.user_profiles.find_engagement_rank_below(rank, limit)
@@ -0,0 +1,64 @@
+import math
+from datetime import datetime
+from typing import Optional
+
+from src.config import DEFAULT_HALF_LIFE_HOURS
+
+# Reference instant for rank keys; only differences between keys matter
+RANK_EPOCH = datetime(2025, 1, 1)
+# Scores below this are treated as zero when computing rank keys
+MIN_SCORE = 1e-6
+
+
+class EngagementDecay:
+    """
+    Exponentially time-decayed engagement score.
+
+    A score is stored as (value, updated_at) and decays with the configured
+    half-life: value_at(t) = value * exp(-rate * (t - updated_at)). Updates
+    only touch the user's own row.
+
+    Ranking uses `rank_key = ln(value) + rate * (updated_at - RANK_EPOCH)`,
+    which orders users by their decayed score at any instant, so an index on
+    the key serves "top N" and "decayed below threshold" queries without
+    rewriting rows as time passes. Keys are only comparable when computed
+    with the same rate, so each profile stores the rate of its key and keys
+    of other rates are recomputed when the half-life changes.
+    """
+
+    def __init__(self, half_life_seconds: float = DEFAULT_HALF_LIFE_HOURS * 3600):
+        self.rate = math.log(2) / half_life_seconds
+
+    def value_at(
+        self, value: float, updated_at: Optional[datetime], now: datetime
+    ) -> float:
+        """
+        Returns the decayed value of a score at `now`.
+        """
+        if not value or updated_at is None:
+            return value or 0.0
+        elapsed = max((now - updated_at).total_seconds(), 0.0)
+        return value * math.exp(-self.rate * elapsed)
+
+    def add(
+        self, value: float, updated_at: Optional[datetime], amount: float, now: datetime
+    ) -> float:
+        """
+        Returns the score at `now` after decaying it and adding `amount`.
+        """
+        return self.value_at(value, updated_at, now) + amount
+
+    def rank_key(self, value: float, updated_at: datetime) -> float:
+        """
+        Returns the time-invariant ordering key of a score.
+        """
+        return math.log(max(value, MIN_SCORE)) + self._elapsed(updated_at)
+
+    def threshold_key(self, threshold: float, now: datetime) -> float:
+        """
+        Returns the key below which scores have decayed under `threshold` at `now`.
+        """
+        return math.log(max(threshold, MIN_SCORE)) + self._elapsed(now)
+
+    def _elapsed(self, at: datetime) -> float:
+        return self.rate * (at - RANK_EPOCH).total_seconds()
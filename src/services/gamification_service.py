@@ -1,6 +1,9 @@
 import logging
 from datetime import datetime, timedelta
+from typing import Optional
 from src.domain.models import User, Wallet, Transaction, UserAchievement
+from src.infrastructure.balance_cache import WalletBalanceCache
+from src.infrastructure.leaderboard import Leaderboard, LeaderboardMetric
 from src.infrastructure.uow import IUnitOfWork
 from src.infrastructure.event_bus import EventPublisher
 from src.domain.events import AchievementUnlocked
@@ -12,15 +15,22 @@ class GamificationService:
     Service for handling all gamification logic.
     """
 
-    def __init__(self, event_publisher: EventPublisher):
+    def __init__(
+        self,
+        event_publisher: EventPublisher,
+        balance_cache: Optional[WalletBalanceCache] = None,
+        leaderboard: Optional[Leaderboard] = None,
+    ):
         self._event_publisher = event_publisher
+        self._balance_cache = balance_cache
+        self._leaderboard = leaderboard
 
     async def add_points(self, uow: IUnitOfWork, user_id: int, amount: int, description: str) -> Wallet:
         """Adds points to a user's wallet within a unit of work."""
         if amount <= 0:
             raise ValueError("Amount must be positive.")
 
-        wallet = await uow.wallets.get_by_user_id(user_id)
+        wallet = await uow.wallets.get_by_user_id(user_id, cached=False)
         if not wallet:
             wallet = Wallet(user_id=user_id, balance=0)
             await uow.wallets.add(wallet)
@@ -30,8 +40,9 @@ class GamificationService:
 
         transaction = Transaction(user_id=user_id, amount=amount, description=description)
         await uow.transactions.add(transaction)
+        self._publish_balance_on_commit(uow, wallet, transaction)
 
-        logger.info(f"Prepared to add {amount} points to user {user_id} for: {description}")
+        logger.info("Prepared to add %s points to user %s for: %s", amount, user_id, description)
         return wallet
 
     async def spend_points(self, uow: IUnitOfWork, user_id: int, amount: int, description: str) -> Wallet:
@@ -39,7 +50,7 @@ class GamificationService:
         if amount <= 0:
             raise ValueError("Amount must be positive.")
 
-        wallet = await uow.wallets.get_by_user_id(user_id)
+        wallet = await uow.wallets.get_by_user_id(user_id, cached=False)
         if not wallet or wallet.balance < amount:
             raise ValueError("Insufficient balance.")
 
@@ -48,8 +59,9 @@ class GamificationService:
 
         transaction = Transaction(user_id=user_id, amount=-amount, description=description)
         await uow.transactions.add(transaction)
+        self._publish_balance_on_commit(uow, wallet, transaction)
 
-        logger.info(f"Prepared to spend {amount} points from user {user_id} for: {description}")
+        logger.info("Prepared to spend %s points from user %s for: %s", amount, user_id, description)
         return wallet
 
     async def update_daily_streak(self, uow: IUnitOfWork, user: User) -> None:
@@ -76,6 +88,13 @@ class GamificationService:
         user.last_active_at = now
         await uow.users.add(user)
 
+        if self._leaderboard is not None:
+            # Streaks reset, so updates are versioned by the activity time
+            user_id, streak, version = user.id, user.current_streak, int(now.timestamp() * 1000)
+            uow.on_commit(
+                lambda: self._leaderboard.record(LeaderboardMetric.STREAK, {user_id: streak}, versions={user_id: version})
+            )
+
     async def get_wallet_by_user_id(self, uow: IUnitOfWork, user_id: int) -> Wallet:
         """Gets a user's wallet within a unit of work."""
         wallet = await uow.wallets.get_by_user_id(user_id)
@@ -84,6 +103,37 @@ class GamificationService:
             await uow.wallets.add(wallet)
         return wallet
 
+    async def get_balance(self, uow: IUnitOfWork, user_id: int) -> int:
+        """
+        Returns a user's balance from the balance cache, reading it from the
+        database on a miss. Users without a wallet have a balance of 0; no
+        wallet is created for them.
+        """
+        if self._balance_cache is not None:
+            balance = await self._balance_cache.get(user_id)
+            if balance is not None:
+                return balance
+
+        wallet = await uow.wallets.get_by_user_id(user_id, cached=False)
+        balance = wallet.balance if wallet else 0
+        if self._balance_cache is not None:
+            await self._balance_cache.fill(user_id, balance)
+        return balance
+
+    def _publish_balance_on_commit(self, uow: IUnitOfWork, wallet: Wallet, transaction: Transaction) -> None:
+        """
+        Updates the balance cache and the leaderboards once the change is committed.
+        """
+        user_id, balance, version, amount = wallet.user_id, wallet.balance, transaction.id, transaction.amount
+        if self._balance_cache is not None:
+            uow.on_commit(lambda: self._balance_cache.set(user_id, balance, version))
+        if self._leaderboard is not None:
+            uow.on_commit(
+                lambda: self._leaderboard.record(
+                    LeaderboardMetric.BALANCE, {user_id: balance}, {user_id: amount}, versions={user_id: version}
+                )
+            )
+
     async def unlock_achievement(self, uow: IUnitOfWork, user_id: int, achievement_name: str) -> bool:
         """
         Unlocks an achievement for a user within a unit of work.
@@ -91,7 +141,7 @@ class GamificationService:
         """
         achievement = await uow.achievements.get_by_name(achievement_name)
         if not achievement:
-            logger.warning(f"Achievement '{achievement_name}' not found.")
+            logger.warning("Achievement '%s' not found.", achievement_name)
             return False
 
         already_unlocked = await uow.user_achievements.find_by_user_and_achievement(
@@ -120,5 +170,5 @@ class GamificationService:
         )
         await self._event_publisher.publish("user_events", event)
 
-        logger.info(f"User {user_id} unlocked achievement: {achievement.name}")
+        logger.info("User %s unlocked achievement: %s", user_id, achievement.name)
         return True
@@ -0,0 +1,52 @@
+import logging
+from typing import Callable, Dict
+from src.infrastructure.leaderboard import Leaderboard, LeaderboardMetric
+from src.infrastructure.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardService:
+    """
+    Rebuilds the all-time leaderboards from the database.
+
+    Day to day the boards are updated incrementally by the services that
+    change the ranked values; a rebuild is only needed when Redis lost them
+    or they drifted after failed updates. Rows are streamed in chunks, from
+    the replica when there is one.
+    """
+
+    def __init__(
+        self,
+        leaderboard: Leaderboard,
+        uow_provider: Callable[..., IUnitOfWork],
+        chunk_size: int = 1000,
+    ):
+        self._leaderboard = leaderboard
+        self._uow_provider = uow_provider
+        self._chunk_size = chunk_size
+
+    async def rebuild(self) -> Dict[LeaderboardMetric, int]:
+        """
+        Rebuilds every all-time board. Returns the number of ranked users per metric.
+        """
+        counts = {}
+        async with self._uow_provider(read_only=True) as uow:
+            sources = {
+                LeaderboardMetric.BALANCE: uow.wallets.stream_balances,
+                LeaderboardMetric.STREAK: uow.users.stream_streaks,
+                LeaderboardMetric.ENGAGEMENT: uow.user_profiles.stream_engagement_ranks,
+            }
+            for metric, stream in sources.items():
+                counts[metric] = await self._leaderboard.rebuild(metric, stream(self._chunk_size))
+        return counts
+
+    async def rebuild_if_empty(self) -> None:
+        """
+        Rebuilds the boards at startup if the balance board is missing.
+        """
+        try:
+            if await self._leaderboard.size(LeaderboardMetric.BALANCE) == 0:
+                await self.rebuild()
+        except Exception:
+            logger.error("Could not rebuild the leaderboards", exc_info=True)
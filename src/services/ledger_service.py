@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from src.domain.models import BalanceSnapshot, Transaction
+from src.infrastructure.archive import ArchivedTransaction, TransactionArchive
+from src.infrastructure.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerService:
+    """
+    Reads balances and history from the transaction ledger.
+
+    A balance is the user's latest snapshot plus the transactions after it,
+    so every query reads one snapshot and a tail bounded by the snapshot
+    job's `min_tail`, never the whole history. History and past balances
+    older than the hot table are read from the transaction archive.
+    """
+
+    def __init__(self, archive: Optional[TransactionArchive] = None):
+        self._archive = archive
+
+    async def history(
+        self, uow: IUnitOfWork, user_id: int, limit: int = 20, before_id: Optional[int] = None
+    ) -> List[Union[Transaction, ArchivedTransaction]]:
+        """
+        Returns a page of the user's transactions, newest first. Pass the id
+        of the last transaction of a page as `before_id` to get the next one.
+        """
+        transactions = list(await uow.transactions.history(user_id, limit, before_id))
+        if len(transactions) < limit and self._archive is not None:
+            older_than = transactions[-1].id if transactions else before_id
+            transactions += await asyncio.to_thread(
+                self._archive.history, user_id, limit - len(transactions), older_than
+            )
+        return transactions
+
+    async def balance_at(self, uow: IUnitOfWork, user_id: int, at: datetime) -> int:
+        """
+        Returns the user's ledger balance as of `at`.
+        """
+        last_id = await uow.transactions.last_id_at(user_id, at)
+        if last_id is None:
+            # Nothing in the hot table yet at `at`: all that came before is archived
+            if self._archive is None:
+                return 0
+            return await asyncio.to_thread(self._archive.total_up_to, user_id, at)
+        snapshot = await uow.balance_snapshots.latest(user_id, up_to_transaction_id=last_id)
+        start_balance, start_id = (snapshot.balance, snapshot.transaction_id) if snapshot else (0, 0)
+        return start_balance + await uow.transactions.total_between(user_id, start_id, last_id)
+
+    async def balances(self, uow: IUnitOfWork, user_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        Returns the current ledger balance of each user.
+        """
+        user_ids = list(user_ids)
+        snapshots = await uow.balance_snapshots.latest_many(user_ids)
+        tails = await uow.transactions.tail_totals(user_ids)
+        balances = {}
+        for user_id in user_ids:
+            snapshot = snapshots.get(user_id)
+            _, tail_total, _ = tails.get(user_id, (0, 0, 0))
+            balances[user_id] = (snapshot.balance if snapshot else 0) + tail_total
+        return balances
+
+
+class LedgerSnapshotJob:
+    """
+    Periodic job that snapshots ledger balances.
+
+    Each run only looks at users with transactions since the previous run,
+    and snapshots those with at least `min_tail` transactions after their
+    latest snapshot. Transactions younger than `settle_seconds` are left
+    for the next run, so a snapshot never skips one that commits late.
+    """
+
+    def __init__(
+        self,
+        uow_provider: Callable[[], IUnitOfWork],
+        interval_seconds: float = 3600,
+        min_tail: int = 50,
+        chunk_size: int = 500,
+        settle_seconds: float = 60,
+    ):
+        self._uow_provider = uow_provider
+        self._interval = interval_seconds
+        self._min_tail = min_tail
+        self._chunk_size = chunk_size
+        self._settle = timedelta(seconds=settle_seconds)
+        # Transactions up to this id were looked at by a previous run; on the
+        # first run, the newest one any snapshot covers
+        self._last_transaction_id: Optional[int] = None
+
+    async def run(self) -> None:
+        """
+        Runs the job every `interval_seconds` until cancelled.
+        """
+        logger.info("Ledger snapshot job started.")
+        while True:
+            try:
+                taken = await self.run_once()
+                logger.info("Took %d balance snapshots.", taken)
+            except Exception:
+                logger.error("Ledger snapshot run failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Snapshots every user with a long enough tail. Returns the number of snapshots taken.
+        """
+        cutoff = (now or datetime.utcnow()) - self._settle
+        async with self._uow_provider() as uow:
+            high_water = await uow.transactions.max_id(created_before=cutoff)
+            if self._last_transaction_id is None:
+                self._last_transaction_id = await uow.balance_snapshots.max_transaction_id()
+
+        total = 0
+        last_user_id = 0
+        while True:
+            async with self._uow_provider() as uow:
+                user_ids = await uow.transactions.users_after(
+                    self._last_transaction_id, last_user_id, self._chunk_size
+                )
+                if not user_ids:
+                    break
+                snapshots = await uow.balance_snapshots.latest_many(user_ids)
+                tails = await uow.transactions.tail_totals(user_ids, created_before=cutoff)
+                new_snapshots = [
+                    BalanceSnapshot(
+                        user_id=user_id,
+                        transaction_id=last_id,
+                        balance=(snapshots[user_id].balance if user_id in snapshots else 0) + tail_total,
+                    )
+                    for user_id, (count, tail_total, last_id) in tails.items()
+                    if count >= self._min_tail
+                ]
+                await uow.balance_snapshots.add_many(new_snapshots)
+            total += len(new_snapshots)
+            last_user_id = user_ids[-1]
+            if len(user_ids) < self._chunk_size:
+                break
+
+        self._last_transaction_id = max(self._last_transaction_id, high_water)
+        return total
+
+
+class ReconciliationReport(NamedTuple):
+    checked: int
+    mismatches: int
+    # (user_id, wallet balance, ledger balance) of the first mismatches found
+    samples: List[Tuple[int, int, int]]
+
+
+class LedgerReconciliationJob:
+    """
+    Periodic job that verifies wallet balances against the ledger.
+
+    Wallets are read in batches of `chunk_size`, each compared with the
+    ledger balances of the same users in the same unit of work. Wallets that
+    disagree are checked once more in a fresh unit of work, to rule out a
+    write landing between the two reads, and the remaining ones are logged.
+    Nothing is corrected automatically.
+    """
+
+    MAX_SAMPLES = 100
+
+    def __init__(
+        self,
+        uow_provider: Callable[[], IUnitOfWork],
+        ledger_service: LedgerService,
+        interval_seconds: float = 24 * 3600,
+        chunk_size: int = 1000,
+    ):
+        self._uow_provider = uow_provider
+        self._ledger_service = ledger_service
+        self._interval = interval_seconds
+        self._chunk_size = chunk_size
+
+    async def run(self) -> None:
+        """
+        Runs the job every `interval_seconds` until cancelled.
+        """
+        logger.info("Ledger reconciliation job started.")
+        while True:
+            try:
+                report = await self.run_once()
+                logger.info(
+                    "Reconciled %d wallets against the ledger, %d mismatches.",
+                    report.checked, report.mismatches,
+                )
+            except Exception:
+                logger.error("Ledger reconciliation run failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+    async def run_once(self) -> ReconciliationReport:
+        checked = 0
+        mismatches = 0
+        samples: List[Tuple[int, int, int]] = []
+        last_user_id = 0
+        while True:
+            async with self._uow_provider() as uow:
+                wallets = await uow.wallets.balances_after(last_user_id, self._chunk_size)
+                if not wallets:
+                    break
+                suspects = await self._mismatches(uow, dict(wallets))
+            if suspects:
+                async with self._uow_provider() as uow:
+                    balances = await uow.wallets.balances_of(user_id for user_id, _, _ in suspects)
+                    for user_id, wallet_balance, ledger_balance in await self._mismatches(uow, balances):
+                        logger.warning(
+                            "Wallet of user %s has balance %d but the ledger says %d",
+                            user_id, wallet_balance, ledger_balance,
+                        )
+                        mismatches += 1
+                        if len(samples) < self.MAX_SAMPLES:
+                            samples.append((user_id, wallet_balance, ledger_balance))
+            checked += len(wallets)
+            last_user_id = wallets[-1][0]
+            if len(wallets) < self._chunk_size:
+                break
+        return ReconciliationReport(checked=checked, mismatches=mismatches, samples=samples)
+
+    async def _mismatches(self, uow: IUnitOfWork, wallets: Dict[int, int]) -> List[Tuple[int, int, int]]:
+        ledger = await self._ledger_service.balances(uow, wallets)
+        return [
+            (user_id, balance, ledger[user_id])
+            for user_id, balance in wallets.items()
+            if balance != ledger[user_id]
+        ]
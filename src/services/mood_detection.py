@@ -0,0 +1,236 @@
+import re
+from typing import Dict, Iterable, List, Mapping, Sequence
+import numpy as np
+from src.domain.models import UserMood
+
+# Token weights per mood. Spanish first, since that is the bot's language,
+# plus common English words and emoji.
+MOOD_LEXICON: Dict[UserMood, Dict[str, float]] = {
+    UserMood.HAPPY: {
+        "feliz": 1.0, "alegre": 1.0, "genial": 0.8, "increíble": 0.8, "gracias": 0.5,
+        "bien": 0.4, "bueno": 0.4, "encanta": 0.9, "jaja": 0.7, "jajaja": 0.8,
+        "happy": 1.0, "great": 0.8, "love": 0.8, "thanks": 0.5, "awesome": 0.8,
+        "😀": 1.0, "😄": 1.0, "😊": 0.9, "😍": 0.9, "❤": 0.6, "🥰": 0.9, "!": 0.1,
+    },
+    UserMood.SAD: {
+        "triste": 1.0, "solo": 0.6, "sola": 0.6, "llorar": 0.9, "lloro": 0.9,
+        "extraño": 0.5, "cansado": 0.5, "cansada": 0.5, "mal": 0.5, "deprimido": 1.0,
+        "sad": 1.0, "lonely": 0.8, "cry": 0.9, "tired": 0.5, "miss": 0.5,
+        "😢": 1.0, "😭": 1.0, "😞": 0.9, "💔": 0.9,
+    },
+    UserMood.ANGRY: {
+        "enojado": 1.0, "enojada": 1.0, "odio": 1.0, "harto": 0.9, "harta": 0.9,
+        "molesto": 0.8, "molesta": 0.8, "furioso": 1.0, "basura": 0.7, "maldito": 0.8,
+        "angry": 1.0, "hate": 1.0, "annoyed": 0.8, "stupid": 0.7, "worst": 0.7,
+        "😠": 1.0, "😡": 1.0, "🤬": 1.0,
+    },
+    UserMood.CURIOUS: {
+        "qué": 0.4, "cómo": 0.5, "por": 0.1, "porqué": 0.6, "curiosidad": 1.0,
+        "pregunta": 0.7, "explorar": 0.7, "descubrir": 0.8, "dónde": 0.5, "cuál": 0.4,
+        "why": 0.5, "how": 0.5, "what": 0.4, "curious": 1.0, "wonder": 0.8,
+        "🤔": 1.0, "🧐": 0.9, "?": 0.3,
+    },
+    UserMood.REFLECTIVE: {
+        "pienso": 0.8, "creo": 0.5, "recuerdo": 0.8, "sentido": 0.6, "vida": 0.5,
+        "reflexión": 1.0, "reflexionar": 1.0, "quizás": 0.5, "tal": 0.2, "vez": 0.2,
+        "think": 0.6, "remember": 0.8, "meaning": 0.8, "maybe": 0.4, "perhaps": 0.5,
+        "💭": 1.0, "...": 0.4,
+    },
+}
+
+_TOKEN_PATTERN = re.compile(r"\.\.\.|\w+|[^\w\s]", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits a message into lowercase words, ellipses and single symbols (emoji, punctuation).
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class MoodDetector:
+    """
+    Lexicon-based mood scorer with a rolling per-user aggregate.
+
+    Messages are scored in batches against every `UserMood` with a single
+    vectorized pass over a (vocabulary x moods) weight matrix. Each user keeps
+    an exponentially decayed mood vector, so new messages are folded in
+    without re-reading any history.
+    """
+
+    MOODS: Sequence[UserMood] = tuple(UserMood)
+
+    def __init__(
+        self,
+        lexicon: Mapping[UserMood, Mapping[str, float]] = MOOD_LEXICON,
+        decay: float = 0.8,
+        neutral_bias: float = 0.15,
+        max_users: int = 100_000,
+    ):
+        self._decay = decay
+        self._max_users = max_users
+        self._mood_index = {mood: i for i, mood in enumerate(self.MOODS)}
+
+        self._vocabulary: Dict[str, int] = {}
+        for words in lexicon.values():
+            for word in words:
+                self._vocabulary.setdefault(word, len(self._vocabulary))
+
+        self._weights = np.zeros((len(self._vocabulary), len(self.MOODS)), dtype=np.float32)
+        for mood, words in lexicon.items():
+            for word, weight in words.items():
+                self._weights[self._vocabulary[word], self._mood_index[mood]] = weight
+
+        # Constant score for NEUTRAL: a message needs this much signal to move away from it
+        self._bias = np.zeros(len(self.MOODS), dtype=np.float32)
+        self._bias[self._mood_index[UserMood.NEUTRAL]] = neutral_bias
+
+        # Rolling aggregates, one row per tracked user
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        capacity = min(1024, max_users)
+        self._aggregates = np.zeros((capacity, len(self.MOODS)), dtype=np.float32)
+        self._last_seen = np.zeros(capacity, dtype=np.int64)
+        self._owners = np.full(capacity, -1, dtype=np.int64)
+        self._clock = 0
+
+    def score_batch(self, messages: Sequence[str]) -> np.ndarray:
+        """
+        Scores messages against every mood.
+        Returns an array of shape (len(messages), len(UserMood)).
+        """
+        token_ids: List[int] = []
+        bounds = np.zeros(len(messages) + 1, dtype=np.int64)
+        lengths = np.zeros(len(messages), dtype=np.float32)
+        vocabulary = self._vocabulary
+
+        for i, text in enumerate(messages):
+            tokens = tokenize(text)
+            lengths[i] = len(tokens)
+            token_ids.extend(vocabulary[t] for t in tokens if t in vocabulary)
+            bounds[i + 1] = len(token_ids)
+
+        # Per-message sums of the lexicon rows as differences of a running total
+        cumulative = np.zeros((len(token_ids) + 1, len(self.MOODS)), dtype=np.float32)
+        if token_ids:
+            np.cumsum(self._weights[np.asarray(token_ids)], axis=0, out=cumulative[1:])
+        scores = cumulative[bounds[1:]] - cumulative[bounds[:-1]]
+
+        # Long messages should not win only because they have more words
+        scores /= np.sqrt(np.maximum(lengths, 1.0))[:, None]
+        scores += self._bias
+        return scores
+
+    def classify_batch(self, messages: Sequence[str]) -> List[UserMood]:
+        """
+        Returns the most likely mood of each message.
+        """
+        if not messages:
+            return []
+        return [self.MOODS[i] for i in self.score_batch(messages).argmax(axis=1)]
+
+    def observe(self, user_ids: Sequence[int], messages: Sequence[str]) -> None:
+        """
+        Folds a batch of messages into the senders' rolling aggregates.
+        Messages from the same user are applied in order.
+        """
+        if not messages:
+            return
+        scores = self.score_batch(messages)
+        users, inverse, counts = np.unique(
+            np.asarray(user_ids), return_inverse=True, return_counts=True
+        )
+
+        # A user's k-th message from the end of the batch is decayed k times
+        order = np.argsort(inverse, kind="stable")
+        group_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        rank_from_end = np.empty(len(messages), dtype=np.int64)
+        rank_from_end[order] = np.repeat(counts, counts) - 1 - (np.arange(len(messages)) - group_starts)
+        weights = (1.0 - self._decay) * self._decay ** rank_from_end
+
+        contributions = np.zeros((len(users), len(self.MOODS)), dtype=np.float32)
+        np.add.at(contributions, inverse, scores * weights[:, None])
+
+        rows = self._slots_for(users.tolist())
+        self._aggregates[rows] = (
+            self._aggregates[rows] * (self._decay ** counts)[:, None] + contributions
+        )
+
+    def mood_for(self, user_id: int) -> UserMood:
+        """
+        Returns the user's current mood from the rolling aggregate.
+        Users without observations are NEUTRAL.
+        """
+        slot = self._slots.get(user_id)
+        if slot is None:
+            return UserMood.NEUTRAL
+        aggregate = self._aggregates[slot]
+        if not aggregate.any():
+            return UserMood.NEUTRAL
+        return self.MOODS[int(aggregate.argmax())]
+
+    def has_observations(self, user_id: int) -> bool:
+        """
+        Returns True if any scored message of the user is in the rolling aggregate.
+        """
+        slot = self._slots.get(user_id)
+        return slot is not None and bool(self._aggregates[slot].any())
+
+    def moods_for(self, user_ids: Iterable[int]) -> Dict[int, UserMood]:
+        return {user_id: self.mood_for(user_id) for user_id in user_ids}
+
+    def forget(self, user_id: int) -> None:
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._aggregates[slot] = 0
+            self._owners[slot] = -1
+            self._free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slots_for(self, user_ids: List[int]) -> np.ndarray:
+        self._clock += 1
+        rows = np.full(len(user_ids), -1, dtype=np.int64)
+        for i, user_id in enumerate(user_ids):
+            slot = self._slots.get(user_id)
+            if slot is not None:
+                rows[i] = slot
+        # Mark known users first so eviction never picks a user from this batch
+        self._last_seen[rows[rows >= 0]] = self._clock
+
+        for i in np.flatnonzero(rows < 0):
+            slot = self._allocate_slot()
+            self._slots[user_ids[i]] = slot
+            self._owners[slot] = user_ids[i]
+            self._last_seen[slot] = self._clock
+            rows[i] = slot
+        return rows
+
+    def _allocate_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+
+        capacity = self._aggregates.shape[0]
+        if self._size == capacity and capacity < self._max_users:
+            capacity = min(capacity * 2, self._max_users)
+            self._aggregates = np.vstack(
+                [self._aggregates, np.zeros((capacity - self._size, len(self.MOODS)), dtype=np.float32)]
+            )
+            self._last_seen = np.concatenate(
+                [self._last_seen, np.zeros(capacity - self._size, dtype=np.int64)]
+            )
+            self._owners = np.concatenate(
+                [self._owners, np.full(capacity - self._size, -1, dtype=np.int64)]
+            )
+
+        if self._size < capacity:
+            self._size += 1
+            return self._size - 1
+
+        # Full: reuse the slot of the least recently seen user
+        slot = int(self._last_seen.argmin())
+        del self._slots[int(self._owners[slot])]
+        self._aggregates[slot] = 0
+        return slot
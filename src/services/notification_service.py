@@ -30,9 +30,6 @@ class NotificationService:
         try:
             # Using MarkdownV2 parse mode for bold text
             await self._bot.send_message(chat_id=user_id, text=text, parse_mode="MarkdownV2")
-            logger.info(f"Sent achievement notification to user {user_id} for '{achievement_name}'")
+            logger.info("Sent achievement notification to user %s for '%s'", user_id, achievement_name)
         except TelegramAPIError as e:
-            logger.error(
-                f"Failed to send achievement notification to user {user_id}: {e}",
-                exc_info=True,
-            )
+            logger.error("Failed to send achievement notification to user %s: %s", user_id, e, exc_info=True)
@@ -24,9 +24,6 @@ class OnboardingService:
         )
         try:
             await self._bot.send_message(chat_id=user_id, text=text)
-            logger.info(f"Sent welcome message to user {user_id}")
+            logger.info("Sent welcome message to user %s", user_id)
         except TelegramAPIError as e:
-            logger.error(
-                f"Failed to send welcome message to user {user_id}: {e}",
-                exc_info=True,
-            )
+            logger.error("Failed to send welcome message to user %s: %s", user_id, e, exc_info=True)
@@ -1,4 +1,39 @@
-from src.domain.models import UserProfile
+from typing import Dict, Tuple
+from src.domain.models import UserProfile, UserMood, UserArchetype
+
+MOOD_GREETINGS: Dict[UserMood, str] = {
+    UserMood.NEUTRAL: "Hola.",
+    UserMood.HAPPY: "¡Qué bueno verte tan alegre!",
+    UserMood.SAD: "Espero que te animes pronto. A veces, un pequeño paso es un gran comienzo.",
+    UserMood.ANGRY: "Respira hondo. La calma es una aliada poderosa.",
+    UserMood.CURIOUS: "Veo que la curiosidad te guía hoy...",
+    UserMood.REFLECTIVE: "Un momento de calma para pensar es un tesoro.",
+}
+
+ARCHETYPE_GREETINGS: Dict[UserArchetype, str] = {
+    UserArchetype.EXPLORER: "El mundo tiene nuevos caminos para que los descubras.",
+    UserArchetype.ACHIEVER: "Un nuevo reto te espera para que demuestres tu valía.",
+    UserArchetype.SOCIALIZER: "¿Listo para conectar con otros y compartir historias?",
+    UserArchetype.PHILOSOPHER: "Una pregunta interesante flota en el aire, ¿la atrapas?",
+    UserArchetype.CREATOR: "La inspiración te rodea, solo tienes que darle forma.",
+}
+
+
+def render_adaptive_message(mood: UserMood, archetype: UserArchetype) -> str:
+    """
+    Composes the greeting for a mood and archetype.
+    """
+    mood_greeting = MOOD_GREETINGS.get(mood, "Hola.")
+    archetype_greeting = ARCHETYPE_GREETINGS.get(archetype, "")
+    return f"{mood_greeting} {archetype_greeting}".strip()
+
+
+# Every greeting only depends on (mood, archetype), so all of them are built once.
+ADAPTIVE_MESSAGES: Dict[Tuple[UserMood, UserArchetype], str] = {
+    (mood, archetype): render_adaptive_message(mood, archetype)
+    for mood in UserMood
+    for archetype in UserArchetype
+}
 
 
 class PersonalizationService:
@@ -28,25 +63,17 @@ class PersonalizationService:
                 "Recomendación: Visita la biblioteca de los susurros.",
             ]
 
+    def render_adaptive_message(self, mood: UserMood, archetype: UserArchetype) -> str:
+        """
+        Returns the greeting for a mood and archetype without touching a profile.
+        """
+        message = ADAPTIVE_MESSAGES.get((mood, archetype))
+        if message is None:
+            message = render_adaptive_message(mood, archetype)
+        return message
+
     async def generate_adaptive_message(self, profile: UserProfile) -> str:
         """
         Generates a personalized greeting based on the user's mood and archetype.
         """
-        mood_greeting = {
-            "neutral": "Hola.",
-            "happy": "¡Qué bueno verte tan alegre!",
-            "sad": "Espero que te animes pronto. A veces, un pequeño paso es un gran comienzo.",
-            "angry": "Respira hondo. La calma es una aliada poderosa.",
-            "curious": "Veo que la curiosidad te guía hoy...",
-            "reflective": "Un momento de calma para pensar es un tesoro.",
-        }.get(profile.mood.value, "Hola.")
-
-        archetype_greeting = {
-            "explorer": "El mundo tiene nuevos caminos para que los descubras.",
-            "achiever": "Un nuevo reto te espera para que demuestres tu valía.",
-            "socializer": "¿Listo para conectar con otros y compartir historias?",
-            "philosopher": "Una pregunta interesante flota en el aire, ¿la atrapas?",
-            "creator": "La inspiración te rodea, solo tienes que darle forma.",
-        }.get(profile.archetype.value, "")
-
-        return f"{mood_greeting} {archetype_greeting}".strip()
+        return self.render_adaptive_message(profile.mood, profile.archetype)
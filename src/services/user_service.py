@@ -1,18 +1,35 @@
-from typing import Tuple
+from typing import NamedTuple, Optional, Sequence, Tuple
 from aiogram import types as tg_types
-from src.domain.models import User, UserProfile
+from sqlalchemy import inspect
+from src.domain.models import User, UserProfile, Wallet
+from src.infrastructure.repositories import USER_CONTEXT_RELATIONS
 from src.infrastructure.uow import IUnitOfWork
 from src.domain.events import UserRegistered
 from src.infrastructure.event_bus import EventPublisher
 
 
+class UserContext(NamedTuple):
+    """
+    A user with the related rows loaded for the current update.
+    `profile` and `wallet` are None if missing or not loaded.
+    """
+    user: User
+    profile: Optional[UserProfile]
+    wallet: Optional[Wallet]
+
+
 class UserService:
     """
     Service for user management.
     """
 
-    def __init__(self, event_publisher: EventPublisher):
+    def __init__(
+        self,
+        event_publisher: EventPublisher,
+        context_relations: Sequence[str] = USER_CONTEXT_RELATIONS,
+    ):
         self._event_publisher = event_publisher
+        self._context_relations = tuple(context_relations)
 
     async def get_or_create_user(
         self,
@@ -35,19 +52,56 @@ class UserService:
         """
         user = await uow.users.get(telegram_user.id)
         if user:
-            # User exists, check if profile info needs updating
-            if (
-                user.first_name != telegram_user.first_name
-                or user.last_name != telegram_user.last_name
-                or user.username != telegram_user.username
-            ):
-                user.first_name = telegram_user.first_name
-                user.last_name = telegram_user.last_name
-                user.username = telegram_user.username
-                await uow.users.add(user)
+            await self._update_user_info(uow, user, telegram_user)
             return user, False
 
-        # User does not exist, create a new one
+        new_user, _ = await self._create_user(uow, telegram_user)
+        return new_user, True
+
+    async def get_or_create_user_context(
+        self,
+        uow: IUnitOfWork,
+        telegram_user: tg_types.User,
+    ) -> Tuple[UserContext, bool]:
+        """
+        Like `get_or_create_user`, but loads the user together with the
+        configured relationships (profile and wallet by default) in one query.
+
+        Returns:
+            A tuple containing the UserContext and a boolean indicating if the user was created.
+        """
+        user = await uow.users.get_with_context(telegram_user.id, self._context_relations)
+        if user:
+            # Read the relationships before any flush can expire them
+            unloaded = inspect(user).unloaded
+            context = UserContext(
+                user=user,
+                profile=None if "profile" in unloaded else user.profile,
+                wallet=None if "wallet" in unloaded else user.wallet,
+            )
+            await self._update_user_info(uow, user, telegram_user)
+            return context, False
+
+        new_user, new_profile = await self._create_user(uow, telegram_user)
+        return UserContext(user=new_user, profile=new_profile, wallet=None), True
+
+    async def _update_user_info(
+        self, uow: IUnitOfWork, user: User, telegram_user: tg_types.User
+    ) -> None:
+        # User exists, check if profile info needs updating
+        if (
+            user.first_name != telegram_user.first_name
+            or user.last_name != telegram_user.last_name
+            or user.username != telegram_user.username
+        ):
+            user.first_name = telegram_user.first_name
+            user.last_name = telegram_user.last_name
+            user.username = telegram_user.username
+            await uow.users.add(user)
+
+    async def _create_user(
+        self, uow: IUnitOfWork, telegram_user: tg_types.User
+    ) -> Tuple[User, UserProfile]:
         new_user = User(
             id=telegram_user.id,
             first_name=telegram_user.first_name,
@@ -66,4 +120,4 @@ class UserService:
         )
         await self._event_publisher.publish("user_events", event)
 
-        return new_user, True
+        return new_user, new_profile
@@ -0,0 +1,80 @@
+import asyncio
+import html
+from unittest.mock import AsyncMock
+import pytest
+from aiogram.filters import CommandObject
+from src.bot.handlers.admin import CAPTION_LIMIT, PROFILE_USAGE, _caption, profile_handler
+from src.domain.models import User
+from src.infrastructure.runtime_profiler import RuntimeProfiler
+
+
+@pytest.mark.asyncio
+async def test_profile_handler_ignores_non_admins(tmp_path):
+    """
+    Test that /profile does nothing for users who are not admins.
+    """
+    message = AsyncMock()
+    user = User(id=1, first_name="Testy", is_admin=False)
+
+    await profile_handler(message, user, CommandObject(command="profile", args="cpu 1"), RuntimeProfiler(str(tmp_path)))
+
+    message.reply.assert_not_called()
+    message.answer_document.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_profile_handler_sends_cpu_profile(tmp_path):
+    """
+    Test that /profile cpu replies at once and sends the collapsed stacks when done.
+    """
+    message = AsyncMock()
+    admin = User(id=1, first_name="Admin", is_admin=True)
+    profiler = RuntimeProfiler(str(tmp_path), interval=0.001)
+
+    await profile_handler(message, admin, CommandObject(command="profile", args="cpu 0.05"), profiler)
+    message.reply.assert_awaited_once_with("Profiling the event loop for 0.05s…")
+
+    for _ in range(100):
+        if message.answer_document.await_count:
+            break
+        await asyncio.sleep(0.01)
+    document = message.answer_document.await_args.args[0]
+    assert str(document.path).endswith(".collapsed")
+    assert "samples" in message.answer_document.await_args.kwargs["caption"]
+
+
+@pytest.mark.asyncio
+async def test_profile_handler_heap_snapshots(tmp_path):
+    """
+    Test that /profile heap starts tracing, sends snapshot diffs and stops tracing.
+    """
+    message = AsyncMock()
+    admin = User(id=1, first_name="Admin", is_admin=True)
+    profiler = RuntimeProfiler(str(tmp_path))
+
+    await profile_handler(message, admin, CommandObject(command="profile", args="heap snapshot"), profiler)
+    message.reply.assert_awaited_with("Heap tracing is not started.")
+
+    await profile_handler(message, admin, CommandObject(command="profile", args="heap start"), profiler)
+    try:
+        await profile_handler(message, admin, CommandObject(command="profile", args="heap snapshot"), profiler)
+    finally:
+        await profile_handler(message, admin, CommandObject(command="profile", args="heap stop"), profiler)
+
+    caption = message.answer_document.await_args.kwargs["caption"]
+    assert caption.startswith("Allocation growth since the last snapshot:")
+    assert not profiler.heap.tracing
+
+    await profile_handler(message, admin, CommandObject(command="profile", args="memory"), profiler)
+    message.reply.assert_awaited_with(PROFILE_USAGE)
+
+
+def test_caption_is_cut_before_escaping():
+    """
+    Test that long captions are cut to the limit on the text, without splitting an escaped entity.
+    """
+    caption = _caption(["<module>" * 200])
+
+    assert caption.startswith("&lt;module&gt;")
+    assert html.unescape(caption) == ("<module>" * 200)[:CAPTION_LIMIT]
+    assert not caption.endswith("&") and not caption.endswith("&lt")
@@ -1,8 +1,13 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from aiogram.types import InlineKeyboardMarkup
-from src.bot.handlers.commands import start_handler, balance_handler
+from src.bot.handlers.commands import start_handler, balance_handler, leaderboard_handler, text_message_handler
+from src.bot.ui.render_cache import RenderedMenu
 from src.domain.models import User, Wallet, UserProfile, UserMood, UserArchetype
+from src.infrastructure.leaderboard import LeaderboardEntry
+from src.infrastructure.load_shedding import LoadShedder
+from src.infrastructure.metrics import MetricsRegistry
+from src.services.user_service import UserContext
 
 
 @pytest.mark.asyncio
@@ -70,3 +75,182 @@ async def test_balance_handler():
     mock_message.reply.assert_called_once_with(
         "Your current balance is: 123 Besitos 💋"
     )
+
+
+@pytest.mark.asyncio
+async def test_start_handler_uses_render_cache():
+    """
+    Test that the start_handler replies with the precomputed render when available.
+    """
+    mock_message = AsyncMock()
+    mock_message.from_user.language_code = "es"
+    mock_user = User(id=1, first_name="Testy")
+    mock_profile = UserProfile(
+        user_id=1,
+        mood=UserMood.HAPPY,
+        archetype=UserArchetype.SOCIALIZER,
+    )
+    mock_uow = MagicMock()
+    mock_uow.user_profiles.get = AsyncMock(return_value=mock_profile)
+    mock_personalization_service = AsyncMock()
+    render_cache = MagicMock()
+    render_cache.get_for_profile.return_value = RenderedMenu(
+        text="Cached Message", keyboard=InlineKeyboardMarkup(inline_keyboard=[])
+    )
+
+    await start_handler(
+        mock_message,
+        mock_user,
+        mock_uow,
+        AsyncMock(),
+        AsyncMock(),
+        mock_personalization_service,
+        render_cache=render_cache,
+    )
+
+    render_cache.get_for_profile.assert_called_once_with(mock_profile, "es")
+    mock_personalization_service.generate_adaptive_message.assert_not_called()
+    args, kwargs = mock_message.reply.call_args
+    assert args[0] == "Cached Message"
+    assert kwargs["reply_markup"] is render_cache.get_for_profile.return_value.keyboard
+
+
+@pytest.mark.asyncio
+async def test_start_handler_defers_context_analysis():
+    """
+    Test that the start_handler queues context analysis instead of awaiting it.
+    """
+    mock_message = AsyncMock()
+    mock_user = User(id=1, first_name="Testy")
+    mock_profile = UserProfile(
+        user_id=1,
+        mood=UserMood.NEUTRAL,
+        archetype=UserArchetype.EXPLORER,
+    )
+    mock_uow = MagicMock()
+    mock_uow.user_profiles.get = AsyncMock(return_value=mock_profile)
+    mock_context_service = AsyncMock()
+    mock_personalization_service = AsyncMock()
+    mock_personalization_service.generate_adaptive_message.return_value = "Hola."
+    context_pipeline = MagicMock()
+
+    await start_handler(
+        mock_message,
+        mock_user,
+        mock_uow,
+        AsyncMock(),
+        mock_context_service,
+        mock_personalization_service,
+        context_pipeline=context_pipeline,
+    )
+
+    context_pipeline.submit.assert_called_once_with(1, mock_message.text)
+    mock_context_service.detect_user_mood.assert_not_called()
+    mock_context_service.classify_user_archetype.assert_not_called()
+    mock_message.reply.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_balance_handler_uses_loaded_wallet():
+    """
+    Test that the balance_handler uses the wallet loaded with the user.
+    """
+    mock_message = AsyncMock()
+    mock_user = User(id=1, first_name="Testy")
+    mock_gamification_service = AsyncMock()
+    user_context = UserContext(user=mock_user, profile=None, wallet=Wallet(balance=7))
+
+    await balance_handler(
+        mock_message, mock_user, AsyncMock(), mock_gamification_service, user_context=user_context
+    )
+
+    mock_gamification_service.get_wallet_by_user_id.assert_not_called()
+    mock_message.reply.assert_called_once_with("Your current balance is: 7 Besitos 💋")
+
+
+@pytest.mark.asyncio
+async def test_balance_handler_uses_balance_cache():
+    """
+    Test that the balance_handler reads the balance through the balance cache
+    instead of loading or creating a wallet.
+    """
+    mock_message = AsyncMock()
+    mock_user = User(id=1, first_name="Testy")
+    mock_gamification_service = AsyncMock()
+    mock_gamification_service.get_balance.return_value = 42
+
+    await balance_handler(
+        mock_message, mock_user, AsyncMock(), mock_gamification_service, balance_cache=MagicMock()
+    )
+
+    mock_gamification_service.get_wallet_by_user_id.assert_not_called()
+    mock_message.reply.assert_called_once_with("Your current balance is: 42 Besitos 💋")
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_handler_lists_top_and_own_rank():
+    """
+    Test that the leaderboard_handler lists the top users and the user's own
+    position when it is not among them.
+    """
+    mock_message = AsyncMock()
+    mock_user = User(id=7, first_name="Testy")
+    mock_uow = MagicMock()
+    mock_uow.users.get_many = AsyncMock(return_value=[User(id=1, first_name="Ana", username=None)])
+    mock_leaderboard = AsyncMock()
+    mock_leaderboard.top.return_value = [LeaderboardEntry(user_id=1, rank=1, score=500.0)]
+    mock_leaderboard.rank.return_value = LeaderboardEntry(user_id=7, rank=12, score=40.0)
+
+    await leaderboard_handler(mock_message, mock_user, mock_uow, leaderboard=mock_leaderboard)
+
+    mock_message.reply.assert_called_once_with("🏆 Top Besitos\n1. Ana: 500\n…\n12. You: 40")
+
+
+@pytest.mark.asyncio
+async def test_start_handler_sheds_optional_work_under_load():
+    """
+    Test that under load /start still replies but skips the context analysis and the achievement check.
+    """
+    mock_message = AsyncMock()
+    mock_user = User(id=1, first_name="Testy")
+    mock_uow = MagicMock()
+    mock_uow.user_profiles.get = AsyncMock(
+        return_value=UserProfile(user_id=1, mood=UserMood.CURIOUS, archetype=UserArchetype.EXPLORER)
+    )
+    mock_gamification_service = AsyncMock()
+    mock_context_service = AsyncMock()
+    mock_personalization_service = AsyncMock()
+    mock_personalization_service.generate_adaptive_message.return_value = "Personalized Message"
+    load_shedder = LoadShedder(MetricsRegistry(), defer_threshold=0.1, shed_threshold=0.5)
+    load_shedder.observe(10.0)
+
+    await start_handler(
+        mock_message,
+        mock_user,
+        mock_uow,
+        mock_gamification_service,
+        mock_context_service,
+        mock_personalization_service,
+        load_shedder=load_shedder,
+    )
+
+    mock_context_service.detect_user_mood.assert_not_called()
+    mock_gamification_service.unlock_achievement.assert_not_called()
+    assert mock_message.reply.call_args.args[0] == "Personalized Message"
+    assert load_shedder.shed.value("context_analysis") == 1
+    assert load_shedder.shed.value("achievement_check") == 1
+
+
+@pytest.mark.asyncio
+async def test_text_message_handler_feeds_mood_detection():
+    """
+    Test that plain text messages are submitted for mood detection without a reply.
+    """
+    mock_message = AsyncMock()
+    mock_message.text = "estoy muy feliz"
+    context_pipeline = MagicMock()
+
+    await text_message_handler(mock_message, User(id=1, first_name="Testy"), AsyncMock(), context_pipeline)
+
+    context_pipeline.submit.assert_called_once_with(1, "estoy muy feliz")
+    mock_message.reply.assert_not_called()
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock
+from aiogram import Dispatcher
+from aiogram.filters import Command
+from aiogram.types import Update
+from src.bot.middleware.auth import AuthMiddleware
+from src.bot.middleware.metrics import HandlerMetricsMiddleware, MetricsMiddleware
+from src.bot.middleware.uow import UoWMiddleware
+from src.infrastructure.metrics import BotMetrics, MetricsRegistry
+from src.infrastructure.uow import UnitOfWork
+from src.services.gamification_service import GamificationService
+from src.services.user_service import UserService
+
+
+def message_update(update_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message={
+            "message_id": update_id,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "date": 1672531200,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_cover_every_stage_of_an_update(session_factory):
+    """
+    Test that updates, errors, in-flight updates, stages and handlers are all recorded.
+    """
+    metrics = BotMetrics(MetricsRegistry())
+    dp = Dispatcher()
+    dp.update.outer_middleware.register(MetricsMiddleware(metrics))
+    dp.update.outer_middleware.register(UoWMiddleware(lambda: UnitOfWork(session_factory), metrics=metrics))
+    dp.update.outer_middleware.register(
+        AuthMiddleware(UserService(AsyncMock()), GamificationService(AsyncMock()), metrics=metrics)
+    )
+    dp.message.middleware(HandlerMetricsMiddleware(metrics))
+
+    async def ping_handler(message):
+        assert metrics.in_flight.value() == 1
+
+    async def fail_handler(message):
+        raise RuntimeError("boom")
+
+    dp.message.register(ping_handler, Command("ping"))
+    dp.message.register(fail_handler, Command("fail"))
+
+    await dp.feed_update(AsyncMock(), message_update(1, "/ping"))
+    with pytest.raises(RuntimeError):
+        await dp.feed_update(AsyncMock(), message_update(2, "/fail"))
+
+    assert metrics.updates.value("message") == 2
+    assert metrics.errors.value("message") == 1
+    assert metrics.in_flight.value() == 0
+    assert metrics.update_seconds.count("message") == 2
+    for stage in ("session", "user", "streak", "handler"):
+        assert metrics.stage_seconds.count(stage) == 2
+    # The failed update rolled back instead of committing
+    assert metrics.stage_seconds.count("commit") == 1
+    assert metrics.handler_seconds.count("ping_handler") == 1
+    assert metrics.handler_seconds.count("fail_handler") == 1
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from aiogram import Dispatcher
+from aiogram.filters import Command
+from aiogram.types import Update
+from src.bot.middleware.recorder import UpdateRecorderMiddleware
+
+
+def balance_update() -> Update:
+    return Update(
+        update_id=1,
+        message={
+            "message_id": 1,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": "/balance",
+            "date": 1672531200,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_updates_are_recorded_before_handling():
+    """
+    Test that every update is recorded and then handled.
+    """
+    recorder = MagicMock()
+    dp = Dispatcher()
+    dp.update.outer_middleware.register(UpdateRecorderMiddleware(recorder))
+    handled = []
+
+    async def balance_handler(message):
+        handled.append(message.message_id)
+
+    dp.message.register(balance_handler, Command("balance"))
+
+    await dp.feed_update(AsyncMock(), balance_update())
+
+    recorder.record.assert_called_once()
+    assert recorder.record.call_args.args[0].update_id == 1
+    assert handled == [1]
+
+
+@pytest.mark.asyncio
+async def test_recording_failures_do_not_fail_updates():
+    """
+    Test that an update is still handled when recording it fails.
+    """
+    recorder = MagicMock()
+    recorder.record.side_effect = OSError("disk full")
+    dp = Dispatcher()
+    dp.update.outer_middleware.register(UpdateRecorderMiddleware(recorder))
+    handled = []
+
+    async def balance_handler(message):
+        handled.append(message.message_id)
+
+    dp.message.register(balance_handler, Command("balance"))
+
+    await dp.feed_update(AsyncMock(), balance_update())
+
+    assert handled == [1]
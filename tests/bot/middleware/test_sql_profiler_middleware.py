@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import AsyncMock
+from aiogram import Dispatcher
+from aiogram.filters import Command
+from aiogram.types import Update
+from src.bot.middleware.sql_profiler import SQLProfilerHandlerMiddleware, SQLProfilerMiddleware
+from src.domain.models import User
+from src.infrastructure.sql_profiler import SQLProfiler
+
+
+@pytest.mark.asyncio
+async def test_updates_are_profiled_per_handler(async_engine, session_factory):
+    """
+    Test that each update gets a profile labelled with its handler.
+    """
+    profiler = SQLProfiler()
+    profiler.attach(async_engine)
+    dp = Dispatcher()
+    dp.update.outer_middleware.register(SQLProfilerMiddleware(profiler))
+    dp.message.middleware(SQLProfilerHandlerMiddleware())
+
+    async def lookup_handler(message):
+        async with session_factory() as session:
+            await session.get(User, 1)
+            await session.get(User, 2)
+
+    dp.message.register(lookup_handler, Command("lookup"))
+    update = Update(
+        update_id=1,
+        message={
+            "message_id": 1,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": "/lookup",
+            "date": 1672531200,
+        },
+    )
+
+    await dp.feed_update(AsyncMock(), update)
+
+    summary = profiler.summary()
+    assert list(summary) == ["lookup_handler"]
+    assert summary["lookup_handler"]["updates"] == 1
+    assert summary["lookup_handler"]["statements_per_update"] == 2
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from aiogram import Dispatcher
+from aiogram.filters import Command, CommandStart
+from aiogram.types import Update
+from src.bot.handlers.commands import balance_handler, start_handler
+from src.bot.middleware.uow import UoWMiddleware, is_read_only_update
+
+
+def message_update(text: str) -> Update:
+    return Update(
+        update_id=1,
+        message={
+            "message_id": 1,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "date": 1672531200,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_uow_middleware_opens_read_only_uow_for_flagged_handlers():
+    """
+    Test that /balance gets a read-only Unit of Work and /start a regular one.
+    """
+    dp = Dispatcher()
+    dp.message.register(start_handler, CommandStart())
+    dp.message.register(balance_handler, Command("balance"))
+    bot = AsyncMock()
+
+    assert await is_read_only_update(dp, message_update("/balance"), {"bot": bot})
+    assert not await is_read_only_update(dp, message_update("/start"), {"bot": bot})
+
+    uow = AsyncMock(has_writes=True)
+    uow.__aenter__.return_value = uow
+    uow_provider = MagicMock(return_value=uow)
+    replica_router = MagicMock(enabled=True)
+    replica_router.replica_allowed.return_value = True
+    middleware = UoWMiddleware(uow_provider, replica_router, dp)
+    handler = AsyncMock()
+    telegram_user = MagicMock(id=1)
+
+    for text in ("/balance", "/start"):
+        await middleware(handler, message_update(text), {"bot": bot, "event_from_user": telegram_user})
+
+    assert [call.kwargs for call in uow_provider.call_args_list] == [
+        {"read_only": True},
+        {"read_only": False},
+    ]
+    replica_router.record_write.assert_called_with(1)
+
+
+@pytest.mark.asyncio
+async def test_uow_middleware_skips_replica_while_not_allowed():
+    """
+    Test that flagged handlers use the primary while the replica is not allowed.
+    """
+    dp = Dispatcher()
+    dp.message.register(balance_handler, Command("balance"))
+    uow = AsyncMock(has_writes=False)
+    uow.__aenter__.return_value = uow
+    uow_provider = MagicMock(return_value=uow)
+    replica_router = MagicMock(enabled=True)
+    replica_router.replica_allowed.return_value = False
+
+    await UoWMiddleware(uow_provider, replica_router, dp)(
+        AsyncMock(), message_update("/balance"), {"bot": AsyncMock(), "event_from_user": None}
+    )
+
+    uow_provider.assert_called_once_with(read_only=False)
+    replica_router.record_write.assert_not_called()
@@ -71,3 +71,17 @@ async def test_handle_event_calls_notification(mock_service_provider):
     mock_service_provider.notification_service.send_achievement_unlocked_notification.assert_called_once_with(
         user_id=123, achievement_name="Test", reward_points=50
     )
+
+
+@pytest.mark.asyncio
+async def test_non_urgent_events_wait_for_calm(mock_service_provider):
+    """Test that achievement notifications wait while the loop is behind and welcome messages do not."""
+    load_shedder = AsyncMock()
+
+    await _handle_event("user_registered", {"user_id": 1}, mock_service_provider, load_shedder=load_shedder)
+    load_shedder.calm.assert_not_called()
+
+    payload = {"user_id": 2, "achievement_name": "Test", "reward_points": 10}
+    await _handle_event("achievement_unlocked", payload, mock_service_provider, load_shedder=load_shedder)
+    load_shedder.calm.assert_awaited_once_with("achievement_unlocked")
+    mock_service_provider.notification_service.send_achievement_unlocked_notification.assert_awaited_once()
@@ -0,0 +1,70 @@
+import pytest
+from aiogram.types import InlineKeyboardMarkup
+from src.bot.ui.keyboards import DynamicKeyboardFactory
+from src.bot.ui.render_cache import RenderCache, DEFAULT_LOCALE, DEFAULT_VARIANT
+from src.domain.models import UserProfile, UserMood, UserArchetype
+from src.services.personalization_service import PersonalizationService
+
+
+@pytest.fixture
+def render_cache():
+    return RenderCache(DynamicKeyboardFactory(), PersonalizationService())
+
+
+def test_warm_renders_every_state(render_cache: RenderCache):
+    """
+    Test that warming the cache renders every (archetype, mood) combination.
+    """
+    count = render_cache.warm()
+
+    assert count == len(UserArchetype) * len(UserMood)
+    assert len(render_cache) == count
+
+
+def test_get_returns_shared_render(render_cache: RenderCache):
+    """
+    Test that repeated lookups reuse the same keyboard instance.
+    """
+    render_cache.warm()
+    profile = UserProfile(user_id=1, archetype=UserArchetype.ACHIEVER, mood=UserMood.SAD)
+
+    first = render_cache.get_for_profile(profile)
+    second = render_cache.get_for_profile(profile)
+
+    assert first.keyboard is second.keyboard
+    assert isinstance(first.keyboard, InlineKeyboardMarkup)
+    assert first.keyboard.inline_keyboard[0][0].callback_data == "challenges"
+    assert "animes" in first.text
+    assert "reto" in first.text
+
+
+def test_unknown_locale_falls_back_to_default(render_cache: RenderCache):
+    """
+    Test that unregistered locales use the default render without growing the cache.
+    """
+    render_cache.warm()
+    size = len(render_cache)
+
+    entry = render_cache.get(UserArchetype.EXPLORER, UserMood.HAPPY, locale="xx")
+
+    assert entry is render_cache.get(UserArchetype.EXPLORER, UserMood.HAPPY, DEFAULT_LOCALE)
+    assert len(render_cache) == size
+
+
+def test_register_locale(render_cache: RenderCache):
+    """
+    Test that a new locale can be registered with its own builders.
+    """
+    keyboard_factory = DynamicKeyboardFactory()
+    render_cache.register(
+        "en",
+        DEFAULT_VARIANT,
+        keyboard_factory.build_main_menu,
+        lambda mood, archetype: f"Hello {archetype.value}",
+    )
+    render_cache.warm()
+
+    entry = render_cache.get(UserArchetype.CREATOR, UserMood.NEUTRAL, locale="en")
+
+    assert entry.text == "Hello creator"
+    assert len(render_cache) == 2 * len(UserArchetype) * len(UserMood)
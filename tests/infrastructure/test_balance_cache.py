@@ -0,0 +1,66 @@
+import fakeredis
+import pytest
+from src.domain.models import User, Wallet
+from src.infrastructure.balance_cache import WalletBalanceCache
+from src.infrastructure.database import create_session_factory
+from src.infrastructure.uow import UnitOfWork
+from src.services.gamification_service import GamificationService
+
+
+@pytest.fixture
+async def balance_cache():
+    client = fakeredis.FakeAsyncRedis()
+    yield WalletBalanceCache(client)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_late_writes_and_fills_do_not_overwrite_newer_balances(balance_cache):
+    """
+    Test that a balance is only replaced by one from a later transaction and
+    that fills from the database never replace written balances.
+    """
+    assert await balance_cache.get(1) is None
+
+    await balance_cache.fill(1, 10)
+    assert await balance_cache.get(1) == 10
+    await balance_cache.set(1, 25, version=7)
+    await balance_cache.set(1, 15, version=6)
+    await balance_cache.fill(1, 10)
+
+    assert await balance_cache.get(1) == 25
+    assert balance_cache.stats == {"misses": 1, "hits": 2}
+
+
+@pytest.mark.asyncio
+async def test_balances_are_written_through_after_commit(async_engine, balance_cache):
+    """
+    Test that committed point changes update the cached balance, rolled back
+    ones do not, and that a miss is filled without creating a wallet.
+    """
+    session_factory = create_session_factory(async_engine)
+    service = GamificationService(event_publisher=None, balance_cache=balance_cache)
+    async with UnitOfWork(session_factory) as uow:
+        await uow.users.add(User(id=1, first_name="Ana"))
+        await uow.users.add(User(id=2, first_name="Bea"))
+
+    async with UnitOfWork(session_factory) as uow:
+        assert await service.get_balance(uow, 1) == 0
+        assert await uow.wallets.get_by_user_id(1) is None
+
+    async with UnitOfWork(session_factory) as uow:
+        await service.add_points(uow, 1, 50, "Test")
+        await service.spend_points(uow, 1, 20, "Test")
+    assert await balance_cache.get(1) == 30
+
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(session_factory) as uow:
+            await service.add_points(uow, 1, 5, "Test")
+            raise RuntimeError("handler failed")
+    assert await balance_cache.get(1) == 30
+
+    async with UnitOfWork(session_factory) as uow:
+        await uow.wallets.add(Wallet(user_id=2, balance=70))
+    async with UnitOfWork(session_factory) as uow:
+        assert await service.get_balance(uow, 2) == 70
+    assert await balance_cache.get(2) == 70
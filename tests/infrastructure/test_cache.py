@@ -0,0 +1,190 @@
+import asyncio
+from datetime import datetime
+import fakeredis
+import pytest
+from sqlalchemy import event
+from src.domain.models import User, UserArchetype, UserMood, UserProfile, Wallet
+from src.infrastructure.cache import Cache, LocalCache, NOT_FOUND
+from src.infrastructure.database import create_session_factory
+from src.infrastructure.repositories import UserProfileRepository, WalletRepository
+from src.infrastructure.uow import UnitOfWork
+from src.services.gamification_service import GamificationService
+
+WALLETS = WalletRepository.cache_policy
+
+
+@pytest.fixture
+async def redis_client():
+    client = fakeredis.FakeAsyncRedis()
+    yield client
+    await client.aclose()
+
+
+def test_local_cache_evicts_least_recently_used_and_expired_entries():
+    """
+    Test that the local tier evicts the least recently used entry and expired entries.
+    """
+    cache = LocalCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", None, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("b") is NOT_FOUND
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is NOT_FOUND
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load(redis_client):
+    """
+    Test that concurrent misses for one key load it once, and that missing
+    rows are cached too.
+    """
+    cache = Cache(redis_client)
+    loads = []
+
+    async def load_wallet():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return Wallet(id=1, user_id=10, balance=5)
+
+    async def load_missing():
+        loads.append(1)
+        return None
+
+    rows = await asyncio.gather(*(cache.get_or_load(WALLETS, "user_id", 10, load_wallet) for _ in range(20)))
+    assert rows == [{"id": 1, "user_id": 10, "balance": 5}] * 20
+    assert len(loads) == 1
+
+    assert await cache.get_or_load(WALLETS, "user_id", 11, load_missing) is None
+    assert await cache.get_or_load(WALLETS, "user_id", 11, load_missing) is None
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_and_versioned(redis_client):
+    """
+    Test that a second node reads rows from Redis, and that an invalidation
+    retires the Redis entry and the other node's local copy.
+    """
+    node_a, node_b = Cache(redis_client), Cache(redis_client)
+    profile = UserProfile(
+        user_id=1,
+        mood=UserMood.HAPPY,
+        archetype=UserArchetype.CREATOR,
+        engagement_score=1.5,
+        engagement_updated_at=datetime(2024, 5, 1, 12, 30),
+        engagement_rank=None,
+        engagement_rank_rate=None,
+        analyzed_at=None,
+        classified_at=None,
+    )
+    policy = UserProfileRepository.cache_policy
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return profile
+
+    row = await node_a.get_or_load(policy, "user_id", 1, load)
+    assert await node_b.get_or_load(policy, "user_id", 1, load) == row
+    assert row["mood"] is UserMood.HAPPY
+    assert row["engagement_updated_at"] == datetime(2024, 5, 1, 12, 30)
+    assert len(loads) == 1
+
+    listener = asyncio.create_task(node_b.listen())
+    await asyncio.sleep(0.05)
+    await node_a.invalidate([node_a.key(policy, "user_id", 1)])
+    await asyncio.sleep(0.1)
+    listener.cancel()
+
+    await node_b.get_or_load(policy, "user_id", 1, load)
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_repository_invalidates_on_commit(async_engine, redis_client):
+    """
+    Test that wallet reads are served from the cache and that committed
+    balance changes are visible to the next read.
+    """
+    cache = Cache(redis_client)
+    session_factory = create_session_factory(async_engine, cache=cache)
+    selects = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: selects.append(statement) if statement.startswith("SELECT") else None,
+    )
+    async with UnitOfWork(session_factory) as uow:
+        await uow.users.add(User(id=1, first_name="Ana"))
+        await uow.wallets.add(Wallet(user_id=1, balance=10))
+
+    for _ in range(3):
+        async with UnitOfWork(session_factory) as uow:
+            assert (await uow.wallets.get_by_user_id(1)).balance == 10
+    assert cache.stats["loads"] == 1
+
+    async with UnitOfWork(session_factory) as uow:
+        await uow.wallets.get_by_user_id(1)
+        await GamificationService(event_publisher=None).add_points(uow, 1, 5, "Test")
+
+    selects.clear()
+    async with UnitOfWork(session_factory) as uow:
+        wallet = await uow.wallets.get_by_user_id(1)
+        assert wallet.balance == 15
+        assert await uow.wallets.get(wallet.id) is wallet
+    assert len(selects) == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_writes_only_bypass_the_cache_for_their_own_rows(async_engine, redis_client):
+    """
+    Test that a session with unrelated or unflushed changes still reads
+    other rows from the cache, while the changed row is read from the database.
+    """
+    cache = Cache(redis_client)
+    session_factory = create_session_factory(async_engine, cache=cache)
+    async with UnitOfWork(session_factory) as uow:
+        for user_id in (1, 2):
+            await uow.users.add(User(id=user_id, first_name=f"User{user_id}"))
+            await uow.wallets.add(Wallet(user_id=user_id, balance=10))
+            await uow.user_profiles.add(UserProfile(user_id=user_id))
+    async with UnitOfWork(session_factory) as uow:
+        for user_id in (1, 2):
+            await uow.wallets.get_by_user_id(user_id)
+
+    async with UnitOfWork(session_factory) as uow:
+        (await uow.user_profiles.get(1)).mood = UserMood.HAPPY
+        hits = cache.stats["local_hits"]
+        assert (await uow.wallets.get_by_user_id(1)).balance == 10
+        assert cache.stats["local_hits"] == hits + 1
+
+        (await uow.wallets.get_by_user_id(2)).balance = 30
+        hits = cache.stats["local_hits"]
+        assert (await uow.wallets.get_by_user_id(2)).balance == 30
+        assert cache.stats["local_hits"] == hits
+        await uow.rollback()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_not_refilled_with_rows_read_before_an_invalidation(redis_client):
+    """
+    Test that a row loaded while its key is invalidated is not kept in the
+    local tier, so the next read loads the new row.
+    """
+    cache = Cache(redis_client)
+    key = cache.key(WALLETS, "user_id", 10)
+    balances = iter([5, 15])
+
+    async def load():
+        balance = next(balances)
+        # A unit of work commits a new balance while this load runs
+        await cache.invalidate([key])
+        return Wallet(id=1, user_id=10, balance=balance)
+
+    assert (await cache.get_or_load(WALLETS, "user_id", 10, load))["balance"] == 5
+    assert (await cache.get_or_load(WALLETS, "user_id", 10, load))["balance"] == 15
+    assert cache.stats["stale_fills"] == 2
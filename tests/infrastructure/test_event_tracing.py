@@ -0,0 +1,76 @@
+import json
+import logging
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+import fakeredis.aioredis
+import pytest
+from src.bot.events import _handle_event
+from src.domain.events import AchievementUnlocked
+from src.infrastructure.event_bus import EventPublisher
+from src.infrastructure.event_tracing import EventTracer
+from src.infrastructure.metrics import MetricsRegistry
+
+
+@pytest.mark.asyncio
+async def test_publisher_stamps_publish_time():
+    """
+    Test that published events carry the time they were published.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis()
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe("user_events")
+    await pubsub.get_message(timeout=1.0)
+
+    before = time.time()
+    await EventPublisher(redis_client).publish("user_events", AchievementUnlocked(payload={"user_id": 1}))
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+    data = json.loads(message["data"])
+
+    assert data["event_name"] == "achievement_unlocked"
+    assert data["payload"] == {"user_id": 1}
+    assert before <= data["published_at"] <= time.time()
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_handled_event_is_traced():
+    """
+    Test that a handled event records its publish lag, queue wait, handler time and outcome.
+    """
+    tracer = EventTracer(MetricsRegistry())
+    provider = MagicMock()
+    provider.onboarding_service.send_welcome_message = AsyncMock()
+
+    trace = tracer.received("user_registered", "abc", time.time() - 0.5)
+    await _handle_event("user_registered", {"user_id": 1}, provider, trace)
+
+    assert trace.publish_lag >= 0.5
+    assert trace.queue_wait >= 0 and trace.handler_seconds >= 0
+    assert tracer.publish_lag.count("user_registered") == 1
+    assert tracer.handler_seconds.count("user_registered") == 1
+    assert tracer.total_seconds.count("user_registered") == 1
+    assert tracer.handled.value("user_registered", "ok") == 1
+    assert tracer.retries.value("user_registered") == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_and_failures_are_counted(caplog):
+    """
+    Test that retries and failed events are counted and slow events are logged with their breakdown.
+    """
+    tracer = EventTracer(MetricsRegistry(), slow_threshold=0.0)
+    provider = MagicMock()
+    provider.onboarding_service.send_welcome_message = AsyncMock(side_effect=RuntimeError("telegram down"))
+
+    trace = tracer.received("user_registered", "abc")
+    with patch("src.bot.events.RETRY_DELAY", 0), caplog.at_level(logging.WARNING, "src.infrastructure.event_tracing"):
+        await _handle_event("user_registered", {"user_id": 1}, provider, trace)
+
+    assert tracer.handled.value("user_registered", "failed") == 1
+    assert tracer.retries.value("user_registered") == 2
+    # Without a publish time there is no lag or end-to-end figure
+    assert tracer.publish_lag.count("user_registered") == 0
+    assert tracer.total_seconds.count("user_registered") == 0
+    assert "Slow event user_registered abc (failed)" in caplog.text
+    assert "publish lag unknown" in caplog.text
+    assert "2 retries" in caplog.text
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+import fakeredis
+import pytest
+from src.domain.models import User, UserProfile, Wallet
+from src.infrastructure.database import create_session_factory
+from src.infrastructure.leaderboard import Leaderboard, LeaderboardEntry, LeaderboardMetric, LeaderboardWindow
+from src.infrastructure.uow import UnitOfWork
+from src.services.gamification_service import GamificationService
+from src.services.leaderboard_service import LeaderboardService
+
+
+@pytest.fixture
+async def leaderboard():
+    client = fakeredis.FakeAsyncRedis()
+    yield Leaderboard(client)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_top_rank_and_around(leaderboard):
+    """
+    Test that top-N, rank and around-me queries order users by score.
+    """
+    await leaderboard.record(LeaderboardMetric.BALANCE, {user_id: user_id * 10 for user_id in range(1, 11)})
+
+    assert await leaderboard.top(LeaderboardMetric.BALANCE, limit=2) == [
+        LeaderboardEntry(user_id=10, rank=1, score=100.0),
+        LeaderboardEntry(user_id=9, rank=2, score=90.0),
+    ]
+    assert await leaderboard.rank(LeaderboardMetric.BALANCE, 3) == LeaderboardEntry(3, 8, 30.0)
+    assert await leaderboard.rank(LeaderboardMetric.BALANCE, 99) is None
+    assert [e.user_id for e in await leaderboard.around(LeaderboardMetric.BALANCE, 2, radius=2)] == [4, 3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_window_boards_rotate_per_period(leaderboard):
+    """
+    Test that window boards sum or keep the best of a period's updates and
+    that a new period starts an empty board.
+    """
+    monday = datetime(2024, 5, 6, 12)
+    await leaderboard.record(LeaderboardMetric.BALANCE, {1: 50}, {1: 50}, now=monday)
+    await leaderboard.record(LeaderboardMetric.BALANCE, {1: 30}, {1: -20}, now=monday)
+    await leaderboard.record(LeaderboardMetric.BALANCE, {1: 35}, {1: 5}, now=monday + timedelta(days=1))
+    await leaderboard.record(LeaderboardMetric.STREAK, {1: 4}, now=monday)
+    await leaderboard.record(LeaderboardMetric.STREAK, {1: 1}, now=monday)
+
+    daily, weekly = LeaderboardWindow.DAILY, LeaderboardWindow.WEEKLY
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1, daily, monday)).score == 50
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1, daily, monday + timedelta(days=1))).score == 5
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1, weekly, monday)).score == 55
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1)).score == 35
+    assert (await leaderboard.rank(LeaderboardMetric.STREAK, 1, weekly, monday)).score == 4
+    assert await leaderboard.rank(LeaderboardMetric.BALANCE, 1, weekly, monday + timedelta(weeks=1)) is None
+
+
+@pytest.mark.asyncio
+async def test_late_updates_do_not_overwrite_newer_scores(leaderboard):
+    """
+    Test that an all-time update arriving after a newer one is ignored:
+    versioned metrics keep the highest version, monotonic ones the highest score.
+    """
+    await leaderboard.record(LeaderboardMetric.BALANCE, {1: 30, 2: 5}, versions={1: 8, 2: 3})
+    await leaderboard.record(LeaderboardMetric.BALANCE, {1: 50, 2: 9}, versions={1: 7, 2: 4})
+    await leaderboard.record(LeaderboardMetric.ENGAGEMENT, {1: 12.5})
+    await leaderboard.record(LeaderboardMetric.ENGAGEMENT, {1: 11.0})
+
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1)).score == 30
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 2)).score == 9
+    assert (await leaderboard.rank(LeaderboardMetric.ENGAGEMENT, 1)).score == 12.5
+
+
+@pytest.mark.asyncio
+async def test_rebuild_streams_from_sql_and_services_keep_boards_current(async_engine, leaderboard):
+    """
+    Test that a rebuild loads the all-time boards from the database and that
+    committed point changes update them.
+    """
+    session_factory = create_session_factory(async_engine)
+    async with UnitOfWork(session_factory) as uow:
+        for user_id in range(1, 6):
+            await uow.users.add(User(id=user_id, first_name=f"User{user_id}", current_streak=user_id % 3))
+            await uow.wallets.add(Wallet(user_id=user_id, balance=user_id * 10))
+            await uow.user_profiles.add(UserProfile(user_id=user_id, engagement_rank=float(user_id)))
+    await leaderboard.record(LeaderboardMetric.BALANCE, {99: 1000})
+
+    service = LeaderboardService(leaderboard, lambda **kw: UnitOfWork(session_factory, **kw), chunk_size=2)
+    counts = await service.rebuild()
+
+    assert counts == {LeaderboardMetric.BALANCE: 5, LeaderboardMetric.STREAK: 4, LeaderboardMetric.ENGAGEMENT: 5}
+    assert (await leaderboard.top(LeaderboardMetric.BALANCE, limit=1))[0].user_id == 5
+
+    gamification = GamificationService(event_publisher=None, leaderboard=leaderboard)
+    async with UnitOfWork(session_factory) as uow:
+        await gamification.add_points(uow, 1, 100, "Test")
+    assert await leaderboard.top(LeaderboardMetric.BALANCE, limit=1) == [LeaderboardEntry(1, 1, 110.0)]
+    assert (await leaderboard.rank(LeaderboardMetric.BALANCE, 1, LeaderboardWindow.DAILY)).score == 100
@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+from src.infrastructure.load_shedding import LoadLevel, LoadShedder
+from src.infrastructure.metrics import MetricsRegistry
+
+
+def test_levels_follow_smoothed_lag():
+    """
+    Test that the load level follows the smoothed lag and is exported as metrics.
+    """
+    shedder = LoadShedder(MetricsRegistry(), defer_threshold=0.1, shed_threshold=0.5, smoothing=0.5)
+
+    shedder.observe(0.15)
+    assert shedder.level == LoadLevel.NORMAL  # one slow sample is smoothed away
+    shedder.observe(0.15)
+    assert shedder.level == LoadLevel.DEFER
+    assert not shedder.skip("context_analysis")
+    assert shedder.skip("achievement_check", at=LoadLevel.DEFER)
+
+    for _ in range(5):
+        shedder.observe(2.0)
+    assert shedder.level == LoadLevel.SHED
+    assert shedder.skip("context_analysis")
+
+    for _ in range(20):
+        shedder.observe(0.0)
+    assert shedder.level == LoadLevel.NORMAL
+    assert shedder.shed.value("context_analysis") == 1
+    assert shedder.shed.value("achievement_check") == 1
+    assert shedder.level_gauge.value() == 0
+    assert shedder.lag_seconds.value() < 0.1
+
+
+@pytest.mark.asyncio
+async def test_monitor_detects_a_blocked_loop_and_calm_waits():
+    """
+    Test that blocking the loop raises the measured lag and that deferred work waits until it recovers.
+    """
+    shedder = LoadShedder(MetricsRegistry(), interval=0.01, defer_threshold=0.05, shed_threshold=1.0, smoothing=1.0)
+    monitor = asyncio.create_task(shedder.run())
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # a callback hogging the loop
+        await asyncio.sleep(0)
+        await asyncio.sleep(0.005)
+        assert shedder.level == LoadLevel.DEFER
+
+        await asyncio.wait_for(shedder.calm("achievement_unlocked"), timeout=1)
+        assert shedder.level == LoadLevel.NORMAL
+        assert shedder.deferred.value("achievement_unlocked") == 1
+    finally:
+        monitor.cancel()
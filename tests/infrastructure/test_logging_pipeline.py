@@ -0,0 +1,108 @@
+import io
+import json
+import logging
+import queue
+import sys
+import threading
+from unittest.mock import patch
+from src.infrastructure.logging_pipeline import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    parse_rates,
+    setup_logging,
+)
+
+
+def make_record(name: str, level: int = logging.INFO, msg: str = "event %s", args=(1,)) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_suppresses_and_reports_per_logger():
+    """
+    Test that records over a logger's rate are suppressed, counted on the next
+    record let through, and that warnings and other loggers are not limited.
+    """
+    rate_filter = RateLimitFilter(rate=2, rates={"quiet": 0})
+    with patch("src.infrastructure.logging_pipeline.time.monotonic", return_value=100.0) as clock:
+        assert [rate_filter.filter(make_record("busy")) for _ in range(5)] == [True, True, False, False, False]
+        assert all(rate_filter.filter(make_record("quiet")) for _ in range(5))
+
+        warning = make_record("busy", logging.WARNING)
+        assert rate_filter.filter(warning)
+        assert warning.suppressed == 3
+
+        clock.return_value = 100.5
+        record = make_record("busy")
+        assert rate_filter.filter(record)
+        assert not hasattr(record, "suppressed")
+        assert not rate_filter.filter(make_record("busy"))
+
+
+def test_queue_handler_merges_messages_and_drops_when_full():
+    """
+    Test that the queue handler merges the message on the calling thread and
+    drops records instead of blocking when the queue is full.
+    """
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    record = make_record("busy", args=([1, 2],))
+    record.suppressed = 4
+    handler.handle(record)
+    handler.handle(make_record("busy"))
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "event [1, 2] (4 earlier records from this logger suppressed)"
+    assert handler.dropped == 1
+
+
+def test_json_formatter_includes_extra_fields_and_exceptions():
+    """
+    Test that JSON lines carry the message, extra fields and the exception.
+    """
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("svc", logging.ERROR, __file__, 1, "failed for %s", ("user",), sys.exc_info())
+    record.user_id = 42
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "ERROR" and entry["logger"] == "svc"
+    assert entry["message"] == "failed for user"
+    assert entry["user_id"] == 42
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_setup_logging_writes_from_a_background_thread():
+    """
+    Test that records are written by the listener thread, not the logging thread.
+    """
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    writers = []
+
+    class RecordingStream(io.StringIO):
+        def write(self, text):
+            writers.append(threading.current_thread())
+            return stream.write(text)
+
+    listener, handler = setup_logging("INFO", json_output=True, rates=parse_rates("noisy=1, bad"), stream=RecordingStream())
+    try:
+        logging.getLogger("app").info("hello %s", "world", extra={"update_id": 7})
+        logging.getLogger("app").debug("hidden")
+        for _ in range(3):
+            logging.getLogger("noisy").info("spam")
+    finally:
+        listener.stop()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        for existing in saved_handlers:
+            root.addHandler(existing)
+        root.setLevel(saved_level)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(line["logger"], line["message"]) for line in lines] == [("app", "hello world"), ("noisy", "spam")]
+    assert lines[0]["update_id"] == 7
+    assert writers and threading.main_thread() not in writers
+    assert handler.dropped == 0
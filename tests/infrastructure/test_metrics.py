@@ -0,0 +1,70 @@
+import asyncio
+import socket
+import aiohttp
+import pytest
+from src.infrastructure.metrics import MetricsRegistry, MetricsServer
+
+
+def test_registry_renders_prometheus_text():
+    """
+    Test that counters, gauges and histograms render in the Prometheus text format.
+    """
+    registry = MetricsRegistry(namespace="test")
+    updates = registry.counter("updates_total", "Updates.", ["type"])
+    in_flight = registry.gauge("in_flight", "In flight.")
+    latency = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+
+    updates.inc("message")
+    updates.inc('call"back')
+    in_flight.inc()
+    latency.observe(0.05, "commit")
+    latency.observe(0.1, "commit")
+    latency.observe(3, "commit")
+
+    assert registry.counter("updates_total", "Updates.", ["type"]) is updates
+    with pytest.raises(ValueError):
+        registry.gauge("updates_total", "Updates.")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_updates_total Updates.",
+        "# TYPE test_updates_total counter",
+        'test_updates_total{type="message"} 1',
+        'test_updates_total{type="call\\"back"} 1',
+        "# HELP test_in_flight In flight.",
+        "# TYPE test_in_flight gauge",
+        "test_in_flight 1",
+        "# HELP test_latency_seconds Latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{stage="commit",le="0.1"} 2',
+        'test_latency_seconds_bucket{stage="commit",le="1"} 2',
+        'test_latency_seconds_bucket{stage="commit",le="+Inf"} 3',
+        'test_latency_seconds_sum{stage="commit"} 3.15',
+        'test_latency_seconds_count{stage="commit"} 3',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_server_exposes_the_registry():
+    """
+    Test that the metrics server serves the registry on /metrics.
+    """
+    registry = MetricsRegistry()
+    registry.counter("updates_total", "Updates.").inc()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = asyncio.create_task(MetricsServer(registry, port=port).run())
+    try:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(50):
+                try:
+                    async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                        body = await response.text()
+                        break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.02)
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "diana_updates_total 1" in body
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
@@ -0,0 +1,103 @@
+import math
+import pytest
+from src.domain.models import Base, User
+from src.infrastructure.database import (
+    create_db_engine,
+    create_replica_engine,
+    create_session_factory,
+)
+from src.infrastructure.replica import ReplicaRouter
+from src.infrastructure.uow import UnitOfWork
+
+
+@pytest.fixture
+async def primary_and_replica(tmp_path):
+    """
+    Two separate databases, so the test can tell where a read went.
+    """
+    primary = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "Primary"), (replica, "Replica")):
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with UnitOfWork(create_session_factory(engine)) as uow:
+            await uow.users.add(User(id=1, first_name=name))
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_only_uow_reads_from_replica(primary_and_replica):
+    """
+    Test that only read-only units of work read from the replica.
+    """
+    primary, replica = primary_and_replica
+    session_factory = create_session_factory(primary, replica_engine=replica)
+
+    async with UnitOfWork(session_factory, read_only=True) as uow:
+        assert (await uow.users.get(1)).first_name == "Replica"
+        assert not uow.has_writes
+
+    async with UnitOfWork(session_factory) as uow:
+        assert (await uow.users.get(1)).first_name == "Primary"
+
+
+@pytest.mark.asyncio
+async def test_read_only_uow_writes_to_primary_and_reads_its_writes(primary_and_replica):
+    """
+    Test that writes of a read-only unit of work fall back to the primary and
+    that its later reads follow them there.
+    """
+    primary, replica = primary_and_replica
+    session_factory = create_session_factory(primary, replica_engine=replica)
+
+    async with UnitOfWork(session_factory, read_only=True) as uow:
+        await uow.users.add(User(id=2, first_name="New"))
+        await uow.session.flush()
+        assert uow.has_writes
+        assert (await uow.users.get(1)).first_name == "Primary"
+
+    async with UnitOfWork(session_factory) as uow:
+        assert (await uow.users.get(2)).first_name == "New"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_read_only_replica(tmp_path):
+    """
+    Test that a SQLite file database can be read through read-only connections.
+    """
+    primary = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'diana.db'}")
+    async with primary.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    replica = create_replica_engine(primary, sqlite_read_only=True)
+    assert create_replica_engine(primary) is None
+
+    router = ReplicaRouter(replica)
+    assert await router.check_lag() == 0.0
+    async with replica.connect() as connection:
+        with pytest.raises(Exception, match="readonly"):
+            await connection.exec_driver_sql("INSERT INTO users (id, first_name) VALUES (1, 'x')")
+    await replica.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_router_honours_lag_and_recent_writes(primary_and_replica):
+    """
+    Test that the replica is skipped while it lags or right after a user's write.
+    """
+    _, replica = primary_and_replica
+    router = ReplicaRouter(replica, max_lag=60)
+
+    assert not router.replica_allowed(1)
+    await router.check_lag()
+    assert router.replica_allowed(1)
+
+    router.record_write(1)
+    assert not router.replica_allowed(1)
+    assert router.replica_allowed(2)
+
+    router.lag = math.inf
+    assert not router.replica_allowed(2)
+    assert not ReplicaRouter(None).replica_allowed(2)
@@ -1,5 +1,6 @@
 import pytest
-from src.domain.models import User, UserRole
+from sqlalchemy import event
+from src.domain.models import User, UserProfile, UserRole, Wallet
 from src.infrastructure.repositories import UserRepository
 
 
@@ -52,3 +53,31 @@ async def test_user_repository_list(db_session):
 
     assert len(all_users) == 2
     assert {user.id for user in all_users} == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_user_repository_get_with_context_uses_one_query(async_engine, session_factory):
+    """
+    Test that the user, profile and wallet are loaded with a single SELECT.
+    """
+    async with session_factory() as session:
+        session.add_all([
+            User(id=1, first_name="Diana"),
+            UserProfile(user_id=1),
+            Wallet(user_id=1, balance=42),
+        ])
+        await session.commit()
+
+    statements = []
+    event.listen(
+        async_engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    async with session_factory() as session:
+        user = await UserRepository(session).get_with_context(1)
+        assert user.profile.user_id == 1
+        assert user.wallet.balance == 42
+        assert await UserRepository(session).get_with_context(2) is None
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 2
@@ -0,0 +1,56 @@
+import asyncio
+import gc
+import logging
+import sys
+import threading
+import pytest
+from src.infrastructure.runtime import RuntimeOptions, parse_gc_thresholds, run
+
+
+def test_parse_gc_thresholds():
+    """
+    Test that GC thresholds parse from settings and empty keeps the defaults.
+    """
+    assert parse_gc_thresholds("") is None
+    assert parse_gc_thresholds("50000, 20,100") == (50000, 20, 100)
+    with pytest.raises(ValueError):
+        parse_gc_thresholds("1,2,3,4")
+
+
+def test_run_applies_executor_and_gc_settings():
+    """
+    Test that run executes the coroutine on a loop with the configured executor and GC thresholds.
+    """
+    saved = gc.get_threshold()
+
+    async def main():
+        return await asyncio.to_thread(lambda: threading.current_thread().name)
+
+    try:
+        options = RuntimeOptions(executor_workers=2, gc_thresholds=(50000, 20, 100))
+        assert run(main(), options).startswith("asyncio")
+        assert gc.get_threshold() == (50000, 20, 100)
+        assert options.describe() == "executor=2+gc=50000,20,100"
+    finally:
+        gc.set_threshold(*saved)
+    assert RuntimeOptions().describe() == "default"
+
+
+def test_unavailable_options_fall_back(caplog, monkeypatch):
+    """
+    Test that a missing uvloop, or eager tasks before Python 3.12, fall back to the defaults with a warning.
+    """
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+    options = RuntimeOptions(uvloop=True, eager_tasks=True)
+
+    with caplog.at_level(logging.WARNING, logger="src.infrastructure.runtime"):
+        loop = options.new_event_loop()
+    try:
+        assert isinstance(loop, asyncio.BaseEventLoop)
+        assert "uvloop is not installed" in caplog.text
+        if hasattr(asyncio, "eager_task_factory"):
+            assert loop.get_task_factory() is asyncio.eager_task_factory
+        else:
+            assert "Eager tasks need Python 3.12" in caplog.text
+    finally:
+        loop.close()
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import tracemalloc
+import pytest
+from src.infrastructure.runtime_profiler import HeapTracker, SamplingProfiler
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    """
+    Test that the sampling profiler samples the loop thread and writes collapsed stacks.
+    """
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+
+    async def busy_loop():
+        await asyncio.sleep(0.01)
+        _busy(0.15)
+
+    busy = asyncio.create_task(busy_loop())
+    path, samples = await profiler.profile(0.3)
+    await busy
+
+    assert sum(samples.values()) > 0
+    assert any("_busy (test_runtime_profiler.py:" in stack for stack in samples)
+    lines = path.read_text().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert samples[stack] == int(count)
+    frame, share = SamplingProfiler.top_frames(samples, limit=1)[0]
+    assert 0 < share <= 1
+
+
+@pytest.mark.asyncio
+async def test_sampling_profiler_runs_one_profile_at_a_time(tmp_path):
+    """
+    Test that a second profile is refused while one is running.
+    """
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    first = asyncio.create_task(profiler.profile(0.05))
+    await asyncio.sleep(0)
+
+    assert profiler.running
+    with pytest.raises(RuntimeError):
+        await profiler.profile(0.05)
+    await first
+    assert not profiler.running
+
+
+def test_heap_tracker_reports_growth_between_snapshots(tmp_path):
+    """
+    Test that heap snapshots report the allocations made since the previous snapshot.
+    """
+    tracker = HeapTracker(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        tracker.snapshot()
+
+    tracker.start()
+    try:
+        leak = [bytearray(1024) for _ in range(1000)]
+        path, diff = tracker.snapshot()
+
+        assert path.exists()
+        top = diff[0]
+        assert top.traceback[0].filename == __file__
+        assert top.size_diff >= 1000 * 1024
+        assert len(leak) == 1000
+    finally:
+        tracker.stop()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import pytest
+from src.domain.models import User
+from src.infrastructure.sql_profiler import SQLProfiler
+from src.infrastructure.uow import UnitOfWork
+
+
+@pytest.mark.asyncio
+async def test_profiles_are_per_update_and_flag_n_plus_one(async_engine, session_factory, caplog):
+    """
+    Test that concurrent profiles only see their own statements, and that
+    budget overruns and repeated statements are logged and summarized.
+    """
+    profiler = SQLProfiler(statement_budget=3, repeat_threshold=3)
+    profiler.attach(async_engine)
+    async with UnitOfWork(session_factory) as uow:
+        for user_id in range(1, 5):
+            await uow.users.add(User(id=user_id, first_name=f"User{user_id}"))
+
+    async def one_by_one(user_ids):
+        with profiler.profile("one_by_one") as profile:
+            async with session_factory() as session:
+                for user_id in user_ids:
+                    await session.get(User, user_id)
+        return profile
+
+    async def in_one_query():
+        with profiler.profile("in_one_query") as profile:
+            async with UnitOfWork(session_factory) as uow:
+                await uow.users.get_many([1, 2, 3, 4])
+        return profile
+
+    with caplog.at_level(logging.WARNING, logger="src.infrastructure.sql_profiler"):
+        slow, fast = await asyncio.gather(one_by_one([1, 2, 3, 4]), in_one_query())
+        profiler.finish(slow)
+        profiler.finish(fast)
+
+    assert slow.statements == 4
+    assert fast.statements == 1
+    assert len(slow.repeated(3)) == 1 and slow.repeated(3)[0][1] == 4
+    assert fast.repeated(3) == []
+    assert len(slow.slowest()) == 3
+    assert "one_by_one sent 4 statements (budget 3)" in caplog.text
+    assert "one_by_one sent the same statement 4 times" in caplog.text
+    assert "in_one_query" not in caplog.text
+
+    summary = profiler.summary()
+    assert summary["one_by_one"]["over_budget"] == 1
+    assert summary["in_one_query"]["statements_per_update"] == 1
+
+
+@pytest.mark.asyncio
+async def test_statements_outside_a_profile_are_ignored(async_engine, session_factory):
+    """
+    Test that background work without a profile costs nothing and is not counted.
+    """
+    profiler = SQLProfiler()
+    profiler.attach(async_engine)
+    async with session_factory() as session:
+        await session.get(User, 1)
+    with profiler.profile("empty") as profile:
+        pass
+    assert profile.statements == 0
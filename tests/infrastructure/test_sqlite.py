@@ -0,0 +1,15 @@
+import pytest
+from src.infrastructure.database import create_db_engine
+
+
+@pytest.mark.asyncio
+async def test_tuned_sqlite_applies_pragmas(tmp_path):
+    """
+    Test that tuned SQLite connections run in WAL mode with synchronous=NORMAL.
+    """
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}", sqlite_tuning=True)
+    async with engine.connect() as connection:
+        assert (await connection.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+        assert (await connection.exec_driver_sql("PRAGMA synchronous")).scalar() == 1
+        assert (await connection.exec_driver_sql("PRAGMA busy_timeout")).scalar() == 5000
+    await engine.dispose()
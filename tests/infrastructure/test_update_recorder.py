@@ -0,0 +1,79 @@
+import pytest
+from aiogram.types import Update
+from src.infrastructure.update_recorder import UpdateRecorder, read_recording
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message={
+            "message_id": update_id,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {
+                "id": user_id, "is_bot": False, "first_name": "Ana", "last_name": "Pérez",
+                "username": "ana", "language_code": "es",
+            },
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}] if text.startswith("/start") else None,
+            "contact": {"phone_number": "+34600000000", "first_name": "Ana"},
+            "date": 1672531200,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_recorded_updates_are_anonymized(tmp_path):
+    """
+    Test that recorded updates keep their shape and commands but not ids, names or words.
+    """
+    path = tmp_path / "updates.jsonl"
+    recorder = UpdateRecorder(str(path), salt="secret")
+    assert recorder.record(make_update(1, 42, "/start ref-ana"))
+    assert recorder.record(make_update(2, 42, "hola, me siento feliz"))
+    assert await recorder.flush() == 2
+
+    (first_at, first), (second_at, second) = list(read_recording(str(path)))
+    message = first["message"]
+    assert message["from"]["id"] != 42
+    assert message["from"]["id"] == message["chat"]["id"] == second["message"]["from"]["id"]
+    assert message["from"]["first_name"] == f"user{message['from']['id']}"
+    assert message["from"]["language_code"] == "es"
+    assert "last_name" not in message["from"] and "contact" not in message
+    assert message["text"] == "/start xxxxxxx"
+    assert message["entities"] == [{"type": "bot_command", "offset": 0, "length": 6}]
+    assert second["message"]["text"] == "xxxxx xx xxxxxx xxxxx"
+    assert first_at <= second_at
+    # The recording replays as real updates
+    assert Update.model_validate(first).message.text == "/start xxxxxxx"
+
+    # The same salt gives the same pseudonyms
+    other = UpdateRecorder(str(tmp_path / "other.jsonl"), salt="secret")
+    other.record(make_update(1, 42, "/start"))
+    await other.flush()
+    assert next(read_recording(str(tmp_path / "other.jsonl")))[1]["message"]["from"]["id"] == message["from"]["id"]
+
+
+@pytest.mark.asyncio
+async def test_recorder_samples_users_and_bounds_its_buffer(tmp_path):
+    """
+    Test that sampling keeps all or none of a user's updates and that a full buffer drops updates.
+    """
+    recorder = UpdateRecorder(str(tmp_path / "updates.jsonl"), salt="secret", sample_rate=0.5)
+    recorded = {user_id: {recorder.record(make_update(n, user_id, "/balance")) for n in range(3)} for user_id in range(1, 41)}
+    assert all(len(outcomes) == 1 for outcomes in recorded.values())
+    assert 0 < sum(outcomes == {True} for outcomes in recorded.values()) < 40
+
+    bounded = UpdateRecorder(str(tmp_path / "bounded.jsonl"), max_buffer=2)
+    assert [bounded.record(make_update(n, 1, "/balance")) for n in range(3)] == [True, True, False]
+    assert bounded.dropped == 1
+    assert bounded.record(Update(update_id=9)) is False
+
+
+def test_truncated_lines_are_skipped(tmp_path):
+    """
+    Test that a line cut short while writing does not stop reading the recording.
+    """
+    path = tmp_path / "updates.jsonl"
+    path.write_text('{"t":1.0,"u":{"update_id":1}}\n{"t":2.0,"u":{"upd\n')
+
+    assert list(read_recording(str(path))) == [(1.0, {"update_id": 1})]
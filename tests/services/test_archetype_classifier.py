@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from src.domain.models import (
+    Achievement,
+    Transaction,
+    User,
+    UserAchievement,
+    UserArchetype,
+    UserProfile,
+)
+from src.infrastructure.uow import UnitOfWork
+from src.services.archetype_classifier import (
+    FEATURES,
+    ArchetypeClassificationJob,
+    ArchetypeClassifier,
+)
+
+
+@pytest.fixture
+def uow_provider(session_factory):
+    return lambda: UnitOfWork(session_factory)
+
+
+def feature_row(**values) -> list:
+    return [values.get(name, 0) for name in FEATURES]
+
+
+def test_classify_batch():
+    """
+    Test that a feature matrix is classified row by row.
+    """
+    classifier = ArchetypeClassifier()
+    features = np.array(
+        [
+            feature_row(),
+            feature_row(achievements=8, max_streak=30, points_earned=500),
+            feature_row(points_spent=900, balance_commands=20),
+            feature_row(other_commands=40),
+        ]
+    )
+
+    assert classifier.classify(features) == [
+        UserArchetype.EXPLORER,
+        UserArchetype.ACHIEVER,
+        UserArchetype.CREATOR,
+        UserArchetype.EXPLORER,
+    ]
+    assert classifier.classify(np.zeros((0, len(FEATURES)))) == []
+
+
+@pytest.mark.asyncio
+async def test_run_once_classifies_and_stores_archetypes(uow_provider):
+    """
+    Test that the job writes archetypes for unclassified users.
+    """
+    async with uow_provider() as uow:
+        await uow.users.add(User(id=1, first_name="Newbie"))
+        await uow.users.add(User(id=2, first_name="Hunter", current_streak=20, max_streak=40))
+        await uow.user_profiles.add(UserProfile(user_id=1))
+        await uow.user_profiles.add(UserProfile(user_id=2, archetype=UserArchetype.CREATOR))
+        achievement = await uow.achievements.add(Achievement(name="A", description="."))
+        for _ in range(5):
+            await uow.user_achievements.add(UserAchievement(user_id=2, achievement_id=achievement.id))
+        await uow.transactions.add(Transaction(user_id=2, amount=300))
+        await uow.command_stats.increment_many({(1, "start"): 1})
+
+    job = ArchetypeClassificationJob(uow_provider, chunk_size=1)
+
+    assert await job.run_once() == 2
+
+    async with uow_provider() as uow:
+        profiles = {p.user_id: p for p in await uow.user_profiles.get_many([1, 2])}
+        assert profiles[1].archetype == UserArchetype.EXPLORER
+        assert profiles[2].archetype == UserArchetype.ACHIEVER
+        assert profiles[2].classified_at is not None
+
+
+@pytest.mark.asyncio
+async def test_run_once_only_reclassifies_changed_users(uow_provider):
+    """
+    Test that users without feature changes since their last run are skipped.
+    """
+    classified_at = datetime.utcnow() + timedelta(seconds=5)
+    async with uow_provider() as uow:
+        await uow.users.add(User(id=1, first_name="Same"))
+        await uow.users.add(User(id=2, first_name="Changed"))
+        await uow.user_profiles.add(UserProfile(user_id=1, classified_at=classified_at))
+        await uow.user_profiles.add(UserProfile(user_id=2, classified_at=classified_at))
+        await uow.transactions.add(
+            Transaction(user_id=2, amount=10, created_at=classified_at + timedelta(seconds=1))
+        )
+
+    async with uow_provider() as uow:
+        assert await uow.user_profiles.find_unclassified(limit=10) == [2]
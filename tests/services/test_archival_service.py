@@ -0,0 +1,145 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import func, select
+from src.domain.models import Transaction, User, Wallet
+from src.infrastructure.archive import ArchiveColumns, TransactionArchive
+from src.infrastructure.database import create_session_factory
+from src.infrastructure.partitioning import TransactionPartitions
+from src.infrastructure.uow import UnitOfWork
+from src.services.archival_service import TransactionArchivalJob
+from src.services.ledger_service import LedgerService
+
+# (user_id, amount, created_at): January and February go cold, May stays hot
+TRANSACTIONS = [
+    (1, 10, datetime(2024, 1, 3)),
+    (2, 4, datetime(2024, 1, 9)),
+    (1, -3, datetime(2024, 1, 20)),
+    (1, 6, datetime(2024, 2, 14)),
+    (1, 2, datetime(2024, 5, 2)),
+    (2, 1, datetime(2024, 5, 3)),
+]
+NOW = datetime(2024, 5, 15)
+
+
+@pytest.fixture
+async def uow_provider(async_engine):
+    session_factory = create_session_factory(async_engine)
+    provider = lambda: UnitOfWork(session_factory)
+    async with provider() as uow:
+        for user_id, balance in ((1, 15), (2, 5)):
+            await uow.users.add(User(id=user_id, first_name=f"User{user_id}"))
+            await uow.wallets.add(Wallet(user_id=user_id, balance=balance))
+        for user_id, amount, created_at in TRANSACTIONS:
+            description = None if amount < 0 else f"Earned {amount}"
+            await uow.transactions.add(
+                Transaction(user_id=user_id, amount=amount, description=description, created_at=created_at)
+            )
+    return provider
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return TransactionArchive(tmp_path / "archive")
+
+
+@pytest.fixture
+def job(async_engine, uow_provider, archive):
+    return TransactionArchivalJob(uow_provider, TransactionPartitions(async_engine), archive, hot_months=2, chunk_size=1)
+
+
+@pytest.mark.asyncio
+async def test_cold_months_move_to_the_archive(job, archive, uow_provider):
+    """
+    Test that months older than the hot window leave the table for the archive, and only those.
+    """
+    archived = await job.run_once(now=NOW)
+
+    assert archived == [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+    assert archive.months() == archived
+    async with uow_provider() as uow:
+        remaining = (await uow.session.execute(select(func.min(Transaction.created_at)))).scalar()
+    assert remaining == datetime(2024, 5, 2)
+    assert await job.run_once(now=NOW) == []
+
+
+@pytest.mark.asyncio
+async def test_ledger_reads_span_the_table_and_the_archive(job, archive, uow_provider):
+    """
+    Test that balances, past balances and history stay complete after archival.
+    """
+    await job.run_once(now=NOW)
+    service = LedgerService(archive)
+
+    async with uow_provider() as uow:
+        assert await service.balances(uow, [1, 2]) == {1: 15, 2: 5}
+        assert await service.balance_at(uow, 1, datetime(2024, 1, 31)) == 7
+        assert await service.balance_at(uow, 1, datetime(2024, 3, 1)) == 13
+        assert await service.balance_at(uow, 1, NOW) == 15
+
+        first_page = await service.history(uow, 1, limit=2)
+        second_page = await service.history(uow, 1, limit=5, before_id=first_page[-1].id)
+
+    assert [t.amount for t in first_page] == [2, 6]
+    assert [t.amount for t in second_page] == [-3, 10]
+    assert second_page[0].description is None
+    assert second_page[1].description == "Earned 10"
+    assert second_page[1].created_at == datetime(2024, 1, 3)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_export_is_resumed(job, archive, async_engine):
+    """
+    Test that a month detached by an interrupted run is exported by the next one.
+    """
+    partitions = TransactionPartitions(async_engine)
+    await partitions.detach(datetime(2024, 1, 1))
+    assert await partitions.detached() == [datetime(2024, 1, 1)]
+
+    archived = await job.run_once(now=NOW)
+
+    assert archived == [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+    assert await partitions.detached() == []
+    assert [t.amount for t in archive.history(1)] == [6, -3, 10]
+
+
+@pytest.mark.asyncio
+async def test_detach_adds_late_rows_to_a_detached_month(job, archive, async_engine, uow_provider):
+    """
+    Test that rows committed to a month after it was detached are added to
+    its archive table by the next detach.
+    """
+    partitions = TransactionPartitions(async_engine)
+    await partitions.detach(datetime(2024, 1, 1))
+    async with uow_provider() as uow:
+        await uow.transactions.add(Transaction(user_id=2, amount=7, created_at=datetime(2024, 1, 28)))
+
+    await partitions.detach(datetime(2024, 1, 1))
+
+    rows = [row async for chunk in partitions.read(datetime(2024, 1, 1), chunk_size=1) for row in chunk]
+    assert [row[2] for row in rows] == [10, -3, 4, 7]
+
+
+def test_archive_round_trips_descriptions(archive):
+    """
+    Test that descriptions of any length and script, empty or missing, are read back as written.
+    """
+    descriptions = ["Ganaste 🎉 besitos", None, "", "x" * 500]
+    columns = ArchiveColumns()
+    for n, description in enumerate(descriptions, start=1):
+        columns.append([(n, 1, n, description, datetime(2024, 1, n))])
+    archive.write(datetime(2024, 1, 1), columns)
+
+    assert [t.description for t in reversed(archive.history(1))] == descriptions
+
+
+def test_archive_refuses_rows_out_of_order(archive):
+    """
+    Test that rows not in (user_id, id) order are refused, as reads binary-search them.
+    """
+    columns = ArchiveColumns()
+    columns.append([(2, 1, 5, None, datetime(2024, 1, 2)), (1, 2, 5, None, datetime(2024, 1, 1))])
+    columns.append([(3, 1, 5, None, datetime(2024, 1, 3))])
+
+    with pytest.raises(ValueError):
+        archive.write(datetime(2024, 1, 1), columns)
+    assert archive.months() == []
@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from src.domain.models import User, UserProfile
+from src.infrastructure.uow import UnitOfWork
+from src.services.context_pipeline import ContextAnalysisPipeline
+from src.services.context_service import ContextService
+
+
+@pytest.fixture
+def uow_provider(session_factory):
+    return lambda: UnitOfWork(session_factory)
+
+
+async def seed_profiles(uow_provider, *profiles: UserProfile):
+    async with uow_provider() as uow:
+        for profile in profiles:
+            await uow.users.add(User(id=profile.user_id, first_name=f"User{profile.user_id}"))
+            await uow.user_profiles.add(profile)
+
+
+def test_submit_collapses_repeated_jobs():
+    """
+    Test that repeated submits for the same user only queue one job.
+    """
+    pipeline = ContextAnalysisPipeline(MagicMock(), ContextService())
+
+    assert pipeline.submit(1) is True
+    assert pipeline.submit(1) is True
+    assert pipeline.submit(2) is True
+
+    assert pipeline._queue.qsize() == 2
+    assert pipeline._pending == {1: 2, 2: 1}
+
+
+def test_submit_drops_jobs_when_queue_is_full():
+    """
+    Test that submit never blocks and reports dropped jobs.
+    """
+    pipeline = ContextAnalysisPipeline(MagicMock(), ContextService(), max_queue_size=1)
+
+    assert pipeline.submit(1) is True
+    assert pipeline.submit(2) is False
+
+
+@pytest.mark.asyncio
+async def test_process_batch_writes_back_profiles(uow_provider):
+    """
+    Test that a batch analyzes every stale profile and stores the results.
+    """
+    await seed_profiles(uow_provider, UserProfile(user_id=1), UserProfile(user_id=2))
+    pipeline = ContextAnalysisPipeline(uow_provider, ContextService())
+    pipeline.submit(1)
+    pipeline.submit(1)
+    pipeline.submit(2)
+
+    analyzed = await pipeline.process_batch([1, 2])
+
+    assert analyzed == 2
+    async with uow_provider() as uow:
+        profile = await uow.user_profiles.get(1)
+        assert profile.analyzed_at is not None
+        assert profile.engagement_score == 2
+
+
+@pytest.mark.asyncio
+async def test_process_batch_skips_fresh_profiles(uow_provider):
+    """
+    Test that recently analyzed profiles are not re-analyzed.
+    """
+    recently = datetime.utcnow() - timedelta(seconds=30)
+    await seed_profiles(uow_provider, UserProfile(user_id=1, analyzed_at=recently))
+    context_service = AsyncMock()
+    pipeline = ContextAnalysisPipeline(uow_provider, context_service, freshness_seconds=600)
+
+    analyzed = await pipeline.process_batch([1])
+
+    assert analyzed == 0
+    context_service.detect_user_mood.assert_not_called()
+    context_service.classify_user_archetype.assert_not_called()
+    context_service.update_engagement_score.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_next_batch_collects_queued_jobs():
+    """
+    Test that the worker drains up to batch_size jobs at once.
+    """
+    pipeline = ContextAnalysisPipeline(MagicMock(), ContextService(), batch_size=2)
+    for user_id in (1, 2, 3):
+        pipeline.submit(user_id)
+
+    assert await pipeline._next_batch() == [1, 2]
+    assert await pipeline._next_batch() == [3]
+
+
+@pytest.mark.asyncio
+async def test_process_batch_records_command_stats(uow_provider):
+    """
+    Test that submitted commands are counted for the archetype features.
+    """
+    await seed_profiles(uow_provider, UserProfile(user_id=1))
+    pipeline = ContextAnalysisPipeline(uow_provider, ContextService())
+    pipeline.submit(1, "/start")
+    pipeline.submit(1, "/balance@diana_bot")
+    pipeline.submit(1, "/start")
+
+    await pipeline.process_batch([1])
+
+    async with uow_provider() as uow:
+        assert await uow.command_stats.counts_by_user([1]) == {1: {"start": 2, "balance": 1}}
+
+
+@pytest.mark.asyncio
+async def test_process_batch_requeues_users_without_profile(uow_provider, monkeypatch):
+    """
+    Test that a job for a user whose registration is not committed yet is retried with its interactions and commands.
+    """
+    monkeypatch.setattr(ContextAnalysisPipeline, "RETRY_DELAY", 0)
+    pipeline = ContextAnalysisPipeline(uow_provider, ContextService())
+    pipeline.submit(1, "/start")
+    pipeline.submit(1)
+
+    assert await pipeline.process_batch(await pipeline._next_batch()) == 0
+    await seed_profiles(uow_provider, UserProfile(user_id=1))
+    assert await pipeline.process_batch(await pipeline._next_batch()) == 1
+
+    async with uow_provider() as uow:
+        profile = await uow.user_profiles.get(1)
+        assert profile.engagement_score == 2
+        assert await uow.command_stats.counts_by_user([1]) == {1: {"start": 1}}
+    assert pipeline._pending == {} and pipeline._retries == {}
+
+
+@pytest.mark.asyncio
+async def test_process_batch_requeues_the_batch_when_the_unit_of_work_fails(uow_provider, monkeypatch):
+    """
+    Test that a batch whose unit of work fails is retried with its interactions and commands.
+    """
+    monkeypatch.setattr(ContextAnalysisPipeline, "RETRY_DELAY", 0)
+    await seed_profiles(uow_provider, UserProfile(user_id=1))
+    failing_uow = MagicMock()
+    failing_uow.__aenter__ = AsyncMock(side_effect=RuntimeError("database is locked"))
+    providers = iter([lambda: failing_uow])
+    pipeline = ContextAnalysisPipeline(lambda: next(providers, uow_provider)(), ContextService())
+    pipeline.submit(1, "/start")
+    pipeline.submit(1)
+
+    with pytest.raises(RuntimeError):
+        await pipeline.process_batch(await pipeline._next_batch())
+    retried = await asyncio.wait_for(pipeline._next_batch(), timeout=1)
+    assert await pipeline.process_batch(retried) == 1
+
+    async with uow_provider() as uow:
+        profile = await uow.user_profiles.get(1)
+        assert profile.engagement_score == 2
+        assert await uow.command_stats.counts_by_user([1]) == {1: {"start": 1}}
+    assert pipeline._pending == {} and pipeline._retries == {}
+
+
+@pytest.mark.asyncio
+async def test_requeue_gives_up_after_max_retries(uow_provider, monkeypatch):
+    """
+    Test that a job for a user that never gets a profile is dropped after MAX_RETRIES.
+    """
+    monkeypatch.setattr(ContextAnalysisPipeline, "RETRY_DELAY", 0)
+    pipeline = ContextAnalysisPipeline(uow_provider, ContextService())
+    pipeline.submit(1, "/start")
+
+    for _ in range(ContextAnalysisPipeline.MAX_RETRIES + 1):
+        await pipeline.process_batch(await pipeline._next_batch())
+    await asyncio.sleep(0)
+
+    assert pipeline._queue.empty()
+    assert pipeline._pending == {} and pipeline._retries == {}
+    assert not pipeline._commands
@@ -27,6 +27,38 @@ async def test_detect_user_mood(context_service: ContextService, user_profile: U
     assert new_mood in list(UserMood)
 
 
+@pytest.mark.asyncio
+async def test_detect_user_mood_from_messages(context_service: ContextService, user_profile: UserProfile):
+    """
+    Test that detect_user_mood uses the messages it is given.
+    """
+    mood = await context_service.detect_user_mood(user_profile, ["Estoy muy feliz 😀"])
+
+    assert mood == UserMood.HAPPY
+    assert user_profile.mood == UserMood.HAPPY
+
+
+@pytest.mark.asyncio
+async def test_observe_messages_feeds_detection(context_service: ContextService, user_profile: UserProfile):
+    """
+    Test that batch observations are reflected in later mood detection.
+    """
+    await context_service.observe_messages([1, 2], ["odio esto 😡", "feliz"])
+
+    assert await context_service.detect_user_mood(user_profile) == UserMood.ANGRY
+
+
+@pytest.mark.asyncio
+async def test_detect_user_mood_keeps_stored_mood_without_messages(context_service: ContextService):
+    """
+    Test that a stored mood survives an analysis with no observed messages, e.g. after a restart.
+    """
+    profile = UserProfile(user_id=1, mood=UserMood.REFLECTIVE)
+
+    assert await context_service.detect_user_mood(profile) == UserMood.REFLECTIVE
+    assert profile.mood == UserMood.REFLECTIVE
+
+
 @pytest.mark.asyncio
 async def test_classify_user_archetype(context_service: ContextService, user_profile: UserProfile):
     """
@@ -0,0 +1,97 @@
+import pytest
+from datetime import datetime, timedelta
+from src.domain.models import User, UserProfile
+from src.infrastructure.uow import UnitOfWork
+from src.services.context_pipeline import ContextAnalysisPipeline
+from src.services.context_service import ContextService
+from src.services.engagement import EngagementDecay
+
+HOUR = 3600
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def decay():
+    return EngagementDecay(half_life_seconds=HOUR)
+
+
+def test_value_halves_after_half_life(decay: EngagementDecay):
+    assert decay.value_at(8.0, NOW, NOW + timedelta(hours=1)) == pytest.approx(4.0)
+    assert decay.value_at(8.0, NOW, NOW + timedelta(hours=3)) == pytest.approx(1.0)
+    assert decay.value_at(0.0, None, NOW) == 0.0
+
+
+def test_add_decays_before_adding(decay: EngagementDecay):
+    assert decay.add(8.0, NOW, 1.0, NOW + timedelta(hours=1)) == pytest.approx(5.0)
+
+
+def test_rank_key_orders_by_decayed_value(decay: EngagementDecay):
+    """
+    Test that rank keys compare scores updated at different times correctly.
+    """
+    # 10 points two hours ago (2.5 now) vs 3 points now
+    old = decay.rank_key(10.0, NOW - timedelta(hours=2))
+    recent = decay.rank_key(3.0, NOW)
+    assert recent > old
+
+    # Still true at any later instant
+    later = NOW + timedelta(days=3)
+    assert decay.value_at(3.0, NOW, later) > decay.value_at(10.0, NOW - timedelta(hours=2), later)
+
+
+def test_threshold_key(decay: EngagementDecay):
+    key = decay.rank_key(4.0, NOW)
+    assert key > decay.threshold_key(3.0, NOW + timedelta(minutes=10))
+    assert key < decay.threshold_key(3.0, NOW + timedelta(hours=1))
+
+
+@pytest.mark.asyncio
+async def test_rank_queries(session_factory, decay: EngagementDecay):
+    """
+    Test the indexed top-N and decayed-below queries.
+    """
+    service = ContextService(engagement_decay=decay)
+    profiles = [UserProfile(user_id=i) for i in (1, 2, 3, 4)]
+    await service.update_engagement_score(profiles[0], 10, now=NOW - timedelta(hours=2))
+    await service.update_engagement_score(profiles[1], 3, now=NOW)
+    await service.update_engagement_score(profiles[2], 1, now=NOW - timedelta(hours=1))
+
+    async with UnitOfWork(session_factory) as uow:
+        for profile in profiles:
+            await uow.users.add(User(id=profile.user_id, first_name="U"))
+            await uow.user_profiles.add(profile)
+
+    async with UnitOfWork(session_factory) as uow:
+        top = await service.get_top_engaged_profiles(uow, limit=2)
+        assert [p.user_id for p in top] == [2, 1]
+
+        below = await service.get_disengaged_profiles(uow, threshold=2.0, now=NOW)
+        assert [p.user_id for p in below] == [3]
+
+
+@pytest.mark.asyncio
+async def test_half_life_change_rekeys_ranks(session_factory, decay: EngagementDecay):
+    """
+    Test that ranks stored with another half-life are recomputed when the pipeline starts.
+    """
+    old_service = ContextService(engagement_decay=EngagementDecay(half_life_seconds=24 * HOUR))
+    profiles = [UserProfile(user_id=i) for i in (1, 2)]
+    await old_service.update_engagement_score(profiles[0], 10, now=NOW - timedelta(hours=4))
+    await old_service.update_engagement_score(profiles[1], 3, now=NOW)
+    async with UnitOfWork(session_factory) as uow:
+        for profile in profiles:
+            await uow.users.add(User(id=profile.user_id, first_name="U"))
+            await uow.user_profiles.add(profile)
+
+    service = ContextService(engagement_decay=decay)
+    pipeline = ContextAnalysisPipeline(lambda: UnitOfWork(session_factory), service, batch_size=1)
+
+    assert await pipeline.rekey_engagement_ranks() == 2
+    assert await pipeline.rekey_engagement_ranks() == 0
+    async with UnitOfWork(session_factory) as uow:
+        rekeyed = {profile.user_id: profile for profile in await uow.user_profiles.get_many([1, 2])}
+        assert rekeyed[1].engagement_rank == pytest.approx(decay.rank_key(10, NOW - timedelta(hours=4)))
+        assert rekeyed[1].engagement_rank_rate == decay.rate
+        # 10 points four one-hour half-lives ago are below 3 points now
+        top = await service.get_top_engaged_profiles(uow, limit=2)
+        assert [p.user_id for p in top] == [2, 1]
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from src.domain.models import Transaction, User, Wallet
+from src.infrastructure.database import create_session_factory
+from src.infrastructure.repositories import TransactionRepository
+from src.infrastructure.uow import UnitOfWork
+from src.services.ledger_service import LedgerReconciliationJob, LedgerService, LedgerSnapshotJob
+
+START = datetime(2024, 5, 1)
+
+
+@pytest.fixture
+async def uow_provider(async_engine):
+    session_factory = create_session_factory(async_engine)
+    provider = lambda: UnitOfWork(session_factory)
+    async with provider() as uow:
+        for user_id, balance in ((1, 45), (2, 7), (3, 0)):
+            await uow.users.add(User(id=user_id, first_name=f"User{user_id}"))
+            await uow.wallets.add(Wallet(user_id=user_id, balance=balance))
+        # User 1: +1..+9 an hour apart (45); user 2: +10, -3 (7)
+        for n in range(1, 10):
+            await uow.transactions.add(Transaction(user_id=1, amount=n, created_at=START + timedelta(hours=n)))
+        await uow.transactions.add(Transaction(user_id=2, amount=10, created_at=START))
+        await uow.transactions.add(Transaction(user_id=2, amount=-3, created_at=START))
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_snapshots_bound_the_tail_and_keep_balances(uow_provider):
+    """
+    Test that the snapshot job only snapshots long tails and that balances
+    read through snapshots match the full history.
+    """
+    job = LedgerSnapshotJob(uow_provider, min_tail=5, chunk_size=1)
+    assert await job.run_once(now=START + timedelta(days=1)) == 1
+
+    async with uow_provider() as uow:
+        snapshot = await uow.balance_snapshots.latest(1)
+        assert (snapshot.balance, await uow.transactions.tail_totals([1, 2])) == (45, {2: (2, 7, 11)})
+        await uow.transactions.add(Transaction(user_id=1, amount=5, created_at=START + timedelta(days=2)))
+
+    async with uow_provider() as uow:
+        ledger = LedgerService()
+        assert await ledger.balances(uow, [1, 2, 3]) == {1: 50, 2: 7, 3: 0}
+        assert await ledger.balance_at(uow, 1, START + timedelta(hours=3, minutes=30)) == 6
+        assert await ledger.balance_at(uow, 1, START + timedelta(days=1)) == 45
+        assert await ledger.balance_at(uow, 1, START) == 0
+        page = await ledger.history(uow, 1, limit=3)
+        assert [t.amount for t in page] == [5, 9, 8]
+        assert [t.amount for t in await ledger.history(uow, 1, limit=2, before_id=page[-1].id)] == [7, 6]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_job_resumes_after_the_latest_snapshot(uow_provider, monkeypatch):
+    """
+    Test that a restarted snapshot job only looks at transactions newer than
+    those already covered by a snapshot.
+    """
+    await LedgerSnapshotJob(uow_provider, min_tail=5).run_once(now=START + timedelta(days=1))
+    scanned_from = []
+    users_after = TransactionRepository.users_after
+
+    async def spy(self, transaction_id, *args, **kwargs):
+        scanned_from.append(transaction_id)
+        return await users_after(self, transaction_id, *args, **kwargs)
+
+    monkeypatch.setattr(TransactionRepository, "users_after", spy)
+    restarted = LedgerSnapshotJob(uow_provider, min_tail=1)
+    assert await restarted.run_once(now=START + timedelta(days=1)) == 1
+
+    async with uow_provider() as uow:
+        assert scanned_from == [9]
+        assert await uow.balance_snapshots.max_transaction_id() == 11
+
+
+@pytest.mark.asyncio
+async def test_transactions_are_append_only(uow_provider):
+    """
+    Test that ledger rows cannot be updated or deleted through the ORM.
+    """
+    async with uow_provider() as uow:
+        transaction = (await uow.transactions.history(2, limit=1))[0]
+        transaction.amount = 100
+        with pytest.raises(ValueError, match="append-only"):
+            await uow.session.flush()
+        await uow.rollback()
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_reports_wallets_that_disagree_with_the_ledger(uow_provider):
+    """
+    Test that the reconciliation job checks every wallet in batches and
+    reports only the ones that disagree with the ledger.
+    """
+    async with uow_provider() as uow:
+        (await uow.wallets.get_by_user_id(2)).balance = 9
+
+    report = await LedgerReconciliationJob(uow_provider, LedgerService(), chunk_size=2).run_once()
+
+    assert (report.checked, report.mismatches, report.samples) == (3, 1, [(2, 9, 7)])
+
+
+@pytest.mark.asyncio
+async def test_history_uses_the_ledger_index(async_engine):
+    """
+    Test that per-user history reads go through the (user_id, id) index.
+    """
+    async with async_engine.connect() as connection:
+        plan = await connection.execute(
+            text("EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE user_id = 1 AND id > 5 ORDER BY id DESC")
+        )
+        assert "ix_transactions_user_id_id" in " ".join(str(row) for row in plan)
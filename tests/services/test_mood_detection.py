@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from src.domain.models import UserMood
+from src.services.mood_detection import MoodDetector, tokenize
+
+
+@pytest.fixture
+def detector():
+    return MoodDetector()
+
+
+def test_tokenize_splits_words_and_symbols():
+    assert tokenize("¿Qué pasa? 😡...") == ["¿", "qué", "pasa", "?", "😡", "..."]
+
+
+@pytest.mark.parametrize(
+    "text, expected_mood",
+    [
+        ("Estoy muy feliz hoy 😀", UserMood.HAPPY),
+        ("Me siento triste y solo 😢", UserMood.SAD),
+        ("Odio esto, estoy harto 😡", UserMood.ANGRY),
+        ("¿Cómo puedo descubrir más? 🤔", UserMood.CURIOUS),
+        ("Pienso mucho en el sentido de la vida...", UserMood.REFLECTIVE),
+        ("hola", UserMood.NEUTRAL),
+        ("", UserMood.NEUTRAL),
+    ],
+)
+def test_classify_batch(detector: MoodDetector, text: str, expected_mood: UserMood):
+    assert detector.classify_batch([text]) == [expected_mood]
+
+
+def test_score_batch_matches_single_scores(detector: MoodDetector):
+    """
+    Test that scoring a batch gives the same result as scoring each message alone.
+    """
+    messages = ["feliz 😀", "", "odio", "nada que ver", "triste 😭 😭"]
+
+    batch = detector.score_batch(messages)
+    singles = np.vstack([detector.score_batch([m]) for m in messages])
+
+    assert batch.shape == (len(messages), len(UserMood))
+    np.testing.assert_allclose(batch, singles, rtol=1e-6)
+
+
+def test_observe_matches_sequential_updates():
+    """
+    Test that a batched observe equals folding messages in one at a time.
+    """
+    messages = ["feliz", "triste 😭", "odio", "feliz 😀", "pienso..."]
+    user_ids = [1, 2, 1, 1, 2]
+    batched, sequential = MoodDetector(), MoodDetector()
+
+    batched.observe(user_ids, messages)
+    for user_id, message in zip(user_ids, messages):
+        sequential.observe([user_id], [message])
+
+    for user_id in (1, 2):
+        np.testing.assert_allclose(
+            batched._aggregates[batched._slots[user_id]],
+            sequential._aggregates[sequential._slots[user_id]],
+            rtol=1e-5,
+        )
+        assert batched.mood_for(user_id) == sequential.mood_for(user_id)
+
+
+def test_rolling_aggregate_follows_recent_messages(detector: MoodDetector):
+    detector.observe([1], ["triste 😢"])
+    assert detector.mood_for(1) == UserMood.SAD
+
+    detector.observe([1, 1, 1], ["feliz 😀", "genial 😄", "jajaja 😊"])
+    assert detector.mood_for(1) == UserMood.HAPPY
+
+
+def test_unknown_user_is_neutral(detector: MoodDetector):
+    assert detector.mood_for(42) == UserMood.NEUTRAL
+
+
+def test_least_recently_seen_user_is_evicted():
+    detector = MoodDetector(max_users=2)
+    detector.observe([1], ["triste"])
+    detector.observe([2], ["odio"])
+    detector.observe([1], ["triste"])
+    detector.observe([3], ["feliz"])
+
+    assert len(detector) == 2
+    assert detector.mood_for(2) == UserMood.NEUTRAL
+    assert detector.mood_for(1) == UserMood.SAD
+    assert detector.mood_for(3) == UserMood.HAPPY
+
+
+def test_forget_frees_slot():
+    detector = MoodDetector(max_users=1)
+    detector.observe([1], ["triste"])
+    detector.forget(1)
+    detector.observe([2], ["feliz"])
+
+    assert detector.mood_for(1) == UserMood.NEUTRAL
+    assert detector.mood_for(2) == UserMood.HAPPY
@@ -2,7 +2,8 @@ import pytest
 from unittest.mock import AsyncMock
 from aiogram import types as tg_types
 from src.services.user_service import UserService
-from src.domain.models import User
+from src.domain.models import User, UserProfile, Wallet
+from src.infrastructure.uow import UnitOfWork
 
 
 @pytest.fixture
@@ -85,3 +86,41 @@ async def test_get_or_create_user_updates_user_info(
     assert user.first_name == "New Name"
     assert user.username == "new_username"
     uow.users.add.assert_called_once_with(existing_user)
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_context_loads_profile_and_wallet(session_factory, mock_event_publisher):
+    """
+    Test that an existing user's profile and wallet are returned with the user.
+    """
+    async with UnitOfWork(session_factory) as uow:
+        await uow.users.add(User(id=3, first_name="Existing"))
+        await uow.user_profiles.add(UserProfile(user_id=3))
+        await uow.wallets.add(Wallet(user_id=3, balance=7))
+
+    user_service = UserService(mock_event_publisher)
+    telegram_user = tg_types.User(id=3, is_bot=False, first_name="Renamed")
+    async with UnitOfWork(session_factory) as uow:
+        context, is_new = await user_service.get_or_create_user_context(uow, telegram_user)
+
+    assert is_new is False
+    assert context.user.first_name == "Renamed"
+    assert context.profile.user_id == 3
+    assert context.wallet.balance == 7
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_context_creates_new_user(session_factory, mock_event_publisher):
+    """
+    Test that a new user gets a context with the new profile and no wallet.
+    """
+    user_service = UserService(mock_event_publisher, context_relations=("profile",))
+    telegram_user = tg_types.User(id=4, is_bot=False, first_name="New")
+    async with UnitOfWork(session_factory) as uow:
+        context, is_new = await user_service.get_or_create_user_context(uow, telegram_user)
+
+    assert is_new is True
+    assert context.user.id == 4
+    assert context.profile.user_id == 4
+    assert context.wallet is None
+    mock_event_publisher.publish.assert_called_once()
@@ -79,3 +79,6 @@ async def test_dispatcher_setup_includes_all_services(monkeypatch):
         assert "gamification_service" in dispatcher.workflow_data
         assert "context_service" in dispatcher.workflow_data
         assert "personalization_service" in dispatcher.workflow_data
+        assert "context_pipeline" in dispatcher.workflow_data
+        assert "load_shedder" in dispatcher.workflow_data
+        assert dispatcher.message.handlers